@@ -1,2 +1,4 @@
 from .user_prompt import input_prompt
-from .simulation_engine import simulate
\ No newline at end of file
+from .simulation_engine import simulate, simulate_iter, Simulation
+from .ensemble import Ensemble, simulate_ensemble
+from .batch import run_batch, read_manifest, write_summary, print_summary
\ No newline at end of file
@@ -0,0 +1,364 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: batch.py
+Description: Runs batches of simulations in parallel worker processes
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import os
+import io
+import csv
+import json
+import functools
+import contextlib
+import time as timer
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from RUFAS import util
+from RUFAS import errors
+from RUFAS import weather_registry
+from RUFAS.classes import Config, Weather
+from RUFAS.output import OutputHandler
+from RUFAS.simulation_engine import Simulation, apply_overrides, weather_used
+
+#-------------------------------------------------------------------------------
+# Function: run_batch
+#-------------------------------------------------------------------------------
+def run_batch(runs, workers=None, resume=False, profile=False):
+    '''Executes the simulations for all runs in a pool of processes.
+
+    A run is either the Path to a json input file or a dictionary as returned
+    by read_manifest(). Runs that do not specify an output directory write
+    their reports to their own sub-directory, named after the input file, of
+    the output directory given in the json file, so that simulations sharing an
+    output directory do not delete or overwrite each other's reports.
+
+    Each distinct weather file of the runs is read once, by this process, and
+    shared with the worker processes through shared memory (see
+    weather_registry), rather than read and held by every worker.
+
+    A line with the wall time and simulated days per second of each run is
+    printed as soon as the run finishes.
+
+    Args:
+        runs (list[Path or dict]): The simulations to run.
+        workers (int, optional): Number of worker processes.
+            Defaults to the number of CPUs on the machine.
+        resume (bool, optional): Resume runs from their latest checkpoint.
+        profile (bool, optional): Time the routines of each run.
+
+    Returns:
+        tuple: (results, workers)
+            results (list[dict]): A result for each run, in the same order as
+                runs. See run_one() for the contents of each result.
+            workers (int): Number of worker processes the batch ran on, no
+                more than the number of runs
+    '''
+
+    runs = [run if isinstance(run, dict) else {'input': Path(run)}
+            for run in runs]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(runs)))
+
+    # Sub-directory names for runs without an output directory
+    stems = [run['input'].stem for run in runs]
+    subdirs = [stem if stems.count(stem) == 1 else "{}_{}".format(stem, i+1)
+               for i, stem in enumerate(stems)]
+
+    print("Running {} simulations on {} worker processes...\n".format(
+          len(runs), workers))
+
+    results = [None]*len(runs)
+
+    descriptions, blocks = weather_registry.share(weather_sources(runs))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=weather_registry.attach,
+                                 initargs=(descriptions,)) as executor:
+            futures = {executor.submit(run_one, run['input'],
+                                       run.get('output_dir'),
+                                       run.get('overrides'),
+                                       subdirs[i], resume, profile): i
+                       for i, run in enumerate(runs)}
+
+            for n, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i] = future.result()
+                print("[{}/{}] {}: {} ({:.3f} s, {:.1f} simulated days/s)"
+                      .format(n, len(runs), results[i]['input'],
+                              results[i]['status'], results[i]['run_time'],
+                              results[i]['days_per_second']))
+
+    finally:
+        weather_registry.release(blocks)
+
+    return results, workers
+
+#-------------------------------------------------------------------------------
+# Function: weather_sources
+#-------------------------------------------------------------------------------
+def weather_sources(runs):
+    '''Finds the distinct weather files of the runs of a batch.
+
+    Runs whose json file cannot be read are left out, their error is reported
+    when they run. So are runs streaming their weather, which never load the
+    whole weather file.
+
+    Args:
+        runs (list[dict]): The runs, see run_batch()
+
+    Returns:
+        dict: {(weather file path (Path), part): function reading it}, see
+            weather_registry.share()
+    '''
+
+    sources = {}
+
+    for run in runs:
+        try:
+            with run['input'].open('r') as f:
+                data = json.load(f)
+            if run.get('overrides'):
+                apply_overrides(data, run['overrides'])
+
+            config = Config(data['config'])
+            attributes = Weather.select(weather_used(
+                             config, OutputHandler(data['output'])))
+            weather_full_path = util.get_base_dir() / data['weather']
+
+        except (OSError, ValueError, KeyError, TypeError, errors.JSONfileData):
+            continue
+
+        if not weather_full_path.is_file() or config.weather_window:
+            continue
+
+        if config.weather_cache:
+            sources.setdefault((weather_full_path, None), Weather.read_cached)
+        else:
+            part = (config.startYear - config.weather_start_year,
+                    config.duration, attributes)
+            sources.setdefault((weather_full_path, part),
+                               functools.partial(Weather.read_csv,
+                                                 span=part[:2],
+                                                 attributes=part[2]))
+
+    return sources
+
+#-------------------------------------------------------------------------------
+# Function: run_one
+#-------------------------------------------------------------------------------
+def run_one(input_fPath:Path, output_dir=None, overrides=None, subdir=None,
+            resume=False, profile=False):
+    '''Executes a single simulation and reports how it went.
+
+    Never raises; any error of the simulation is caught and recorded in the
+    result, so that one bad input file does not bring down the whole batch.
+    Console output of the simulation is captured instead of printed.
+
+    Args:
+        input_fPath (Path): Path to the json input file.
+        output_dir (str, optional): Replaces the output directory of the json
+            file.
+        overrides (dict, optional): Replaces parameters of the json file.
+        subdir (str, optional): When no output_dir is given, write the reports
+            to this sub-directory of the output directory of the json file.
+        resume (bool, optional): Resume from the latest checkpoint.
+        profile (bool, optional): Time the routines of the simulation.
+
+    Returns:
+        dict: {
+               'input': path of the input file
+               'status': "Success", "Invalid Input" or "Failed"
+               'error': error message, None if successful
+               'output_dir': directory the reports were written to
+               'days': number of days simulated, those before the
+                       checkpoint resumed from left out
+               'run_time': wall time of the simulation (seconds)
+               'days_per_second': simulated days per second of wall time
+               'timing': time spent in each routine, see Profiler.to_dict()
+                         (only when profiling)
+              }
+    '''
+
+    result = {'input': str(input_fPath), 'status': "Failed", 'error': None,
+              'output_dir': None, 'days': 0, 'run_time': 0.0,
+              'days_per_second': 0.0}
+
+    log = io.StringIO()
+    t_start = timer.time()
+
+    try:
+        with contextlib.redirect_stdout(log):
+            simulation = Simulation(input_fPath, output_dir, overrides,
+                                    profile)
+
+            if output_dir is None and subdir is not None:
+                simulation.config.output_dir = (
+                    Path(simulation.config.output_dir) / subdir)
+            result['output_dir'] = str(simulation.config.output_dir)
+
+            simulation.run(resume)
+
+        result['status'] = "Success"
+        result['days'] = simulation.days_simulated
+        if simulation.profiler is not None:
+            result['timing'] = simulation.profiler.to_dict()
+
+    except errors.InvalidJSONfile as e:
+        result['status'] = "Invalid Input"
+        result['error'] = log.getvalue().strip() or e.msg.strip()
+
+    except errors.Checkpoint as e:
+        result['error'] = e.msg
+
+    except Exception as e:
+        result['error'] = "{}: {}".format(type(e).__name__, e)
+
+    result['run_time'] = timer.time() - t_start
+    if result['run_time'] > 0:
+        result['days_per_second'] = result['days'] / result['run_time']
+
+    return result
+
+#-------------------------------------------------------------------------------
+# Function: read_manifest
+#-------------------------------------------------------------------------------
+def read_manifest(fPath:Path):
+    '''Reads the runs of a batch from a json or csv manifest file.
+
+    A json manifest is a list of runs (or {"runs": [...]}), each run being
+        {
+         "input": path to the json input file,
+         "output_dir": output directory (optional),
+         "overrides": {parameter path: value} (optional)
+        }
+    A csv manifest has an "input" column and optionally an "output_dir"
+    column. Every other column is a parameter path (e.g. "config.EndYear"),
+    with the value for the run in each row. Values are read as json when
+    possible (numbers, true/false, lists...), as text otherwise. Empty cells
+    leave the parameter as it is in the input file.
+
+    Relative input paths are relative to the directory of the manifest.
+
+    Args:
+        fPath (Path): Path to the manifest file
+
+    Returns:
+        list[dict]: {'input': Path, 'output_dir': str or None,
+                     'overrides': dict} for each run
+
+    Raises:
+        UserInput: If the manifest is not a valid json or csv manifest
+    '''
+
+    if not fPath.is_file():
+        raise errors.UserInput("Manifest file does not exist")
+
+    if fPath.suffix == '.json':
+        with fPath.open('r') as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = rows.get('runs')
+        if not isinstance(rows, list):
+            raise errors.UserInput("json manifest must contain a list of runs")
+
+    elif fPath.suffix == '.csv':
+        with fPath.open('r', newline='') as f:
+            rows = []
+            for row in csv.DictReader(f):
+                overrides = {}
+                for key, value in row.items():
+                    if key in ('input', 'output_dir') or not value:
+                        continue
+                    try:
+                        overrides[key] = json.loads(value)
+                    except ValueError:
+                        overrides[key] = value
+                rows.append({'input': row.get('input'),
+                             'output_dir': row.get('output_dir') or None,
+                             'overrides': overrides})
+
+    else:
+        raise errors.UserInput("Manifest must be a json or csv file")
+
+    runs = []
+    for n, row in enumerate(rows, 1):
+        if not isinstance(row, dict) or not row.get('input'):
+            raise errors.UserInput(
+                "Run {} of the manifest has no input file".format(n))
+
+        input_fPath = Path(row['input'])
+        if not input_fPath.is_absolute():
+            input_fPath = fPath.parent / input_fPath
+
+        runs.append({'input': input_fPath,
+                     'output_dir': row.get('output_dir'),
+                     'overrides': row.get('overrides') or {}})
+
+    return runs
+
+#-------------------------------------------------------------------------------
+# Function: write_summary
+#-------------------------------------------------------------------------------
+def write_summary(results, fPath:Path, workers, wall_time):
+    '''Writes the results of a batch to a json file.
+
+    Args:
+        results (list[dict]): Results of the runs, as returned by run_batch()
+        fPath (Path): Path of the summary file
+        workers (int): Number of worker processes the batch ran on
+        wall_time (float): Wall time of the whole batch (seconds)
+    '''
+
+    successful = [r for r in results if r['status'] == "Success"]
+    days = sum(r['days'] for r in successful)
+    run_time = sum(r['run_time'] for r in successful)
+
+    summary = {
+        'workers': workers,
+        'cpu_count': os.cpu_count(),
+        'runs': len(results),
+        'successful': len(successful),
+        'failed': len(results) - len(successful),
+        'wall_time': wall_time,
+        'simulated_days': days,
+        # throughput of the whole batch, all workers together
+        'days_per_second': days / wall_time if wall_time > 0 else 0.0,
+        # throughput of a single worker
+        'days_per_second_per_worker': days / run_time if run_time > 0 else 0.0,
+        'results': results,
+    }
+
+    with fPath.open('w') as f:
+        json.dump(summary, f, indent=4)
+
+#-------------------------------------------------------------------------------
+# Function: print_summary
+#-------------------------------------------------------------------------------
+def print_summary(results):
+    '''Prints a table of the results of a batch, in input order.'''
+
+    names = [Path(r['input']).name for r in results]
+    name_width = max([len(name) for name in names] + [len("Input")])
+
+    print("\nRUFAS Batch Summary")
+    print("{:<{w}}  {:<13}  {:>12}  {:>10}  {}".format(
+          "Input", "Status", "Run Time (s)", "Days/s", "Output Directory",
+          w=name_width))
+
+    for name, r in zip(names, results):
+        print("{:<{w}}  {:<13}  {:>12.3f}  {:>10.1f}  {}".format(
+              name, r['status'], r['run_time'], r['days_per_second'],
+              r['output_dir'] or '', w=name_width))
+        if r['error']:
+            print("\t" + r['error'].replace('\n', '\n\t'))
+
+    n_success = sum(1 for r in results if r['status'] == "Success")
+    print("\n{} of {} simulations successful, {:.3f} seconds total\n".format(
+          n_success, len(results), sum(r['run_time'] for r in results)))
@@ -0,0 +1,109 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: checkpoint.py
+Description: Saves and loads year-boundary checkpoints of a simulation
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import os
+import gzip
+import pickle
+from pathlib import Path
+
+from RUFAS import util
+from RUFAS import errors
+
+# Version of the checkpoint file format
+VERSION = 1
+
+# File name of the checkpoint in the checkpoint directory
+FILE_NAME = "checkpoint.pkl.gz"
+
+#-------------------------------------------------------------------------------
+# Function: get_fPath
+#-------------------------------------------------------------------------------
+def get_fPath(checkpoint_dir):
+    '''Gets the path of the checkpoint file in the checkpoint directory.'''
+    return util.get_base_dir() / checkpoint_dir / FILE_NAME
+
+#-------------------------------------------------------------------------------
+# Function: save
+#-------------------------------------------------------------------------------
+def save(fPath:Path, state, time, output):
+    '''Saves a checkpoint of the simulation.
+
+    Only the latest checkpoint is kept. The checkpoint is written to a
+    temporary file first, which then replaces the previous checkpoint, so the
+    previous checkpoint is still intact if the program is killed while saving.
+
+    Args:
+        fPath (Path): Path of the checkpoint file
+        state (State): State of the simulation
+        time (Time): Time of the simulation, the checkpoint resumes from here
+        output (OutputHandler): Output of the simulation. Must be flushed, the
+            sizes of the report files are saved
+    '''
+
+    checkpoint = {
+        'version': VERSION,
+        'year': time.year,
+        'day': time.day,
+        'state': state.snapshot(),
+        'report_sizes': output.report_sizes(),
+    }
+
+    fPath.parent.mkdir(exist_ok = True, parents = True)
+    tmp_fPath = fPath.with_name(fPath.name + ".tmp")
+
+    with gzip.open(tmp_fPath, 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_fPath, fPath)
+
+#-------------------------------------------------------------------------------
+# Function: load
+#-------------------------------------------------------------------------------
+def load(fPath:Path, state, time, output):
+    '''Sets the simulation back to the checkpoint saved by save().
+
+    The report files are cut back to their size at the time of the checkpoint,
+    so that they hold exactly the years simulated before the checkpoint.
+
+    Args:
+        fPath (Path): Path of the checkpoint file
+        state (State): State of the simulation, restored in place
+        time (Time): Time of the simulation, restored in place
+        output (OutputHandler): Output of the simulation, with its output
+            directory and reports already initialized
+
+    Raises:
+        Checkpoint: If the checkpoint does not fit the simulation
+    '''
+
+    try:
+        with gzip.open(fPath, 'rb') as f:
+            checkpoint = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError) as e:
+        raise errors.Checkpoint("Cannot read {}: {}".format(fPath, e))
+
+    if checkpoint.get('version') != VERSION:
+        raise errors.Checkpoint("{} was saved by another version of RUFAS"
+                                .format(fPath))
+
+    if checkpoint['year'] > time.duration + 1:
+        raise errors.Checkpoint("{} is at year {}, simulation lasts {} years"
+                                .format(fPath, checkpoint['year'],
+                                        time.duration))
+
+    try:
+        state.restore(checkpoint['state'])
+    except ValueError as e:
+        raise errors.Checkpoint("{} does not fit the input file: {}"
+                                .format(fPath, e))
+
+    output.truncate_reports(checkpoint['report_sizes'])
+
+    time.year = checkpoint['year']
+    time.day = checkpoint['day']
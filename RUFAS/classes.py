@@ -8,12 +8,23 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 '''
 ################################################################################
 
-import csv
-import math
+import os
+import json
+import hashlib
+import functools
+
+import numpy as np
 
 from RUFAS import util
 from RUFAS import errors
+from RUFAS import weather_registry
+from RUFAS import weather_stream
+from RUFAS import weather_overlay
+from RUFAS import weather_generator
+from RUFAS.weather_stream import WeatherStream, StreamedColumn
+from RUFAS.weather_overlay import OverlaidColumn
 from RUFAS.routines import Soil, Animal, Feed, Crop
+from RUFAS.routines import registry
 
 #-------------------------------------------------------------------------------
 # Class: State
@@ -43,11 +54,47 @@ class State():
 		self.feed = Feed(data['feed'])
 		#self.crop = Crop(data['crop'])
 
+		# Soil state in arrays when the soil routines run on them (see
+		# Config.soil_profile), None otherwise. Set by the simulation.
+		self.profile = None
+
 		#self.fieldOps = FieldOps()
 		#self.herd = Herd()
 		#self.housing = Housing()
 		#self.manure = Manure()
 
+	#---------------------------------------------------------------------------
+	# Method: snapshot
+	#---------------------------------------------------------------------------
+	def snapshot(self):
+		'''Returns a copy of the persistent data of the state.
+
+		Only the objects that change during the simulation are included, the
+		feed is set up from the input file and never changes.
+
+		Returns:
+			dict: {'soil': soil snapshot, 'animal': animal snapshot}
+		'''
+
+		# The soil profile holds the soil state until written back
+		if self.profile is not None:
+			self.profile.write()
+
+		return {'soil': self.soil.snapshot(),
+				'animal': self.animal.snapshot()}
+
+	#---------------------------------------------------------------------------
+	# Method: restore
+	#---------------------------------------------------------------------------
+	def restore(self, snapshot):
+		'''Sets the state back to a snapshot taken by snapshot().'''
+
+		self.soil.restore(snapshot['soil'])
+		self.animal.restore(snapshot['animal'])
+
+		if self.profile is not None:
+			self.profile.read([self.soil])
+
 	#---------------------------------------------------------------------------
 	# Method: annual_reset
 	#---------------------------------------------------------------------------
@@ -85,51 +132,158 @@ class Config():
 
 		self.output_dir = data['output_dir']
 
+		# Directory to save year-boundary checkpoints to, None to disable
+		self.checkpoint_dir = data.get('checkpoint_dir')
+
+		# Years to spin up the soil for before the simulation, 0 to disable,
+		# and the directory to cache the spun-up soil states in
+		self.spinup_years = data.get('spinup_years', 0)
+		self.spinup_dir = data.get('spinup_dir', "Outputs/SpinUp_Cache")
+
+		# Time the routines of the simulation
+		self.profile = data.get('profile', False)
+
+		# Keep a binary cache of the weather file next to it, and the years of
+		# weather held in memory (0 for all, streaming otherwise), see Weather
+		self.weather_cache = data.get('weather_cache', True)
+		self.weather_window = data.get('weather_window', 0)
+
+		# Calendar year of the first row of the weather file, the simulation
+		# reads the weather from StartYear on
+		self.weather_start_year = data.get('weather_start_year', self.startYear)
+
+		# Climate scenario adjustments of the weather, see Weather
+		self.weather_overlays = data.get('weather_overlays', [])
+
+		# Daily routines to run, see routines/registry.py
+		self.routines = data.get('routines', list(registry.DEFAULT_ROUTINES))
+
+		for routine in self.routines:
+			if routine not in registry.ROUTINES:
+				raise errors.JSONfileData("CONFIG",
+								"\tUnknown routine: " + str(routine) +
+								"\n\tRoutines are: " +
+								", ".join(registry.ROUTINES))
+
+		# Run the soil routines on arrays of the layer attributes rather than
+		# on the Soil objects, see routines/soil/profile.py. Its cost hardly
+		# grows with the number of layers, faster for deep profiles of many
+		# thin layers. None (the default) leaves it to the simulation, which
+		# runs on the profile from registry.PROFILE_LAYERS layers on.
+		self.soil_profile = data.get('soil_profile', None)
+
+		for routine in self.routines:
+			if (self.soil_profile and routine not in registry.PROFILE_ROUTINES
+				and 'soil' in registry.ROUTINES[routine][1]):
+				raise errors.JSONfileData("CONFIG",
+								"\tRoutine " + str(routine) +
+								" does not run on the soil profile" +
+								"\n\tRoutines running on it are: " +
+								", ".join(registry.PROFILE_ROUTINES))
+
+		if self.spinup_years < 0:
+			raise errors.JSONfileData("CONFIG",
+								"\tSpin-up years must not be negative")
+
 #-------------------------------------------------------------------------------
 # Class: Weather
 #-------------------------------------------------------------------------------
 class Weather():
-	'''Contains daily weather information stored in 2D lists
+	'''Contains daily weather information stored in 2D arrays
 
-	Data lists are in the format Data[year][julian_day].
+	Data arrays are floats of shape (years, 365), indexed Data[year, julian_day]
+	(both starting at 0). When streaming, they are StreamedColumn objects
+	indexed the same way, see weather_stream.py, and adjusted columns are
+	OverlaidColumn objects, see weather_overlay.py.
+
+	Only the attributes read by the simulation are loaded, the others are not
+	set.
 	'''
 
-	def __init__(self, weather_path_str, duration):
+	# Weather data that can be read from the weather file: (attribute, column)
+	# The evaporation and herd columns (8 to 14) are not read yet
+	COLUMNS = (('rainfall', 1), ('tMax', 2), ('tMin', 3), ('tAvg', 4),
+			   ('biomass', 5), ('radiation', 6), ('addedN', 7))
+
+	# Directory of the binary caches, next to the weather file
+	CACHE_DIR = ".weather_cache"
+
+	# Version of the cache format, change when COLUMNS or the layout changes
+	CACHE_VERSION = 1
+
+	def __init__(self, weather_path_str, duration, cache=True, window=0,
+				 start=0, overlays=(), attributes=None):
+		'''Reads the years of the weather file that are simulated.
+
+		The weather file is parsed once, then kept as a binary (.npy) cache in
+		the CACHE_DIR directory next to it, keyed by a hash of the file content
+		(only hashed again when the file changes, see cache_key()). Later loads
+		of the same file memory-map the cache instead of parsing, the pages of
+		the cache being shared by all the processes reading it. The data is
+		read-only, shared by all the Weather objects of the same weather file.
+
+		Only the columns of the attributes given are parsed and kept, so
+		columns no routine reads cost neither time nor memory. The binary
+		cache holds all the columns, but only the pages of the columns used
+		are read from it.
+
+		With a window, the weather is streamed instead: only the given number
+		of years is held in memory, the following years being read as the
+		simulation reaches them, so memory stays the same however many years
+		are simulated.
+
+		The simulation may start at any year of the weather file. Without the
+		binary cache, only the rows of the simulated years are parsed, found
+		from the byte offset of each year of the file. The offsets are kept in
+		an index in CACHE_DIR (with or without the binary cache), so the file
+		is only read through to find them again when it changes (see
+		weather_stream.year_index()).
+
+		Instead of a weather file, the weather may be synthetic years
+		generated by the weather generator (see weather_generator.py), fitted
+		to a weather file. The window and start do not apply to it.
+
+		Climate scenarios adjust the weather with overlays (see
+		weather_overlay.py), applied to the values as they are read. The data
+		of the weather file is never copied, so many scenarios share it.
+
+		Args:
+			weather_path_str (str or dict): Path of the weather file, or the
+				weather generator: {"fit": path of the weather file to fit it
+				to, "seed": seed of the random numbers (optional)}
+			duration (int): Number of years simulated
+			cache (bool, optional): Use (and write) the binary cache.
+			window (int, optional): Years held in memory when streaming,
+				0 to load the whole weather file.
+			start (int, optional): Year of the weather file (starting at 0)
+				the simulation starts at.
+			overlays (list[dict], optional): Adjustments of the weather, see
+				weather_overlay.read_overlays().
+			attributes (set[str], optional): Weather attributes to load, see
+				COLUMNS. Defaults to all of them.
+
+		Raises:
+			JSONfileData: If the weather file does not exist, cannot be read,
+				or has less years than the simulation
+		'''
+
+		self.duration = duration
 
-		#
-		# Weather Data in 2D lists -> [year][julianDay]
-		#
-		self.rainfall = [[0 for _ in range(365)]for _ in range(duration)]
-		self.tMax = [[0 for _ in range(365)]for _ in range(duration)]
-		self.tMin = [[0 for _ in range(365)]for _ in range(duration)]
-		self.tAvg = [[0 for _ in range(365)]for _ in range(duration)]
-		self.biomass = [[0 for _ in range(365)]for _ in range(duration)]
-		self.radiation = [[0 for _ in range(365)]for _ in range(duration)]
-		self.addedN = [[0 for _ in range(365)]for _ in range(duration)]
-
-		self.evaporation = [[0 for _ in range(365)]for _ in range(duration)]
-		self.lCows = [[0 for _ in range(365)]for _ in range(duration)]
-		self.dCows = [[0 for _ in range(365)]for _ in range(duration)]
-		self.heifer = [[0 for _ in range(365)]for _ in range(duration)]
-		self.calf = [[0 for _ in range(365)]for _ in range(duration)]
-		self.beef = [[0 for _ in range(365)]for _ in range(duration)]
-		self.beefCalf = [[0 for _ in range(365)]for _ in range(duration)]
-
-		rainfallData = []
-		tMaxData = []
-		tMinData = []
-		tAvgData = []
-		bioMassData = []
-		radiationData = []
-		addedNData = []
-
-		evaporationData = []
-		lCowsData = []
-		dCowsData = []
-		heiferData = []
-		calfData = []
-		beefData = []
-		beefCalfData = []
+		# Weather attributes loaded, in the order of COLUMNS
+		self.attributes = self.select(attributes)
+
+		# Whether the years are read as the simulation reaches them
+		self.streamed = bool(window) and not isinstance(weather_path_str, dict)
+
+		if isinstance(weather_path_str, dict):
+			generator = weather_path_str
+			weather_path_str = generator.get('fit')
+			if not isinstance(weather_path_str, str):
+				raise errors.JSONfileData("WEATHER",
+									  "\tWeather generator needs a weather "
+									  "file to fit to")
+		else:
+			generator = None
 
 		weather_full_path = util.get_base_dir() / weather_path_str
 
@@ -137,191 +291,346 @@ class Weather():
 			raise errors.JSONfileData("WEATHER",
 									  "\tWeather file specified does not exist")
 
+		if start < 0:
+			raise errors.JSONfileData("WEATHER",
+									  "\tSimulation starts before the weather file")
+
 		#
-		# Read data from CSV file
-		# Data read is in the format data[day]
-		# 1D list of length total number of days in the whole weather file
+		# Data read is in the format data[row, day], day 0 being the first
+		# day of the simulation, rows[attribute] being the row of an attribute
+		# Each weather file is loaded once per process, see weather_registry
 		#
-		with weather_full_path.open('r') as f:
-			readCSV = csv.reader(f, delimiter=',')
+		rows = {attribute: i for i, attribute in enumerate(self.attributes)}
+
+		if generator is not None:
+			data = self.generate(weather_full_path, duration,
+								 generator.get('seed'), cache)
+			rows = {attribute: i for i, (attribute, _)
+					in enumerate(self.COLUMNS)}
+			weather_file_years = duration
+			window = 0
+		elif window:
+			stream = WeatherStream(weather_full_path,
+								   self.columns(self.attributes), window,
+								   start, self.CACHE_DIR)
+			weather_file_years = stream.years()
+		elif cache:
+			data = weather_registry.load(weather_full_path, self.read_cached)
+			data = data[:, start*365:]
+			rows = {attribute: i for i, (attribute, _)
+					in enumerate(self.COLUMNS)}
+			weather_file_years = data.shape[1] // 365
+		else:
+			part = (start, duration, self.attributes)
+			data = weather_registry.load(weather_full_path,
+										 functools.partial(self.read_csv,
+														   span=part[:2],
+														   attributes=part[2]),
+										 part)
+			weather_file_years = data.shape[1] // 365
 
-			currentRow = 0
-			for row in readCSV:
-				if currentRow != 0:
-					# 1) Read rainfall data
-					rainfallData.append(row[1])
+		# Make sure weather data length matchs simulation duaration
+		if weather_file_years < duration:
+			raise errors.JSONfileData("WEATHER",
+									  "\tWeather file contains " +
+									  str(weather_file_years) +
+									  " years from the start of the simulation" +
+									  "\n\tSimulation specifies " + str(duration) +
+									  " years")
 
-					# 2) Read max temperature data
-					tMaxData.append(row[2])
+		adjustments = weather_overlay.read_overlays(
+						  overlays, [attribute for attribute, _ in self.COLUMNS])
 
-					# 3) Read min temperature data
-					tMinData.append(row[3])
+		#
+		# Put weather data into the format:
+		#    data[year, julian_day]
+		# (views of the data read, no copy)
+		#
+		for attribute in self.attributes:
+			if window:
+				column = StreamedColumn(stream, rows[attribute], duration)
+			else:
+				column = data[rows[attribute], :duration*365].reshape(
+							 duration, 365)
 
-					# 4) Read avg temperature data
-					tAvgData.append(row[4])
+			if attribute in adjustments:
+				column = OverlaidColumn(column, *adjustments[attribute])
 
-					# 5) Read biomass data
-					bioMassData.append(row[5])
+			setattr(self, attribute, column)
 
-					# 6) Read radiation data
-					radiationData.append(row[6])
+	#---------------------------------------------------------------------------
+	# Method: from_arrays
+	#---------------------------------------------------------------------------
+	@classmethod
+	def from_arrays(cls, arrays, duration, overlays=()):
+		'''Makes a weather of data already read, e.g. from WeatherStations.
 
-					# 7) Added N Data
-					addedNData.append(row[7])
+		Args:
+			arrays (dict): {attribute: array of shape (duration, 365)}, used
+				without copy
+			duration (int): Number of years simulated
+			overlays (list[dict], optional): Adjustments of the weather, see
+				weather_overlay.read_overlays().
 
-					'''# 8) Evaporation Data
-					evaporationData.append(row[8])
+		Returns:
+			Weather: The weather
 
-					# 9) Lactate Cows Data
-					lCowsData.append(row[9])
+		Raises:
+			JSONfileData: If an attribute or overlay is not valid
+		'''
 
-					# 10) Dry Cows Data
-					dCowsData.append(row[10])
+		weather = cls.__new__(cls)
+		weather.duration = duration
+		weather.streamed = False
+		weather.attributes = cls.select(arrays)
 
-					# 11) Heifer Data
-					heiferData.append(row[11])
+		adjustments = weather_overlay.read_overlays(
+						  overlays, [attribute for attribute, _ in cls.COLUMNS])
 
-					# 12) Calf Data
-					calfData.append(row[12])
+		for attribute in weather.attributes:
+			column = arrays[attribute]
+			if attribute in adjustments:
+				column = OverlaidColumn(column, *adjustments[attribute])
+			setattr(weather, attribute, column)
 
-					# 13) Beef Data
-					beefData.append(row[13])
+		return weather
 
-					# 8) Beef Calf Data
-					beefCalfData.append(row[14])'''
+	#---------------------------------------------------------------------------
+	# Method: select
+	#---------------------------------------------------------------------------
+	@classmethod
+	def select(cls, attributes=None):
+		'''Returns the weather attributes given, in the order of COLUMNS.
 
-				currentRow += 1
+		Args:
+			attributes (set[str], optional): Weather attributes, defaults to
+				all of them
 
-		# Make sure weather data length matchs simulation duaration
-		weather_file_years = math.floor(currentRow / 365)
-		if weather_file_years < duration:
+		Returns:
+			tuple: The weather attributes
+
+		Raises:
+			JSONfileData: If an attribute is not a weather attribute
+		'''
+
+		names = [attribute for attribute, _ in cls.COLUMNS]
+		if attributes is None:
+			return tuple(names)
+
+		for attribute in attributes:
+			if attribute not in names:
+				raise errors.JSONfileData("WEATHER",
+										  "\tUnknown weather attribute: " +
+										  str(attribute) +
+										  "\n\tAttributes are: " +
+										  ", ".join(names))
+
+		return tuple(name for name in names if name in attributes)
+
+	#---------------------------------------------------------------------------
+	# Method: columns
+	#---------------------------------------------------------------------------
+	@classmethod
+	def columns(cls, attributes):
+		'''Returns the columns of the weather file of the attributes given.'''
+
+		columns = dict(cls.COLUMNS)
+		return [columns[attribute] for attribute in attributes]
+
+	#---------------------------------------------------------------------------
+	# Method: generate
+	#---------------------------------------------------------------------------
+	@classmethod
+	def generate(cls, weather_full_path, years, seed=None, cache=True):
+		'''Generates synthetic weather fitted to a weather file.
+
+		Args:
+			weather_full_path (Path): Path of the weather file to fit to
+			years (int): Number of years to generate
+			seed (int, optional): Seed of the random numbers
+			cache (bool, optional): Use (and write) the binary cache of the
+				weather file.
+
+		Returns:
+			ndarray: Weather data, floats of shape (len(COLUMNS), days)
+
+		Raises:
+			JSONfileData: If the weather file cannot be read or fitted to
+		'''
+
+		observed = weather_registry.load(weather_full_path,
+										 cls.read_cached if cache
+										 else cls.read_csv)
+		observed = observed[:, :observed.shape[1] // 365 * 365]
+		if observed.shape[1] == 0:
 			raise errors.JSONfileData("WEATHER",
-									  "\tWeather file contains " +
-									  str(weather_file_years) +
-									  "\n\tSimulation specifies " + str(duration) +
-									  " years")
-		#
-		# TODO: check for weather file length match with simulation duration
-		#
-		# Print out number of rows(days) read from CSV file
-		#print(str(currentRow - 1))
+									  "\tWeather file to fit to has no "
+									  "complete year")
 
-		#
-		# Put weather data into the format:
-		#    data[year][julian_day]
-		#
+		parameters = weather_generator.fit(
+						 {attribute: observed[i].reshape(-1, 365)
+						  for i, (attribute, _) in enumerate(cls.COLUMNS)})
+		weather = weather_generator.generate(parameters, years, seed)
+
+		return np.stack([weather[attribute].reshape(-1)
+						 for attribute, _ in cls.COLUMNS])
+
+	#---------------------------------------------------------------------------
+	# Method: read_csv
+	#---------------------------------------------------------------------------
+	@classmethod
+	def read_csv(cls, weather_full_path, span=None, attributes=None):
+		'''Parses the weather file, in a single pass.
+
+		Args:
+			weather_full_path (Path): Path of the weather file
+			span (tuple, optional): (first year, number of years) to parse,
+				years starting at 0. Defaults to the whole file.
+			attributes (tuple, optional): Weather attributes to parse, in the
+				order of COLUMNS. Defaults to all of them.
+
+		Returns:
+			ndarray: Weather data, floats of shape (len(attributes), days)
+
+		Raises:
+			JSONfileData: If the weather file cannot be read
+		'''
+
+		columns = cls.columns(cls.select(attributes))
+
+		if span is None:
+			data = weather_stream.read_rows(weather_full_path, columns)
+		else:
+			first, years = span
+			offsets = weather_stream.year_index(weather_full_path,
+												 cls.CACHE_DIR)
+			if first >= len(offsets):
+				return np.empty((len(columns), 0))
+			data = weather_stream.read_rows(weather_full_path, columns,
+											offsets[first], years*365)
+
+		return np.ascontiguousarray(data.T)
+
+	#---------------------------------------------------------------------------
+	# Method: read_cached
+	#---------------------------------------------------------------------------
+	@classmethod
+	def read_cached(cls, weather_full_path):
+		'''Memory-maps the binary cache of the weather file.
+
+		The cache is written first if there is none for the current content of
+		the weather file. If the cache cannot be written (e.g. read-only
+		directory), the parsed data is returned instead.
+
+		Returns:
+			ndarray: Weather data, read-only floats of shape
+				(len(COLUMNS), days)
 
-		# 1) Update Rainfall in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(rainfallData):
-					break
-				else:
-					self.rainfall[i][j] = rainfallData[i*365 + j]
-
-		# 2) Update Max Temperature in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(tMaxData):
-					break
-				else:
-					self.tMax[i][j] = tMaxData[i*365 + j]
-
-		# 3) Update Min Temperature in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(tMinData):
-					break
-				else:
-					self.tMin[i][j] = tMinData[i*365 + j]
-
-		# 4) Update Avg Temperature in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(tAvgData):
-					break
-				else:
-					self.tAvg[i][j] = tAvgData[i*365 + j]
-
-		# 5) Update biomass in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(bioMassData):
-					break
-				else:
-					self.biomass[i][j] = bioMassData[i*365 + j]
-
-		# 6) Update radiation in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(radiationData):
-					break
-				else:
-					self.radiation[i][j] = radiationData[i*365 + j]
-
-		# 7) Update addedN in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(addedNData):
-					break
-				else:
-					self.addedN[i][j] = addedNData[i*365 + j]
-
-		# 8) Update evaporation in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(evaporationData):
-					break
-				else:
-					self.evaporation[i][j] = evaporationData[i*365 + j]
-
-		# 9) Update lactate cows in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(lCowsData):
-					break
-				else:
-					self.lCows[i][j] = lCowsData[i*365 + j]
-
-		# 10) Update dry cows in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(dCowsData):
-					break
-				else:
-					self.dCows[i][j] = dCowsData[i*365 + j]
-
-		# 11) Update heifer in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(heiferData):
-					break
-				else:
-					self.heifer[i][j] = heiferData[i*365 + j]
-
-		# 12) Update calf in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(calfData):
-					break
-				else:
-					self.calf[i][j] = calfData[i*365 + j]
-
-		# 13) Update beef in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(beefData):
-					break
-				else:
-					self.beef[i][j] = beefData[i*365 + j]
-
-		# 14) Update beef calf in weather
-		for i in range(0, duration):
-			for j in range(0, 365):
-				if (i*365+j) >= len(beefCalfData):
-					break
-				else:
-					self.beefCalf[i][j] = beefCalfData[i*365 + j]
+		Raises:
+			JSONfileData: If the weather file cannot be read
+		'''
+
+		cache_fPath = (weather_full_path.parent / cls.CACHE_DIR /
+					   "{}.npy".format(cls.cache_key(weather_full_path)))
+
+		if not cache_fPath.exists():
+			data = cls.read_csv(weather_full_path)
+
+			tmp_fPath = cache_fPath.with_name(
+							"{}.{}.tmp".format(cache_fPath.name, os.getpid()))
+			try:
+				cache_fPath.parent.mkdir(exist_ok = True, parents = True)
+				with tmp_fPath.open('wb') as f:
+					np.save(f, data)
+				tmp_fPath.replace(cache_fPath)
+			except OSError:
+				tmp_fPath.unlink(missing_ok = True)
+				return data
+
+		return np.load(cache_fPath, mmap_mode='r')
+
+	#---------------------------------------------------------------------------
+	# Method: cache_key
+	#---------------------------------------------------------------------------
+	@classmethod
+	def cache_key(cls, weather_full_path):
+		'''Returns the key of the binary cache of the weather file.
+
+		The key is a hash of the content of the weather file, so a file changed
+		back (or only touched) finds its cache again. Hashing reads the whole
+		file, so the key is kept in a json file in CACHE_DIR with the size and
+		modification time of the file (as the index of its years, see
+		weather_stream.year_index()), and the file is only hashed again when
+		those change. A file rewritten with the same size within the same
+		modification time keeps its old key, as it keeps its old index.
+
+		Returns:
+			str: Hex digest of the cache version and the weather file content
+		'''
+
+		stamp = list(weather_registry.file_stamp(weather_full_path))
+		key_fPath = (weather_full_path.parent / cls.CACHE_DIR /
+					 (weather_full_path.name + ".key.json"))
+
+		try:
+			with key_fPath.open('r') as f:
+				saved = json.load(f)
+			if (saved['stamp'] == stamp and
+				saved['version'] == cls.CACHE_VERSION):
+				return saved['key']
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+		key = hashlib.sha256()
+		key.update(str(cls.CACHE_VERSION).encode())
+		with weather_full_path.open('rb') as f:
+			for block in iter(functools.partial(f.read, 1 << 20), b''):
+				key.update(block)
+		key = key.hexdigest()
+
+		tmp_fPath = key_fPath.with_name(
+						"{}.{}.tmp".format(key_fPath.name, os.getpid()))
+		try:
+			key_fPath.parent.mkdir(exist_ok = True, parents = True)
+			with tmp_fPath.open('w') as f:
+				json.dump({'stamp': stamp, 'version': cls.CACHE_VERSION,
+						   'key': key}, f)
+			tmp_fPath.replace(key_fPath)
+		except OSError:
+			tmp_fPath.unlink(missing_ok = True)
+
+		return key
+
+	#---------------------------------------------------------------------------
+	# Method: fingerprint
+	#---------------------------------------------------------------------------
+	def fingerprint(self, attributes=None):
+		'''Returns a hash of the weather data of the simulation.
+
+		The data is hashed a year at a time, in a single pass over the years so
+		that a streamed weather is read only once.
+
+		Args:
+			attributes (set[str], optional): Weather attributes to hash,
+				defaults to all the attributes loaded.
+
+		Returns:
+			str: Hex digest identifying the weather data, equal for equal data
+		'''
+
+		if attributes is None:
+			attributes = self.attributes
+		else:
+			attributes = self.select(attributes)
+
+		digests = [hashlib.sha256() for _ in attributes]
+		for year in range(self.duration):
+			for digest, attribute in zip(digests, attributes):
+				digest.update(
+					np.ascontiguousarray(getattr(self, attribute)[year]).tobytes())
+
+		return hashlib.sha256(b"".join(digest.digest()
+									   for digest in digests)).hexdigest()
 
 #-------------------------------------------------------------------------------
 # Class: Time
@@ -353,6 +662,18 @@ class Time():
 
 		return "Year: {} Day: {}".format(self.year, self.day)
 
+	#---------------------------------------------------------------------------
+	# Method: elapsed
+	#---------------------------------------------------------------------------
+	def elapsed(self):
+		'''Returns the number of days simulated before the current day.
+
+		Returns:
+			int: Days from the first day of the simulation to the current day
+		'''
+
+		return (self.year - 1) * 365 + self.day - 1
+
 
 
 	#---------------------------------------------------------------------------
@@ -0,0 +1,254 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: ensemble.py
+Description: Simulates many farms sharing the same weather in lockstep
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import copy
+import json
+from pathlib import Path
+
+from RUFAS import errors
+from RUFAS.classes import Config, Time
+from RUFAS.routines import Soil, Forcing, registry
+from RUFAS.routines.soil import vectorized
+from RUFAS.routines.soil.soil import attributes_of
+from RUFAS.routines.soil.profile import numbers, stack
+from RUFAS.simulation_engine import apply_overrides, read_weather
+
+# Routines simulated by an ensemble, see routines/registry.py
+ROUTINES = ('soil', 'nitrogen')
+
+#-------------------------------------------------------------------------------
+# Function: simulate_ensemble
+#-------------------------------------------------------------------------------
+def simulate_ensemble(input_fPath:Path, farms, fields=()):
+    '''Simulates many variants of a farm, day by day.
+
+    Generator yielding a record after every simulated day, with the value of
+    every field for all the farms. See Ensemble.iterate().
+
+    Args:
+        input_fPath (Path): Path to the json file of the simulation.
+        farms (list[dict]): Soil parameters of each farm, see Ensemble.
+        fields (list[str], optional): The fields to put in the records.
+
+    Yields:
+        dict: {'year': year, 'day': julian day, <field>: array, ...}
+
+    Raises:
+        InvalidJSONfile: If the json file has problems
+        ValueError: If a field does not exist
+    '''
+
+    yield from Ensemble(input_fPath, farms).iterate(fields)
+
+#-------------------------------------------------------------------------------
+# Class: Ensemble
+#-------------------------------------------------------------------------------
+class Ensemble():
+    '''Many farms with the same weather, advanced together one day at a time.
+
+    The farms are the farm of a json input file with some of its soil
+    parameters replaced, one farm per set of replacements. They simulate the
+    soil and soil nitrogen routines only, without reports.
+
+    Rather than one Soil object per farm, the soil state of all the farms is
+    held in NumPy arrays, each simulated day being a few array operations
+    whatever the number of farms (see routines/soil/vectorized.py):
+        soil: attributes of Soil, arrays of shape (farms,)
+        layers: attributes of Soil.SoilLayer, arrays of shape (farms, layers)
+    Each farm gets the same results as when simulated alone.
+    '''
+
+    def __init__(self, input_fPath:Path, farms):
+        '''Instantiates the farms from the json file.
+
+        Args:
+            input_fPath (Path): Path to the json file of the simulation.
+            farms (list[dict]): For each farm, {parameter path: value}
+                replacing soil parameters of the json file, e.g.
+                {"farm.soil.CN2": 80, "farm.soil.SoilLayers.Layer1.Ksat": 15}.
+                See apply_overrides(). All farms must have the same number of
+                soil layers.
+
+        Raises:
+            InvalidJSONfile: If the json file at the given path does not
+                conform with the format required
+        '''
+
+        self.input_fPath = input_fPath
+
+        with input_fPath.open('r') as f:
+            data = json.load(f)
+
+        try:
+            if not farms:
+                raise errors.JSONfileData("ENSEMBLE",
+                                          "\tAn ensemble needs at least 1 farm")
+
+            self.config = Config(data['config'])
+            self.weather = read_weather(data['weather'], self.config,
+                                        registry.weather_used(ROUTINES))
+            self.time = Time(self.config.duration)
+
+            #
+            # Only the numbers of each soil are kept, Soil objects being large
+            #
+            soils = []
+            layers = []
+            for overrides in farms:
+                soil = self.read_soil(data, overrides)
+                soils.append(numbers(vars(soil)))
+                layers.append([numbers(attributes_of(layer))
+                               for layer in soil.listOfSoilLayers])
+
+            if len({len(farm_layers) for farm_layers in layers}) > 1:
+                raise errors.JSONfileData("ENSEMBLE",
+                            "\tAll farms must have the same number of layers")
+
+        except errors.JSONfileData as e:
+            print("JSON FILE ERROR: " + "{} \n\t{} Section\n{}\n".format(
+                  input_fPath.name, e.section, e.msg))
+            raise errors.InvalidJSONfile(input_fPath.name)
+
+        # Daily values of the soil routines that only depend on the weather,
+        # the same for all the farms
+        self.forcing = Forcing(self.weather)
+
+        self.soil = stack(soils)
+        self.layers = stack([layer for farm_layers in layers
+                             for layer in farm_layers],
+                            shape=(len(soils), -1))
+
+        # Values of the daily routines that only depend on the parameters of
+        # the farms, computed once (see vectorized.coefficients())
+        self.coefficients = vectorized.coefficients(self.soil, self.layers)
+
+    #---------------------------------------------------------------------------
+    # Method: read_soil
+    #---------------------------------------------------------------------------
+    def read_soil(self, data, overrides):
+        '''Instantiates the soil of a farm.
+
+        Args:
+            data (dict): Data read from the json input file
+            overrides (dict): Soil parameters of the farm
+
+        Returns:
+            Soil: The soil of the farm
+
+        Raises:
+            JSONfileData: If a parameter is not a soil parameter
+        '''
+
+        for path in overrides:
+            if not path.startswith("farm.soil."):
+                raise errors.JSONfileData("ENSEMBLE",
+                            "\tFarms may only differ in soil parameters, "
+                            "not " + path)
+
+        farm_data = {'farm': {'soil': copy.deepcopy(data['farm']['soil'])}}
+        apply_overrides(farm_data, overrides)
+
+        return Soil(farm_data['farm']['soil'], self.config)
+
+    #---------------------------------------------------------------------------
+    # Method: run
+    #---------------------------------------------------------------------------
+    def run(self):
+        '''Runs the simulation of all the farms to the end.'''
+
+        for _ in self.iterate():
+            pass
+
+    #---------------------------------------------------------------------------
+    # Method: iterate
+    #---------------------------------------------------------------------------
+    def iterate(self, fields=()):
+        '''Runs the simulation, yielding a record after every simulated day.
+
+        Same as Simulation.iterate(), with an array of the values of all the
+        farms for each field:
+            "soil.<attribute>": array of shape (farms,)
+            "layers.<attribute>": array of shape (farms, layers)
+            "weather.<attribute>": weather of the day (same for all farms)
+
+        Args:
+            fields (list[str], optional): The fields to put in the records.
+
+        Yields:
+            dict: {'year': year, 'day': julian day, <field>: value, ...}
+
+        Raises:
+            ValueError: If a field does not exist
+        '''
+
+        getters = [(field, self.field_getter(field)) for field in fields]
+
+        time = self.time
+        while not time.end_simulation():
+            while not time.end_year():
+                record = {'year': time.year, 'day': time.day}
+                self.daily_simulation()
+                for field, get in getters:
+                    record[field] = get(record['year'], record['day'])
+                yield record
+
+            time.advance()
+
+    #---------------------------------------------------------------------------
+    # Method: field_getter
+    #---------------------------------------------------------------------------
+    def field_getter(self, field):
+        '''Gets a function returning the value of a field, see iterate().
+
+        Args:
+            field (str): The field
+
+        Returns:
+            function: get(year, day), returns the value of the field
+
+        Raises:
+            ValueError: If the field does not exist
+        '''
+
+        source, _, attribute = field.partition('.')
+
+        if source in ('soil', 'layers'):
+            arrays = getattr(self, source)
+            if hasattr(arrays, attribute):
+                return lambda year, day: getattr(arrays, attribute).copy()
+
+        elif source == 'weather' and hasattr(self.weather, attribute):
+            data = getattr(self.weather, attribute)
+            return lambda year, day: float(data[year-1, day-1])
+
+        raise ValueError("Unknown field: {}".format(field))
+
+    #---------------------------------------------------------------------------
+    # Method: daily_simulation
+    #---------------------------------------------------------------------------
+    def daily_simulation(self):
+        '''Simulates 1 day for all the farms.'''
+
+        weather = self.weather
+        time = self.time
+        y, d = time.year-1, time.day-1
+
+        f = self.forcing.year(y)
+        rainfall = f.rainfall[d]
+
+        c = self.coefficients
+        vectorized.daily_soil_routine(self.soil, self.layers, c, f, time.day)
+        vectorized.daily_nitrogen_cycling_routine(self.soil, self.layers, c,
+                                                  rainfall)
+
+        vectorized.daily_soil_update(self.soil, self.layers, rainfall)
+        vectorized.daily_nitrogen_update(self.soil, self.layers,
+                                         float(weather.addedN[y, d]))
+
+        time.advance()
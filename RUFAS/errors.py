@@ -35,3 +35,12 @@ class JSONfileData(Exception):
 		self.section = section
 		self.msg = msg
 
+
+#-------------------------------------------------------------------------------
+# Error: Checkpoint
+#-------------------------------------------------------------------------------
+class Checkpoint(Exception):
+	'''Raised when a simulation cannot be resumed from its checkpoint'''
+
+	def __init__(self, msg):
+		self.msg = "CHECKPOINT ERROR: " + msg
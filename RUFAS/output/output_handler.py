@@ -7,10 +7,11 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 '''
 ################################################################################
 
+import shutil
 from pathlib import Path
 
 from RUFAS import util
-from RUFAS.output.report_handler import BaseReportHandler
+from RUFAS import errors
 
 #
 # Import report handlers here
@@ -58,32 +59,72 @@ class OutputHandler():
                             #SoilPhosphorus(data['soil_phosphorus'])
                        ]
 
+    #---------------------------------------------------------------------------
+    # Method: profile
+    #---------------------------------------------------------------------------
+    def profile(self, profiler):
+        '''Times the daily updates and report writing of the active reports.
+
+        Args:
+            profiler (Profiler): Profiler to add the timings to
+        '''
+
+        for report in self.reports:
+            if not report.active:
+                continue
+            name = type(report).__name__
+            report.daily_update = profiler.wrap(
+                name + ".daily_update", report.daily_update)
+            report.write_annual_report = profiler.wrap(
+                name + ".write_annual_report", report.write_annual_report)
+
+    #---------------------------------------------------------------------------
+    # Method: active
+    #---------------------------------------------------------------------------
+    def active(self):
+        '''Returns True if any report is active.'''
+
+        return any(report.active for report in self.reports)
+
+    #---------------------------------------------------------------------------
+    # Method: weather_used
+    #---------------------------------------------------------------------------
+    def weather_used(self):
+        '''Returns the weather attributes read by the active reports.
+
+        Returns:
+            set[str]: The weather attributes, see BaseReportHandler.weather
+        '''
+
+        return {attribute for report in self.reports if report.active
+                for attribute in report.weather}
+
     #---------------------------------------------------------------------------
     # Method: initialize_output_dir
     #---------------------------------------------------------------------------
-    def initialize_output_dir(self, output_dir):
+    def initialize_output_dir(self, output_dir, clear=True):
         '''
         If a directory of the same name exists, it and its contents is deleted,
         then creates the directory for all output report files as specified.
-        Sets output file path for all reports through the class attribute of the
-        BaseReportHandler class.
+        Sets output file path for all reports handled by this object.
 
         Args:
             output_dir (Path): The path to the directory that will store all
                 output report files.
+            clear (bool, optional): Delete the existing directory. Set to
+                False to keep the reports of a simulation that is resumed.
         '''
 
         # Initialize path for reports
         output_dir = util.get_base_dir() / output_dir
 
         # Delete directory if previously exists
-        if output_dir.exists():
-            for file in output_dir.iterdir():
-                file.unlink()
-            output_dir.rmdir()
+        if clear and output_dir.exists():
+            shutil.rmtree(output_dir)
 
-        output_dir.mkdir(exist_ok = True, parents = False)
-        BaseReportHandler.set_dir(output_dir)
+        output_dir.mkdir(exist_ok = True, parents = True)
+        for report in self.reports:
+            report.set_dir(output_dir)
 
     #---------------------------------------------------------------------------
     # Method: initialize_reports
@@ -134,3 +175,48 @@ class OutputHandler():
         for report in self.reports:
             if report.active:
                 report.annual_flush()
+
+    #---------------------------------------------------------------------------
+    # Method: report_sizes
+    #---------------------------------------------------------------------------
+    def report_sizes(self):
+        '''Gets the current size (bytes) of each report file.
+
+        Returns:
+            dict: {file name: size} for all active reports
+        '''
+
+        return {report.fName: (report.get_fPath().stat().st_size
+                               if report.get_fPath().exists() else 0)
+                for report in self.reports if report.active}
+
+    #---------------------------------------------------------------------------
+    # Method: truncate_reports
+    #---------------------------------------------------------------------------
+    def truncate_reports(self, sizes):
+        '''Cuts the report files back to the sizes given.
+
+        Anything written to the reports after the sizes were taken with
+        report_sizes() (e.g. headers written again by initialize_reports()) is
+        removed.
+
+        Args:
+            sizes (dict): {file name: size}, as returned by report_sizes()
+
+        Raises:
+            Checkpoint: If a report file is missing or smaller than its size
+        '''
+
+        for report in self.reports:
+            if not report.active:
+                continue
+
+            fPath = report.get_fPath()
+            size = sizes.get(report.fName, 0)
+
+            if fPath.exists() and fPath.stat().st_size >= size:
+                with fPath.open('r+b') as f:
+                    f.truncate(size)
+            elif size > 0:
+                raise errors.Checkpoint(
+                    "Report file {} is missing or incomplete".format(fPath))
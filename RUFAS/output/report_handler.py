@@ -7,6 +7,7 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 '''
 ################################################################################
 
+import csv
 from pathlib import Path
 from abc import ABC, abstractmethod
 
@@ -26,9 +27,14 @@ class BaseReportHandler(ABC):
 
     # Private Property
     # Default directory for output report files
-    # overwritten by the directory given in json file
+    # overwritten (per report handler object) by the directory given in json
+    # file, so reports of different simulations never share a directory
     __output_dir = util.get_base_dir() / Path("Outputs/Default_Output_Dir")
 
+    # Weather attributes the report reads, only loaded when a routine or an
+    # active report reads them (see Weather.COLUMNS)
+    weather = ()
+
     #---------------------------------------------------------------------------
     # Method: set_properties
     #---------------------------------------------------------------------------
@@ -52,15 +58,64 @@ class BaseReportHandler(ABC):
         Returns:
             Path: path to which the report will be written.
         '''
-        return BaseReportHandler.__output_dir / self.fName
+        return self.__output_dir / self.fName
+
+    #---------------------------------------------------------------------------
+    # Method: set_dir
+    #---------------------------------------------------------------------------
+    def set_dir(self, new_dir):
+        '''Sets the base path to write the output report file to'''
+        self.__output_dir = new_dir
 
     #---------------------------------------------------------------------------
-    # Class Method: set_dir
+    # Method: write_columns
+    #---------------------------------------------------------------------------
+    def write_columns(self, columns):
+        '''Appends rows to the report file, given its columns.
+
+        Writing the rows as lists in the order of the header, rather than as
+        a dictionary per row with a key built for every cell, keeps the cost
+        of reports with many columns (e.g. one per soil layer) low.
+
+        Args:
+            columns (list[iterable]): The values of each column of the report,
+                in the order of its header, one value per row
+        '''
+
+        mode = 'a+' if self.get_fPath().exists() else 'w+'
+
+        with self.get_fPath().open(mode) as csvfile:
+            writer = csv.writer(csvfile, lineterminator='\n')
+            writer.writerows(zip(*columns))
+
     #---------------------------------------------------------------------------
-    @classmethod
-    def set_dir(cls, new_dir):
-        '''Sets the base path to write the output report files to'''
-        cls.__output_dir = new_dir
+    # Method: layer_values
+    #---------------------------------------------------------------------------
+    @staticmethod
+    def layer_values(state, name):
+        '''Returns the values of an attribute of every soil layer.
+
+        When the soil routines run on the soil profile (see
+        Config.soil_profile), the values are read from its arrays, the soil
+        layers only being written to at the end of the year.
+        '''
+
+        if state.profile is not None:
+            return state.profile.layer_values(name)
+        return [getattr(layer, name) for layer in state.soil.listOfSoilLayers]
+
+    #---------------------------------------------------------------------------
+    # Method: rounded
+    #---------------------------------------------------------------------------
+    @staticmethod
+    def rounded(values, digits):
+        '''Returns the values rounded to the number of digits given, as text.
+
+        The values are formatted one at a time, as the rows are written (see
+        write_columns()), rather than all of the year at once.
+        '''
+
+        return (str(round(value, digits)) for value in values)
 
     #---------------------------------------------------------------------------
     # Abstract Methods
@@ -51,6 +51,10 @@ class SoilNitrogen(BaseReportHandler):
         self.NO3Runoff = []
         self.NH4Runoff = []
 
+        #
+        # Daily Outputs of the soil layers
+        # 2D Lists [julianDay][layer]
+        #
         self.layersNO3 = []
         self.layersNH4 = []
         self.layersActiveN = []
@@ -81,27 +85,34 @@ class SoilNitrogen(BaseReportHandler):
 
         with self.get_fPath().open(mode) as csvfile:
 
-            # 1) Initialize the header of the cvsfile
-            fieldnames = ['Year', 'Julian Day', 'NO3/L1', 'NO3/L2', 'NO3/L3',
-                          'NH4/L1', 'NH4/L2', 'NH4/L3', 'ActiveN/L1',
-                          'ActiveN/L2', 'ActiveN/L3', 'StableN/L1',
-                          'StableN/L2', 'StableN/L3', 'FreshN', 'CToN', 'CToP',
-                          'DecayRate', 'NMinAct/L1', 'NMinAct/L2', 'NMinAct/L3',
-                           'FreshMin', 'FreshDecomp', 'Nitri/L1', 'Nitri/L2',
-                           'Nitri/L3', 'Volati/L1', 'Volati/L2', 'Volati/L3',
-                           'Denitri/L1', 'Denitri/L2', 'Denitri/L3',
-                           'FreshConc', 'ActiveConc', 'StableConc', 'NH4Conc',
+            # 1) Initialize the header of the cvsfile, with the columns of
+            # each soil layer
+            fieldnames = ['Year', 'Julian Day']
+
+            for name in ('NO3', 'NH4', 'ActiveN', 'StableN'):
+                for x in range(0, self.numSoilLayers):
+                    fieldnames.append(name + "/L" + str(x+1))
+
+            fieldnames += ['FreshN', 'CToN', 'CToP', 'DecayRate']
+
+            for x in range(0, self.numSoilLayers):
+                fieldnames.append("NMinAct/L" + str(x+1))
+
+            fieldnames += ['FreshMin', 'FreshDecomp']
+
+            for name in ('Nitri', 'Volati', 'Denitri'):
+                for x in range(0, self.numSoilLayers):
+                    fieldnames.append(name + "/L" + str(x+1))
+
+            fieldnames += ['FreshConc', 'ActiveConc', 'StableConc', 'NH4Conc',
                            'Enrich', 'FreshLoss', 'ActiveLoss', 'StableLoss',
-                           'NH4Loss', 'NO3Runoff', 'NH4Runoff', 'NO3Conc/L1',
-                           'NO3Conc/L2', 'NO3Conc/L3', 'NO3Perc/L1',
-                           'NO3Perc/L2', 'NO3Perc/L3', 'NH4Conc/L1',
-                           'NH4Conc/L2', 'NH4Conc/L3', 'NH4Perc/L1',
-                           'NH4Perc/L2', 'NH4Perc/L3', 'ActiveConc/L1',
-                           'ActiveConc/L2', 'ActiveConc/L3', 'ActivePerc/L1',
-                           'ActivePerc/L2', 'ActivePerc/L3', 'TotNitrVolatil/L1',
-                           'TotNitrVolatil/L2', 'TotNitrVolatil/L3',
-                           'Ntrans/L1',
-                           'Ntrans/L2', 'Ntrans/L3' ]
+                           'NH4Loss', 'NO3Runoff', 'NH4Runoff']
+
+            for name in ('NO3Conc', 'NO3Perc', 'NH4Conc', 'NH4Perc',
+                         'ActiveConc', 'ActivePerc', 'TotNitrVolatil',
+                         'Ntrans'):
+                for x in range(0, self.numSoilLayers):
+                    fieldnames.append(name + "/L" + str(x+1))
 
             self.fieldNames = fieldnames
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames,
@@ -149,28 +160,8 @@ class SoilNitrogen(BaseReportHandler):
 
         # initialize number of layer in soil summary report handler to get output
         # data pertaining to each soil layer
-        # Initializes the output arrays for current soil water, Esoil, and
-        # percolation for each soil layer
         self.numSoilLayers = len(soil.listOfSoilLayers)
 
-        for _ in range (0, self.numSoilLayers):
-            self.layersNO3.append([])
-            self.layersNH4.append([])
-            self.layersActiveN.append([])
-            self.layersStableN.append([])
-            self.layersActiveNMineralization.append([])
-            self.nitrification.append([])
-            self.volatilization.append([])
-            self.denitrification.append([])
-            self.layersNO3Conc.append([])
-            self.layersNO3Perc.append([])
-            self.layersNH4Conc.append([])
-            self.layersNH4Perc.append([])
-            self.layersActiveNConc.append([])
-            self.layersActiveNPerc.append([])
-            self.layersTotNitriVolatil.append([])
-            self.layersNtrans.append([])
-
         self.write_header()
 
     #---------------------------------------------------------------------------
@@ -206,24 +197,24 @@ class SoilNitrogen(BaseReportHandler):
         self.NH4Runoff.append(soil.NH4Runoff)
 
 
-        for x in range(0, len(soil.listOfSoilLayers)):
-            self.layersNO3[x].append(soil.listOfSoilLayers[x].NO3)
-            self.layersNH4[x].append(soil.listOfSoilLayers[x].NH4)
-            self.layersActiveN[x].append(soil.listOfSoilLayers[x].activeN)
-            self.layersStableN[x].append(soil.listOfSoilLayers[x].stableN)
-            self.layersActiveNMineralization[x].append(
-                soil.listOfSoilLayers[x].nMinAct)
-            self.nitrification[x].append(soil.listOfSoilLayers[x].nitrification)
-            self.volatilization[x].append(soil.listOfSoilLayers[x].volatilization)
-            self.denitrification[x].append(soil.listOfSoilLayers[x].denitrification)
-            self.layersNO3Conc[x].append(soil.listOfSoilLayers[x].NO3Conc)
-            self.layersNO3Perc[x].append(soil.listOfSoilLayers[x].NO3Perc)
-            self.layersNH4Conc[x].append(soil.listOfSoilLayers[x].NH4Conc)
-            self.layersNH4Perc[x].append(soil.listOfSoilLayers[x].NH4Perc)
-            self.layersActiveNConc[x].append(soil.listOfSoilLayers[x].activeNConc)
-            self.layersActiveNPerc[x].append(soil.listOfSoilLayers[x].activeNPerc)
-            self.layersTotNitriVolatil[x].append(soil.listOfSoilLayers[x].totNitriVolatil)
-            self.layersNtrans[x].append(soil.listOfSoilLayers[x].nTrans)
+        self.layersNO3.append(self.layer_values(state, 'NO3'))
+        self.layersNH4.append(self.layer_values(state, 'NH4'))
+        self.layersActiveN.append(self.layer_values(state, 'activeN'))
+        self.layersStableN.append(self.layer_values(state, 'stableN'))
+        self.layersActiveNMineralization.append(
+            self.layer_values(state, 'nMinAct'))
+        self.nitrification.append(self.layer_values(state, 'nitrification'))
+        self.volatilization.append(self.layer_values(state, 'volatilization'))
+        self.denitrification.append(self.layer_values(state, 'denitrification'))
+        self.layersNO3Conc.append(self.layer_values(state, 'NO3Conc'))
+        self.layersNO3Perc.append(self.layer_values(state, 'NO3Perc'))
+        self.layersNH4Conc.append(self.layer_values(state, 'NH4Conc'))
+        self.layersNH4Perc.append(self.layer_values(state, 'NH4Perc'))
+        self.layersActiveNConc.append(self.layer_values(state, 'activeNConc'))
+        self.layersActiveNPerc.append(self.layer_values(state, 'activeNPerc'))
+        self.layersTotNitriVolatil.append(
+            self.layer_values(state, 'totNitriVolatil'))
+        self.layersNtrans.append(self.layer_values(state, 'nTrans'))
 
     #---------------------------------------------------------------------------
     # Method: annual_update
@@ -239,93 +230,48 @@ class SoilNitrogen(BaseReportHandler):
     #---------------------------------------------------------------------------
     def write_annual_report(self, y):
 
-        mode = 'a+' if self.get_fPath().exists() else 'w+'
-
-        with self.get_fPath().open(mode) as csvfile:
-
-        # Write data day by day
-            for x in range(0, len(self.julianDay)):
-                dailySoilNitrogenData = {
-                    'Year': str(self.year[x]),
-                    'Julian Day': self.julianDay[x]
-                    }
-
-                for y in range(0, self.numSoilLayers):
-                    dailySoilNitrogenData["NO3/L" + str(y+1)] = str(
-                        round(self.layersNO3[y][x], 3))
-
-                    dailySoilNitrogenData["NH4/L" + str(y+1)] = str(
-                        round(self.layersNH4[y][x], 3))
-
-                    dailySoilNitrogenData["ActiveN/L" + str(y+1)] = str(
-                        round(self.layersActiveN[y][x], 3))
-
-                    dailySoilNitrogenData["StableN/L" + str(y+1)] = str(
-                        round(self.layersStableN[y][x], 3))
-
-                dailySoilNitrogenData["FreshN"] = str(round(self.freshN[x], 3))
-                dailySoilNitrogenData["CToN"] = str(round(self.cToN[x], 3))
-                dailySoilNitrogenData["CToP"] = str(round(self.cToP[x], 3))
-                dailySoilNitrogenData["DecayRate"] = str(round(self.decayRate[x], 3))
-
-                for y in range(0, self.numSoilLayers):
-                    dailySoilNitrogenData["NMinAct/L" + str(y+1)] = str(
-                        round(self.layersActiveNMineralization[y][x], 4))
-
-                dailySoilNitrogenData["FreshMin"] = str(round(self.freshMin[x], 3))
-                dailySoilNitrogenData["FreshDecomp"] = str(round(self.freshDecomp[x], 3))
-
-                for y in range(0, self.numSoilLayers):
-                    dailySoilNitrogenData["Nitri/L" + str(y+1)] = str(
-                        round(self.nitrification[y][x], 3))
-
-                    dailySoilNitrogenData["Volati/L" + str(y+1)] = str(
-                        round(self.volatilization[y][x], 3))
-
-                    dailySoilNitrogenData["Denitri/L" + str(y+1)] = str(
-                        round(self.denitrification[y][x], 3))
-
-                dailySoilNitrogenData["FreshConc"] = str(round(self.freshConc[x], 3))
-                dailySoilNitrogenData["ActiveConc"] = str(round(self.activeConc[x], 3))
-                dailySoilNitrogenData["StableConc"] = str(round(self.stableConc[x], 3))
-                dailySoilNitrogenData["NH4Conc"] = str(round(self.NH4Conc[x], 3))
-                dailySoilNitrogenData["Enrich"] = str(round(self.enrichmentRatio[x], 3))
-                dailySoilNitrogenData["FreshLoss"] = str(round(self.freshLoss[x], 3))
-                dailySoilNitrogenData["ActiveLoss"] = str(round(self.activeLoss[x], 4))
-                dailySoilNitrogenData["StableLoss"] = str(round(self.stableLoss[x], 3))
-                dailySoilNitrogenData["NH4Loss"] = str(round(self.NH4Loss[x], 4))
-                dailySoilNitrogenData["NO3Runoff"] = str(round(self.NO3Runoff[x], 3))
-                dailySoilNitrogenData["NH4Runoff"] = str(round(self.NH4Runoff[x], 3))
-
-                for y in range(0, self.numSoilLayers):
-                    dailySoilNitrogenData["NO3Conc/L" + str(y+1)] = str(
-                        round(self.layersNO3Conc[y][x], 3))
-
-                    dailySoilNitrogenData["NO3Perc/L" + str(y+1)] = str(
-                        round(self.layersNO3Perc[y][x], 3))
-
-                    dailySoilNitrogenData["NH4Conc/L" + str(y+1)] = str(
-                        round(self.layersNH4Conc[y][x], 3))
-
-                    dailySoilNitrogenData["NH4Perc/L" + str(y+1)] = str(
-                        round(self.layersNH4Perc[y][x], 4))
-
-                    dailySoilNitrogenData["ActiveConc/L" + str(y+1)] = str(
-                        round(self.layersActiveNConc[y][x], 3))
-
-                    dailySoilNitrogenData["ActivePerc/L" + str(y+1)] = str(
-                        round(self.layersActiveNPerc[y][x], 3))
-
-                    dailySoilNitrogenData["TotNitrVolatil/L" + str(y+1)] = str(
-                        round(self.layersTotNitriVolatil[y][x], 3))
-
-                    dailySoilNitrogenData["Ntrans/L" + str(y+1)] = str(
-                        round(self.layersNtrans[y][x], 3))
-
-
-                writer = csv.DictWriter(csvfile, fieldnames=self.fieldNames,
-                                    lineterminator = '\n')
-                writer.writerow(dailySoilNitrogenData)
+        # Columns of the report, in the order of the header (see
+        # write_header()), the layer columns being those of each soil layer
+        columns = [self.year, self.julianDay]
+
+        for layers in (self.layersNO3, self.layersNH4, self.layersActiveN,
+                       self.layersStableN):
+            columns += [self.rounded(values, 3) for values in zip(*layers)]
+
+        columns += [self.rounded(self.freshN, 3), self.rounded(self.cToN, 3),
+                    self.rounded(self.cToP, 3), self.rounded(self.decayRate, 3)]
+
+        columns += [self.rounded(values, 4)
+                    for values in zip(*self.layersActiveNMineralization)]
+
+        columns += [self.rounded(self.freshMin, 3),
+                    self.rounded(self.freshDecomp, 3)]
+
+        for layers in (self.nitrification, self.volatilization,
+                       self.denitrification):
+            columns += [self.rounded(values, 3) for values in zip(*layers)]
+
+        columns += [self.rounded(self.freshConc, 3),
+                    self.rounded(self.activeConc, 3),
+                    self.rounded(self.stableConc, 3),
+                    self.rounded(self.NH4Conc, 3),
+                    self.rounded(self.enrichmentRatio, 3),
+                    self.rounded(self.freshLoss, 3),
+                    self.rounded(self.activeLoss, 4),
+                    self.rounded(self.stableLoss, 3),
+                    self.rounded(self.NH4Loss, 4),
+                    self.rounded(self.NO3Runoff, 3),
+                    self.rounded(self.NH4Runoff, 3)]
+
+        for layers, digits in ((self.layersNO3Conc, 3), (self.layersNO3Perc, 3),
+                               (self.layersNH4Conc, 3), (self.layersNH4Perc, 4),
+                               (self.layersActiveNConc, 3),
+                               (self.layersActiveNPerc, 3),
+                               (self.layersTotNitriVolatil, 3),
+                               (self.layersNtrans, 3)):
+            columns += [self.rounded(values, digits) for values in zip(*layers)]
+
+        self.write_columns(columns)
 
     #---------------------------------------------------------------------------
     # Function: annual_flush
@@ -353,20 +299,19 @@ class SoilNitrogen(BaseReportHandler):
         self.NO3Runoff = []
         self.NH4Runoff = []
 
-        for x in range(0, self.numSoilLayers):
-            self.layersNO3[x] = []
-            self.layersNH4[x] = []
-            self.layersActiveN[x] = []
-            self.layersStableN[x] = []
-            self.layersActiveNMineralization[x] = []
-            self.nitrification[x] = []
-            self.volatilization[x] = []
-            self.denitrification[x] = []
-            self.layersNO3Conc[x] = []
-            self.layersNO3Perc[x] = []
-            self.layersNH4Conc[x] = []
-            self.layersNH4Perc[x] = []
-            self.layersActiveNConc[x] = []
-            self.layersActiveNPerc[x] = []
-            self.layersTotNitriVolatil[x] = []
-            self.layersNtrans[x] = []
\ No newline at end of file
+        self.layersNO3 = []
+        self.layersNH4 = []
+        self.layersActiveN = []
+        self.layersStableN = []
+        self.layersActiveNMineralization = []
+        self.nitrification = []
+        self.volatilization = []
+        self.denitrification = []
+        self.layersNO3Conc = []
+        self.layersNO3Perc = []
+        self.layersNH4Conc = []
+        self.layersNH4Perc = []
+        self.layersActiveNConc = []
+        self.layersActiveNPerc = []
+        self.layersTotNitriVolatil = []
+        self.layersNtrans = []
\ No newline at end of file
@@ -33,6 +33,11 @@ class SoilPhosphorus(BaseReportHandler):
         self.year = []
         self.julianDay = []
         self.numSoilLayers = 0
+
+        #
+        # Daily Outputs of the soil layers
+        # 2D Lists [julianDay][layer]
+        #
         self.layersActiveP = []
         self.layersStableP = []
 
@@ -47,10 +52,13 @@ class SoilPhosphorus(BaseReportHandler):
 
         with self.get_fPath().open(mode) as csvfile:
 
-            # 1) Initialize the header of the cvsfile
-            fieldnames = ['Year', 'Julian Day', 'ActiveP/L1',
-                          'ActiveP/L2', 'ActiveP/L3', 'StableP/L1',
-                          'StableP/L2', 'StableP/L3']
+            # 1) Initialize the header of the cvsfile, with the columns of
+            # each soil layer
+            fieldnames = ['Year', 'Julian Day']
+
+            for name in ('ActiveP', 'StableP'):
+                for x in range(0, self.numSoilLayers):
+                    fieldnames.append(name + "/L" + str(x+1))
 
             self.fieldNames = fieldnames
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames,
@@ -75,14 +83,8 @@ class SoilPhosphorus(BaseReportHandler):
 
         # initialize number of layer in soil summary report handler to get output
         # data pertaining to each soil layer
-        # Initializes the output arrays for current soil water, Esoil, and
-        # percolation for each soil layer
         self.numSoilLayers = len(soil.listOfSoilLayers)
 
-        for _ in range (0, self.numSoilLayers):
-            self.layersActiveP.append([])
-            self.layersStableP.append([])
-
 
     #---------------------------------------------------------------------------
     # Function: updateDailyOutput
@@ -91,17 +93,14 @@ class SoilPhosphorus(BaseReportHandler):
     #---------------------------------------------------------------------------
     def daily_update(self, state, weather, time):
 
-        soil = state.soil
-
         day = time.day
         year = time.year
 
         self.year.append(year)
         self.julianDay.append(day)
 
-        for x in range(0, len(soil.listOfSoilLayers)):
-            self.layersActiveP[x].append(soil.listOfSoilLayers[x].activeP)
-            self.layersStableP[x].append(soil.listOfSoilLayers[x].stableP)
+        self.layersActiveP.append(self.layer_values(state, 'activeP'))
+        self.layersStableP.append(self.layer_values(state, 'stableP'))
 
     #---------------------------------------------------------------------------
     # Method: annual_update
@@ -117,26 +116,14 @@ class SoilPhosphorus(BaseReportHandler):
     #---------------------------------------------------------------------------
     def write_annual_report(self, y):
 
-        mode = 'a+' if self.get_fPath().exists() else 'w+'
-
-        with self.get_fPath().open(mode) as csvfile:
-
-        # Write data day by day
-            for x in range(0, len(self.julianDay)):
-                dailySoilPhosphorusData = {
-                    'Year': str(self.year[x]),
-                    'Julian Day': self.julianDay[x]}
+        # Columns of the report, in the order of the header (see
+        # write_header()), the layer columns being those of each soil layer
+        columns = [self.year, self.julianDay]
 
-                for y in range(0, self.numSoilLayers):
-                    dailySoilPhosphorusData["ActiveP/L" + str(y+1)] = str(
-                        round(self.layersActiveP[y][x], 3))
+        for layers in (self.layersActiveP, self.layersStableP):
+            columns += [self.rounded(values, 3) for values in zip(*layers)]
 
-                    dailySoilPhosphorusData["StableP/L" + str(y+1)] = str(
-                        round(self.layersStableP[y][x], 3))
-
-                writer = csv.DictWriter(csvfile, fieldnames=self.fieldNames,
-                                    lineterminator = '\n')
-                writer.writerow(dailySoilPhosphorusData)
+        self.write_columns(columns)
 
     #---------------------------------------------------------------------------
     # Function: annual_flush
@@ -147,6 +134,5 @@ class SoilPhosphorus(BaseReportHandler):
         self.year = []
         self.julianDay = []
 
-        for x in range(0, self.numSoilLayers):
-            self.layersActiveP[x] = []
-            self.layersStableP[x] = []
\ No newline at end of file
+        self.layersActiveP = []
+        self.layersStableP = []
\ No newline at end of file
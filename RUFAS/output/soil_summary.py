@@ -18,6 +18,8 @@ from RUFAS.output.report_handler import BaseReportHandler
 #-------------------------------------------------------------------------------
 class SoilSummary(BaseReportHandler):
 
+    weather = ('rainfall',)
+
     def __init__(self, data):
 
         #
@@ -41,6 +43,10 @@ class SoilSummary(BaseReportHandler):
         self.sedimentYield = []
         self.numSoilLayers = 0
 
+        #
+        # Daily Outputs of the soil layers
+        # 2D Lists [julianDay][layer]
+        #
         self.layersSoilWater = []
         self.layersEsoil = []
         self.layersPerc = []
@@ -112,16 +118,8 @@ class SoilSummary(BaseReportHandler):
 
         # initialize number of layer in soil summary report handler to get output
         # data pertaining to each soil layer
-        # Initializes the output arrays for current soil water, Esoil, and
-        # percolation for each soil layer
         self.numSoilLayers = len(soil.listOfSoilLayers)
 
-        for _ in range (0, self.numSoilLayers):
-            self.layersSoilWater.append([])
-            self.layersEsoil.append([])
-            self.layersPerc.append([])
-            self.layersTemperature.append([])
-
         self.write_header()
 
     #---------------------------------------------------------------------------
@@ -133,7 +131,7 @@ class SoilSummary(BaseReportHandler):
 
         soil = state.soil
 
-        rainfall = weather.rainfall[time.year-1][time.day-1]
+        rainfall = float(weather.rainfall[time.year-1, time.day-1])
         day = time.day
         year = time.year
 
@@ -146,19 +144,11 @@ class SoilSummary(BaseReportHandler):
         self.cropTranspiration.append(soil.Etrans)
         self.sublimation.append(soil.Esoil)
 
-        for x in range(0, len(soil.listOfSoilLayers)):
-            self.layersSoilWater[x].append(
-                soil.listOfSoilLayers[x].currentSoilWaterMM)
-
-            self.layersEsoil[x].append(
-                                    soil.listOfSoilLayers[x].layerEsoil)
-
-            self.layersPerc[x].append(
-                                    soil.listOfSoilLayers[x].perc)
-
-            self.layersTemperature[x].append(
-                                    soil.listOfSoilLayers[x].temperature)
-
+        self.layersSoilWater.append(self.layer_values(state,
+                                                      'currentSoilWaterMM'))
+        self.layersEsoil.append(self.layer_values(state, 'layerEsoil'))
+        self.layersPerc.append(self.layer_values(state, 'perc'))
+        self.layersTemperature.append(self.layer_values(state, 'temperature'))
 
         self.surfaceTemp.append(soil.Tsurf)
         self.sedimentYield.append(soil.sedimentYield)
@@ -177,46 +167,23 @@ class SoilSummary(BaseReportHandler):
     #---------------------------------------------------------------------------
     def write_annual_report(self, y):
 
-        mode = 'a+' if self.get_fPath().exists() else 'w+'
+        # Columns of the report, in the order of the header (see
+        # write_header()), the layer columns being those of each soil layer
+        columns = [self.year, self.julianDay,
+                   self.rounded([float(p) for p in self.precip], 2),
+                   self.rounded(self.runoff, 2),
+                   self.rounded(self.potentialEvapotranspiration, 3),
+                   self.rounded(self.cropTranspiration, 3),
+                   self.rounded(self.sublimation, 3)]
 
+        for layers in (self.layersSoilWater, self.layersEsoil, self.layersPerc,
+                       self.layersTemperature):
+            columns += [self.rounded(values, 3) for values in zip(*layers)]
 
-        with self.get_fPath().open(mode) as csvfile:
+        columns += [self.rounded(self.surfaceTemp, 3),
+                    self.rounded(self.sedimentYield, 3)]
 
-        # Write data day by day
-            for x in range(0, len(self.julianDay)):
-                dailySoilData = {
-                    'Year':
-                        str(self.year[x]),
-                    'Julian Day':
-                        self.julianDay[x],
-                    'Rainfall':
-                        str(round(float(self.precip[x]), 2)),
-                    'Runoff (Q)':
-                        str(round(self.runoff[x], 2)),
-                    'Potential Evapotranspiration (E0)':
-                        str(round(self.potentialEvapotranspiration[x],3)),
-                    'Crop Transpiration (Etrans)':
-                        str(round(self.cropTranspiration[x],3)),
-                    'Maximum Sublimation (Esoil)':
-                        str(round(self.sublimation[x],3)),
-                    'Surface Temp':
-                        str(round(self.surfaceTemp[x],3)),
-                    'Sediment Yield':
-                        str(round(self.sedimentYield[x],3))}
-
-                for y in range(0, self.numSoilLayers):
-                    dailySoilData["SoilWater/L" + str(y+1)] = str(
-                        round(self.layersSoilWater[y][x], 3))
-                    dailySoilData["Esoil/L" + str(y+1)] = str(
-                        round(self.layersEsoil[y][x], 3))
-                    dailySoilData["Perc/L" + str(y+1)] = str(
-                        round(self.layersPerc[y][x], 3))
-                    dailySoilData["Temp/L" + str(y+1)] = str(
-                        round(self.layersTemperature[y][x], 3))
-
-                writer = csv.DictWriter(csvfile, fieldnames=self.fieldNames,
-                                    lineterminator = '\n')
-                writer.writerow(dailySoilData)
+        self.write_columns(columns)
 
     #---------------------------------------------------------------------------
     # Function: annual_flush
@@ -233,11 +200,10 @@ class SoilSummary(BaseReportHandler):
         self.cropTranspiration = []
         self.sublimation = []
 
-        for x in range(0, self.numSoilLayers):
-            self.layersSoilWater[x] = []
-            self.layersEsoil[x] = []
-            self.layersPerc[x] = []
-            self.layersTemperature[x] = []
+        self.layersSoilWater = []
+        self.layersEsoil = []
+        self.layersPerc = []
+        self.layersTemperature = []
 
         self.surfaceTemp = []
         self.sedimentYield = []
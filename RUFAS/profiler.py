@@ -0,0 +1,147 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: profiler.py
+Description: Accumulates the wall time spent in the routines of a simulation
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import contextlib
+import contextvars
+import time as timer
+
+# Profiler of the simulation running in the current thread/context, if any.
+# Used to time code that has no access to the simulation (e.g. LP solves)
+_active = contextvars.ContextVar('active_profiler', default=None)
+
+#-------------------------------------------------------------------------------
+# Function: section
+#-------------------------------------------------------------------------------
+@contextlib.contextmanager
+def section(name):
+    '''Times the enclosed block under the given name.
+
+    The time is added to the profiler of the simulation running in the current
+    context. Does nothing if no profiled simulation is running.
+    '''
+
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+
+    t_start = timer.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add(name, timer.perf_counter() - t_start)
+
+#-------------------------------------------------------------------------------
+# Class: Profiler
+#-------------------------------------------------------------------------------
+class Profiler():
+    '''Accumulates wall time and number of calls per routine of a simulation.
+
+    Routines are timed by replacing them with the wrapper returned by wrap(),
+    so routines that are not wrapped cost nothing extra. Code without access
+    to the simulation is timed with section(), while the profiler is
+    activated with activate().
+    '''
+
+    def __init__(self):
+
+        self.times = {}  # {routine name: total wall time (seconds)}
+        self.calls = {}  # {routine name: number of calls}
+        self.total = 0.0  # wall time of the whole simulation (seconds)
+
+    #---------------------------------------------------------------------------
+    # Method: add
+    #---------------------------------------------------------------------------
+    def add(self, name, elapsed):
+        '''Adds a call of the routine that took the time given (seconds).'''
+
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    #---------------------------------------------------------------------------
+    # Method: wrap
+    #---------------------------------------------------------------------------
+    def wrap(self, name, function):
+        '''Returns the function wrapped to be timed under the given name.'''
+
+        times, calls, clock = self.times, self.calls, timer.perf_counter
+        times.setdefault(name, 0.0)
+        calls.setdefault(name, 0)
+
+        def timed(*args, **kwargs):
+            t_start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                times[name] += clock() - t_start
+                calls[name] += 1
+
+        return timed
+
+    #---------------------------------------------------------------------------
+    # Method: activate
+    #---------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def activate(self):
+        '''Makes this the profiler used by section() in the enclosed block.
+
+        The wall time of the block is added to the total.
+        '''
+
+        token = _active.set(self)
+        t_start = timer.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total += timer.perf_counter() - t_start
+            _active.reset(token)
+
+    #---------------------------------------------------------------------------
+    # Method: to_dict
+    #---------------------------------------------------------------------------
+    def to_dict(self):
+        '''Returns the timings as a dictionary.
+
+        Returns:
+            dict: {
+                   'total': wall time of the simulation (seconds)
+                   'routines': {routine name: {'time': seconds,
+                                               'calls': number of calls}}
+                  }
+        '''
+
+        return {'total': self.total,
+                'routines': {name: {'time': self.times[name],
+                                    'calls': self.calls[name]}
+                             for name in self.times}}
+
+    #---------------------------------------------------------------------------
+    # Method: to_str
+    #---------------------------------------------------------------------------
+    def to_str(self):
+        '''Returns a table of the timings, slowest routine first.'''
+
+        names = sorted(self.times, key=self.times.get, reverse=True)
+        width = max([len(name) for name in names] + [len("Routine")])
+        total = self.total or sum(self.times.values()) or 1.0
+
+        text = "{:<{w}}  {:>10}  {:>12}  {:>12}  {:>6}\n".format(
+               "Routine", "Calls", "Total (s)", "Per Call (us)", "%", w=width)
+
+        for name in names:
+            calls = self.calls[name]
+            text += "{:<{w}}  {:>10}  {:>12.4f}  {:>12.2f}  {:>6.1f}\n".format(
+                    name, calls, self.times[name],
+                    1e6 * self.times[name] / calls if calls else 0.0,
+                    100 * self.times[name] / total, w=width)
+
+        text += "{:<{w}}  {:>10}  {:>12.4f}\n".format(
+                "Whole simulation", "", self.total, w=width)
+
+        return text
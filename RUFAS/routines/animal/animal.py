@@ -7,6 +7,8 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 '''
 ################################################################################
 
+import copy
+
 from RUFAS.routines.animal import ration
 
 #-------------------------------------------------------------------------------
@@ -143,6 +145,20 @@ class Animal():
         '''
         return (day % self.ration_formulation_interval) == 1
 
+    #---------------------------------------------------------------------------
+    # Method: snapshot
+    #---------------------------------------------------------------------------
+    def snapshot(self):
+        '''Returns a copy of the attributes of the animal (incl. the ration).'''
+        return copy.deepcopy(vars(self))
+
+    #---------------------------------------------------------------------------
+    # Method: restore
+    #---------------------------------------------------------------------------
+    def restore(self, snapshot):
+        '''Sets the animal back to the state in a snapshot.'''
+        vars(self).update(copy.deepcopy(snapshot))
+
     #---------------------------------------------------------------------------
     # Method: annual_reset
     #---------------------------------------------------------------------------
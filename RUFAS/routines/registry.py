@@ -0,0 +1,157 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: registry.py
+Description: Registry of the daily routines a simulation can run
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import functools
+
+from RUFAS.routines.soil import (daily_soil_routine, daily_soil_update,
+                                 daily_nitrogen_cycling_routine,
+                                 daily_nitrogen_update,
+                                 daily_phosphorus_cycling_routine,
+                                 daily_phosphorus_update)
+from RUFAS.routines.soil import forcing, profile
+from RUFAS.routines.animal import daily_animal_routine, daily_animal_update
+
+#
+# The routines that can be run every day, in the order they run in.
+#     name: (daily routine, its arguments, daily update, its arguments)
+# The daily routines of all active routines run first, then the daily reports
+# are updated, then the daily updates run. Arguments are the names of the
+# simulation objects passed to the functions, see build().
+#
+# The crop routines are not registered, they do not run yet.
+#
+ROUTINES = {
+    'soil': (daily_soil_routine, ('soil', 'forcing', 'time'),
+             daily_soil_update, ('soil', 'weather', 'time')),
+    'nitrogen': (daily_nitrogen_cycling_routine, ('soil', 'time', 'weather'),
+                 daily_nitrogen_update, ('soil', 'time', 'weather')),
+    'phosphorus': (daily_phosphorus_cycling_routine,
+                   ('soil', 'time', 'weather', 'config'),
+                   daily_phosphorus_update, ('soil', 'time', 'weather')),
+    'animal': (daily_animal_routine, ('animal', 'feed', 'weather', 'time'),
+               daily_animal_update, ('animal', 'weather', 'time')),
+}
+
+#
+# The routines that run on the SoilProfile instead of the Soil objects when
+# the soil profile is enabled (see Config.soil_profile), same format as
+# ROUTINES. 'profile' is the SoilProfile of the soil.
+#
+PROFILE_ROUTINES = {
+    'soil': (profile.daily_soil_routine, ('profile', 'forcing', 'time'),
+             profile.daily_soil_update, ('profile', 'weather', 'time')),
+    'nitrogen': (profile.daily_nitrogen_cycling_routine,
+                 ('profile', 'time', 'weather'),
+                 profile.daily_nitrogen_update, ('profile', 'time', 'weather')),
+}
+
+# Routines run when the input file does not choose
+DEFAULT_ROUTINES = ('soil', 'nitrogen')
+
+# Soil layers from which the routines run on the soil profile when the input
+# file does not choose (see Config.soil_profile). With fewer layers, the array
+# operations of the profile cost more than the loops of the Soil objects over
+# their layers, see tests/b_scaling.py.
+PROFILE_LAYERS = 20
+
+#
+# The weather attributes each routine reads (see Weather.COLUMNS), only the
+# ones read by an active routine (or report) are loaded. The soil routine
+# reads the weather through its forcing.
+#
+WEATHER = {
+    'soil': forcing.INPUTS,
+    'nitrogen': ('rainfall', 'addedN'),
+    'phosphorus': (),
+    'animal': (),
+}
+
+#-------------------------------------------------------------------------------
+# Function: build
+#-------------------------------------------------------------------------------
+def build(names, objects, use_profile=False):
+    '''Binds the functions of the routines given to the simulation objects.
+
+    Done once per simulation, so that running a routine every day is a single
+    call without arguments, and routines that are not active cost nothing.
+
+    Args:
+        names (list[str]): Names of the active routines
+        objects (dict): {name: simulation object} for the arguments of the
+            routines, e.g. {'soil': state.soil, 'weather': weather, ...}.
+            'forcing' is the Forcing of the weather, see forcing.py
+        use_profile (bool, optional): Run the routines of PROFILE_ROUTINES
+            instead of those of ROUTINES
+
+    Returns:
+        tuple: (daily routines, daily updates), lists of (function name,
+            function bound to its arguments) in the order they run in
+    '''
+
+    daily_routines = []
+    daily_updates = []
+
+    for name, functions in ROUTINES.items():
+        if name not in names:
+            continue
+
+        if use_profile and name in PROFILE_ROUTINES:
+            functions = PROFILE_ROUTINES[name]
+        routine, routine_args, update, update_args = functions
+
+        daily_routines.append((routine.__name__, bind(routine, routine_args,
+                                                      objects)))
+        daily_updates.append((update.__name__, bind(update, update_args,
+                                                    objects)))
+
+    return daily_routines, daily_updates
+
+#-------------------------------------------------------------------------------
+# Function: default_profile
+#-------------------------------------------------------------------------------
+def default_profile(names, layers):
+    '''Returns whether the routines given run on the soil profile by default.
+
+    They do for soils of PROFILE_LAYERS layers or more, unless one of them
+    uses the soil and does not run on the profile.
+
+    Args:
+        names (list[str]): Names of the routines
+        layers (int): Number of soil layers
+
+    Returns:
+        bool: Whether to run the routines on the soil profile
+    '''
+
+    return layers >= PROFILE_LAYERS and all(
+        name in PROFILE_ROUTINES or 'soil' not in ROUTINES[name][1]
+        for name in names)
+
+#-------------------------------------------------------------------------------
+# Function: weather_used
+#-------------------------------------------------------------------------------
+def weather_used(names):
+    '''Returns the weather attributes read by the routines given.
+
+    Args:
+        names (list[str]): Names of the routines
+
+    Returns:
+        set[str]: The weather attributes, see WEATHER
+    '''
+
+    return {attribute for name in names for attribute in WEATHER[name]}
+
+#-------------------------------------------------------------------------------
+# Function: bind
+#-------------------------------------------------------------------------------
+def bind(function, args, objects):
+    '''Returns the function with the simulation objects named as arguments.'''
+
+    return functools.partial(function, *[objects[arg] for arg in args])
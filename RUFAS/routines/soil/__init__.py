@@ -1,3 +1,4 @@
 from .soil import Soil, daily_soil_routine, daily_soil_update
+from .forcing import Forcing
 from .nitrogen_cycling import daily_nitrogen_cycling_routine, daily_nitrogen_update
 from .phosphorus_cycling import daily_phosphorus_cycling_routine, daily_phosphorus_update
\ No newline at end of file
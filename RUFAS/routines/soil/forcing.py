@@ -0,0 +1,141 @@
+################################################################################
+#
+# RUFAS: Ruminant Farm Systems Model
+#
+# forcing.py - Daily values of the soil routines that only depend on the weather
+#
+# Potential evapotranspiration, the soil cover factors and the rainfall and
+# cover terms of soil erosion only depend on the weather of the day. They are
+# evaluated with array operations for all the days of the simulation before
+# it runs, and the daily soil routines only read them. Values combining the
+# weather with soil parameters (e.g. the albedo) are left to the routines, so
+# that all the farms of an ensemble share the same forcing.
+#
+# Authors: Kass Chupongstimun
+#          Jit Patil
+#
+################################################################################
+
+from types import SimpleNamespace
+
+import numpy as np
+
+#------------------------------------------------------------------------------
+# Class: Forcing
+# The daily values of the years of a weather, computed one year at a time as
+# the simulation reaches it. Only the values of the current year are held, so
+# the forcing takes the same small memory however many years are simulated,
+# and the weather data shared by the simulations of a process (or the workers
+# of a batch, see weather_registry) is never copied. Nothing is computed when
+# the soil routine is not active (its weather attributes are then not loaded).
+#------------------------------------------------------------------------------
+class Forcing():
+
+    def __init__(self, weather):
+
+        self.weather = weather
+
+        # The year (starting at 0) of the values held, and its values
+        self.first = 0
+        self.current = None
+
+    #--------------------------------------------------------------------------
+    # Function: year
+    # Returns the values of a year (starting at 0), lists of 365 daily values
+    #--------------------------------------------------------------------------
+    def year(self, year):
+
+        if self.current is None or self.first != year:
+            values = compute({attribute: np.asarray(getattr(
+                                  self.weather, attribute)[year])
+                              for attribute in INPUTS})
+
+            # lists of floats are faster to read a day at a time than arrays
+            self.current = SimpleNamespace(**{
+                name: array.tolist() for name, array in vars(values).items()})
+            self.first = year
+
+        return self.current
+
+# Weather attributes the forcing is computed from
+INPUTS = ('rainfall', 'tMax', 'tMin', 'tAvg', 'biomass', 'radiation')
+
+#------------------------------------------------------------------------------
+# Function: compute
+# Evaluates the forcing for days of weather. Takes arrays of the weather
+# attributes (of any shape, the last axis being the julian day), returns
+# arrays of the same shape.
+#------------------------------------------------------------------------------
+def compute(weather):
+
+    rainfall = weather['rainfall']
+    tMax = weather['tMax']
+    tMin = weather['tMin']
+    tAvg = weather['tAvg']
+    biomass = weather['biomass']
+    radiation = weather['radiation']
+
+    # julian day of each day
+    day = np.arange(1, rainfall.shape[-1]+1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+    # Evapotranspiration, see Soil.dailyEvapotranspiration()
+        # latent heat of vaporization (MJ*kg^-1)
+        LHV = 2.501 - 2.361*(10**(-3))*tAvg
+
+        # extraterrestrial radiation (MJ*m^-2*d^-1) --> MAKE INPUT VARIABLE
+        H0 = radiation
+
+        # potential evapotranspiration (mm*d^-1)
+        E0 = np.maximum(0.001, 0.0023*H0*(tMax-tMin)**0.5*
+                        (tAvg + 17.8)/LHV)
+
+        # Leaf Area Index (calculated in Crop Growth Section)
+        LAI = biomass / 1500
+
+        # maximum transpiration on a given day (mm H2O)
+        # The actual amount of transpiration may be less than this maximum
+        # amount due to lack of available water in the rooting depth of the
+        # soil profile.
+        Etrans = np.where((LAI >= 0) & (LAI <= 3.0),
+                          (E0 * np.round(LAI,3)) / 3.0, E0)
+
+        # soil cover index
+        soilCov = np.exp(-5.0 * ((10)**(-5)) * biomass)
+
+        # maximum soil evaporation/sublimation on a given day (mm H2O)
+        maxEsoil = (np.round(E0,3) - Etrans) * (soilCov)
+        Esoil = np.minimum(maxEsoil, ((maxEsoil*E0)/(maxEsoil + Etrans)))
+
+    # Soil erosion, see Soil.dailySoilErosion()
+        # log(1 - alphaMean), alphaMean being the mean fraction of daily rain
+        # falling during the time of concentration
+        alphaMean = (0.02083 + (1 - np.exp(-125 / (rainfall + 5))))/2
+        alphaLog = np.log(1 - alphaMean)
+
+        # C is USLE cover and management factor
+        # 0.05 is the minimum value for C. This is an estimate.
+        # 250 (COVER) NEEDS TO BE CHANGED (BIOMASS)
+        C = np.exp((np.log(0.8) - np.log(0.05)) *
+                   np.exp(-0.00115 * biomass) + np.log(0.05))
+
+    # Soil temperature, see Soil.updateSoilTemperature()
+        # soil cover index
+        cover = np.exp(-0.00005 * biomass)
+
+        # weight factor taking snow cover into account
+        coverFactor = (biomass / (biomass + np.exp(7.563-0.0001297 *
+                                                   (-biomass))))
+
+        # snow water content on the day (mm)
+        SNOW = np.where((day > 300) | (day < 95), 0.8, 0)
+        snowFactor = (SNOW*10 / (SNOW*10 + np.exp(6.055-0.3002* SNOW*10)))
+
+        # used cover factor
+        bcv = np.maximum(coverFactor, snowFactor)
+
+    return SimpleNamespace(rainfall=rainfall, E0=E0, Etrans=Etrans,
+                           maxEsoil=maxEsoil, Esoil=Esoil, alphaLog=alphaLog,
+                           C=C, cover=cover, bcv=bcv, radiation=radiation,
+                           tAvg=tAvg)
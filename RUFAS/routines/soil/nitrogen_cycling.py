@@ -18,7 +18,7 @@ import math
 #------------------------------------------------------------------------------
 def daily_nitrogen_cycling_routine(soil, time, weather):
     daily_soil_nitrogen(soil, time.day, time.year,
-                        float(weather.rainfall[time.year-1][time.day-1]))
+                        float(weather.rainfall[time.year-1, time.day-1]))
 
 
 #------------------------------------------------------------------------------
@@ -27,7 +27,7 @@ def daily_nitrogen_cycling_routine(soil, time, weather):
 #------------------------------------------------------------------------------
 def daily_nitrogen_update(soil, time, weather):
     daily_soil_nitrogen_update(soil, time.day, time.year,
-                    float(weather.addedN[time.year-1][time.day-1]))
+                    float(weather.addedN[time.year-1, time.day-1]))
 
 
 #------------------------------------------------------------------------------
@@ -43,6 +43,10 @@ def daily_nitrogen_update(soil, time, weather):
 #------------------------------------------------------------------------------
 def daily_soil_nitrogen(soil, jday, year, rainfall):
 
+    # coefficients that only depend on parameters (see
+    # Soil.calculateCoefficients())
+    c = soil.getCoefficients()
+
     # FOR each soil layer
     for x in range(0, len(soil.listOfSoilLayers)):
 
@@ -140,14 +144,9 @@ def daily_soil_nitrogen(soil, jday, year, rainfall):
             nitrTFac = 0.41 * (soilTemp - 5) / 10
         nitrTFac = min(1.0, nitrTFac)
 
-        # volatilization depth factor is calculated as:
-        depthFac = 0.9500
-        if x != 0:
-            # depth to the midpoint of the soil layer (mm)
-            midpointDepth = (soil.listOfSoilLayers[x-1].bottomDepth
-                             + soil.listOfSoilLayers[x].bottomDepth) / 2
-            depthFac = 1 - (midpointDepth / (midpointDepth + math.exp(4.706 - 0.0305
-                                                             * midpointDepth)))
+        # volatilization depth factor, from the depth to the midpoint of the
+        # soil layer
+        depthFac = c.depthFac[x]
 
         # volatilization cation exchange factor
         CECFac = soil.listOfSoilLayers[x].volatileExchangeFactor
@@ -125,7 +125,6 @@ def soilChem(soil):
                     14.0*10000.0*soil.listOfSoilLayers[x].bulkDensity*
                     soil.listOfSoilLayers[x].depth*0.1)   
         
-        print("HI")
 
 #------------------------------------------------------------------------------
 # Function: initializePhosphorusInputs
@@ -247,7 +246,6 @@ def initializePhosphorusInputs(soil, time, weather, config):
             soil.yieldFactor.append((7500.0-9000.0)/31.0+soil.yieldFactor
                                     [len(soil.yieldFactor)-1]) 
             
-    print("HI")
 
 #------------------------------------------------------------------------------
 # Function: uptake
@@ -255,11 +253,15 @@ def initializePhosphorusInputs(soil, time, weather, config):
 #------------------------------------------------------------------------------
 def uptake(pUptake, soil, config):
     for i in range(0, len(soil.cropPUptakes)):
+        # uptakes of years that are not simulated are ignored
+        if not (config.startYear <= soil.cropPUptakes[i].uptakeYear
+                <= config.endYear):
+            continue
+
         if(soil.cropPUptakes[i].uptakeYear == config.startYear):
             for j in range(0, 365):
                 pUptake[soil.cropPUptakes[i].uptakeYear][j] = (
                     soil.cropPUptakes[i].pUptake/364)
-                print(pUptake[soil.cropPUptakes[i].uptakeYear][j])
         
         elif(soil.cropPUptakes[i].uptakeYear == config.endYear):
             for j in range(0, 365):
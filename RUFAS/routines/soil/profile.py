@@ -0,0 +1,235 @@
+################################################################################
+#
+# RUFAS: Ruminant Farm Systems Model
+#
+# profile.py - Soil state held as arrays, one array per layer attribute
+#
+# A SoilProfile holds the state of a soil (or of many soils) the way the
+# routines of vectorized.py use it: each attribute of Soil.SoilLayer is a
+# contiguous array over the layers, so each daily routine is a few array
+# expressions over the whole profile rather than a loop over its layers. The
+# dependencies of a layer on the layer above are shifted arrays (see
+# vectorized.previous_layer()) or cumulative sums (vectorized.layer_sum()).
+#
+# The profile is the state of the soil for the whole run. The Soil objects are
+# only read to start the profile, and written back when something needs their
+# values: the soil attributes for the daily reports, which read the layer
+# attributes from the arrays (see layer_values()), and all the attributes at
+# the end of the year, for the annual reports and checkpoints.
+#
+# Authors: Kass Chupongstimun
+#          Jit Patil
+#
+################################################################################
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from RUFAS.routines.soil import vectorized
+from RUFAS.routines.soil.soil import attributes_of
+
+#------------------------------------------------------------------------------
+# Class: SoilProfile
+# The state of soils in arrays:
+#     soil   - soil attributes, arrays of shape (soils,)
+#     layers - soil layer attributes, arrays of shape (soils, layers)
+# All the soils must have the same number of layers.
+#------------------------------------------------------------------------------
+class SoilProfile():
+
+    def __init__(self, soils):
+
+        self.read(soils)
+
+    #--------------------------------------------------------------------------
+    # Function: read
+    # Sets the arrays to the current values of the Soil objects (e.g. after
+    # the soil is spun up, or restored from a checkpoint)
+    #--------------------------------------------------------------------------
+    def read(self, soils):
+
+        if len({len(soil.listOfSoilLayers) for soil in soils}) > 1:
+            raise ValueError("All soils must have the same number of layers")
+
+        # the Soil objects, written back by write()
+        self.soils = soils
+
+        self.soil = stack([numbers(vars(soil)) for soil in soils])
+        self.layers = stack([numbers(attributes_of(layer)) for soil in soils
+                             for layer in soil.listOfSoilLayers],
+                            shape=(len(soils), -1))
+
+        # the attributes of the Soil objects, written back by write(), and the
+        # values of the layer attributes last written (most of them, e.g. the
+        # layer parameters, do not change from day to day), as bytes: cheaper
+        # to compare than arrays, and NaN is equal to itself
+        self.soil_names = tuple(vars(self.soil))
+        self.layer_names = tuple(vars(self.layers))
+        self.written = {name: values.tobytes()
+                        for name, values in vars(self.layers).items()}
+
+        # the values of the daily routines that only depend on the parameters
+        # (see vectorized.coefficients())
+        self.coefficients = vectorized.coefficients(self.soil, self.layers)
+
+        # the layer attributes that are int in some layer (until written with
+        # values that are not)
+        self.ints = {name for soil in soils for layer in soil.listOfSoilLayers
+                     for name, value in attributes_of(layer).items()
+                     if type(value) is int}
+
+        # whether the attributes of CLAMPED were clamped since the arrays were
+        # read (by the daily nitrogen update)
+        self.clamped = False
+
+    #--------------------------------------------------------------------------
+    # Function: write
+    # Sets the attributes of the Soil objects to the values of the arrays, all
+    # of them or those named. Values are int where the routines of the Soil
+    # objects make them int, so the reports print them the same: whole numbers
+    # in the attributes that are int, and zeros of the attributes clamped at 0
+    # (see CLAMPED) once clamped.
+    #--------------------------------------------------------------------------
+    def write(self, names=None):
+
+        soils = self.soils
+        soil_names, layer_names = self.soil_names, self.layer_names
+        if names is not None:
+            names = set(names)
+            soil_names = [name for name in soil_names if name in names]
+            layer_names = [name for name in layer_names if name in names]
+
+        clamped = CLAMPED['soil'] if self.clamped else ()
+        for n, soil in enumerate(soils):
+            attributes = vars(soil)
+            for name in soil_names:
+                value = getattr(self.soil, name).item(n)
+                if type(attributes[name]) is int or name in clamped:
+                    value = number(value, attributes[name], name in clamped)
+                attributes[name] = value
+
+        for name in layer_names:
+            values = getattr(self.layers, name)
+            written = values.tobytes()
+            if written == self.written[name]:
+                continue
+            self.written[name] = written
+
+            clamped = self.clamped and name in CLAMPED['layers']
+            for soil, soil_values in zip(soils, values.tolist()):
+                if name in self.ints or clamped:
+                    for layer, value in zip(soil.listOfSoilLayers,
+                                            soil_values):
+                        setattr(layer, name,
+                                number(value, getattr(layer, name), clamped))
+                else:
+                    for layer, value in zip(soil.listOfSoilLayers,
+                                            soil_values):
+                        setattr(layer, name, value)
+
+            # a value no longer int never is again (see number())
+            if name in self.ints and not any(
+                    type(getattr(layer, name)) is int
+                    for soil in soils for layer in soil.listOfSoilLayers):
+                self.ints.discard(name)
+
+    #--------------------------------------------------------------------------
+    # Function: layer_values
+    # Returns the values of a layer attribute of the (first) soil, as write()
+    # would set them, read from the arrays rather than from the layers
+    #--------------------------------------------------------------------------
+    def layer_values(self, name):
+
+        if name in self.ints:
+            self.write((name,))
+            return [getattr(layer, name)
+                    for layer in self.soils[0].listOfSoilLayers]
+
+        values = getattr(self.layers, name)[0].tolist()
+        if self.clamped and name in CLAMPED['layers']:
+            return [0 if value == 0 else value for value in values]
+        return values
+
+#
+# Attributes the routines of the Soil objects set last with max(0, ...), which
+# makes them int 0 (not 0.0) when clamped
+#
+CLAMPED = {'soil': ('topLayerFreshN',),
+           'layers': ('NH4', 'stableN')}
+
+#------------------------------------------------------------------------------
+# Function: daily_soil_routine
+# See soil.daily_soil_routine()
+#------------------------------------------------------------------------------
+def daily_soil_routine(profile, forcing, time):
+
+    vectorized.daily_soil_routine(profile.soil, profile.layers,
+                                  profile.coefficients,
+                                  forcing.year(time.year-1), time.day)
+
+#------------------------------------------------------------------------------
+# Function: daily_soil_update
+# See soil.daily_soil_update()
+#------------------------------------------------------------------------------
+def daily_soil_update(profile, weather, time):
+
+    vectorized.daily_soil_update(profile.soil, profile.layers,
+        float(weather.rainfall[time.year-1, time.day-1]))
+
+#------------------------------------------------------------------------------
+# Function: daily_nitrogen_cycling_routine
+# See nitrogen_cycling.daily_nitrogen_cycling_routine()
+#------------------------------------------------------------------------------
+def daily_nitrogen_cycling_routine(profile, time, weather):
+
+    vectorized.daily_nitrogen_cycling_routine(profile.soil, profile.layers,
+        profile.coefficients, float(weather.rainfall[time.year-1, time.day-1]))
+
+#------------------------------------------------------------------------------
+# Function: daily_nitrogen_update
+# See nitrogen_cycling.daily_nitrogen_update()
+#------------------------------------------------------------------------------
+def daily_nitrogen_update(profile, time, weather):
+
+    vectorized.daily_nitrogen_update(profile.soil, profile.layers,
+        float(weather.addedN[time.year-1, time.day-1]))
+    profile.clamped = True
+
+#------------------------------------------------------------------------------
+# Function: numbers
+# Returns the attributes that are numbers (not booleans)
+#------------------------------------------------------------------------------
+def numbers(attributes):
+
+    return {name: value for name, value in attributes.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+#------------------------------------------------------------------------------
+# Function: number
+# Returns the value of an array as the type of the attribute it replaces, or
+# as int 0 for a zero of an attribute clamped at 0 (see CLAMPED)
+#------------------------------------------------------------------------------
+def number(value, old, clamped=False):
+
+    value = float(value)
+    if clamped:
+        return 0 if value == 0 else value
+    if type(old) is int and value.is_integer():
+        return int(value)
+    return value
+
+#------------------------------------------------------------------------------
+# Function: stack
+# Stacks the numeric attributes of objects into arrays, of the shape given.
+# Returns an array of the values of all the objects for each attribute that
+# all of them have.
+#------------------------------------------------------------------------------
+def stack(objects, shape=(-1,)):
+
+    names = [name for name in objects[0]
+             if all(name in obj for obj in objects)]
+
+    return SimpleNamespace(**{name: np.array([obj[name] for obj in objects],
+                                             dtype=float).reshape(shape)
+                              for name in names})
@@ -9,40 +9,40 @@
 #
 ################################################################################
 
+import copy
 import math
+import weakref
+import operator
+import itertools
+from types import SimpleNamespace
 
 #------------------------------------------------------------------------------
 # Function: daily_soil_routine
 # Executes all the daily soil routines
 #------------------------------------------------------------------------------
-def daily_soil_routine(soil, weather, time):
+def daily_soil_routine(soil, forcing, time):
+
+    # weather of the day, and its forcing (see forcing.py)
+    f = forcing.year(time.year-1)
+    d = time.day-1
+    rainfall = f.rainfall[d]
 
     # calculate and update the temperature of the soil layers
-    soil.updateSoilTemperature(
-        weather.biomass[time.year-1][time.day-1],
-        weather.radiation[time.year-1][time.day-1],
-        weather.tAvg[time.year-1][time.day-1],
-        8.41,
-        time.day)
+    soil.updateSoilTemperature(f.cover[d], f.bcv[d], f.radiation[d],
+                               f.tAvg[d], 8.41)
 
     # calculate daily runoff
-    soil.dailyInfiltration(weather.rainfall[time.year-1][time.day-1])
+    soil.dailyInfiltration(rainfall)
 
     # calculate daily transpiration
-    soil.dailyEvapotranspiration(
-        weather.tMax[time.year-1][time.day-1]
-        , weather.tMin[time.year-1][time.day-1]
-        , weather.tAvg[time.year-1][time.day-1]
-        , weather.biomass[time.year-1][time.day-1]
-        , weather.radiation[time.year-1][time.day-1])
+    soil.dailyEvapotranspiration(f.E0[d], f.Etrans[d], f.maxEsoil[d],
+                                 f.Esoil[d])
 
     # calculate daily percolation
     soil.dailyPercolation()
 
     # calculate daily soil erosion
-    soil.dailySoilErosion(weather.rainfall[time.year-1][time.day-1],
-                          weather.biomass[time.year-1][time.day-1],
-                          time.day)
+    soil.dailySoilErosion(rainfall, f.alphaLog[d], f.C[d], time.day)
 
 
 #------------------------------------------------------------------------------
@@ -52,7 +52,45 @@ def daily_soil_routine(soil, weather, time):
 def daily_soil_update(soil, weather, time):
 
     # update current soil water
-    soil.updateCurrentSoilWater(weather.rainfall[time.year-1][time.day-1])
+    soil.updateCurrentSoilWater(
+        float(weather.rainfall[time.year-1, time.day-1]))
+
+#------------------------------------------------------------------------------
+# Function: attributes_of
+# Returns the attributes of an object as a dictionary, for objects with slots
+# (e.g. Soil.SoilLayer) as for objects with a __dict__ (then the __dict__)
+#------------------------------------------------------------------------------
+def attributes_of(obj):
+
+    if hasattr(obj, '__dict__'):
+        return vars(obj)
+
+    names = getattr(type(obj), 'attributes', type(obj).__slots__)
+    return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+#------------------------------------------------------------------------------
+# Function: parameter
+# Returns a property for a parameter the coefficients of the daily routines
+# depend on (see Soil.calculateCoefficients()), setting it invalidates them.
+# The value is kept in the __dict__ under the name of the parameter, or for
+# objects with slots in the slot of that name prefixed with '_'.
+#------------------------------------------------------------------------------
+def parameter(name, slotted=False):
+
+    if slotted:
+        slot = '_' + name
+        fget = operator.attrgetter(slot)
+        def fset(obj, value):
+            setattr(obj, slot, value)
+            obj.invalidateCoefficients()
+    else:
+        def fget(obj):
+            return obj.__dict__[name]
+        def fset(obj, value):
+            obj.__dict__[name] = value
+            obj.invalidateCoefficients()
+
+    return property(fget, fset)
 
 #-------------------------------------------------------------------------------
 # Class: Soil
@@ -60,15 +98,31 @@ def daily_soil_update(soil, weather, time):
 #-------------------------------------------------------------------------------
 class Soil():
 
-    listOfSoilLayers = []
-    fertilizerApplications = []
-    manureApplications = []
-    tillageOperations = []
-    cropPUptakes = []
+    # names of the collections of sub-objects of the soil, lists of each soil
+    collections = ('listOfSoilLayers', 'fertilizerApplications',
+                   'manureApplications', 'tillageOperations', 'cropPUptakes')
 
+    # names of the attributes derived from the others (not part of the state)
+    derived = ('coefficients',)
+
+    # parameters of the coefficients, invalidating them when set
+    CN2 = parameter('CN2')
+    profileDepth = parameter('profileDepth')
+    fieldSlope = parameter('fieldSlope')
+    slopeLength = parameter('slopeLength')
+    manning = parameter('manning')
+    orgc = parameter('orgc')
+    sand = parameter('sand')
+    silt = parameter('silt')
 
     def __init__(self, data, config):
 
+        self.listOfSoilLayers = []
+        self.fertilizerApplications = []
+        self.manureApplications = []
+        self.tillageOperations = []
+        self.cropPUptakes = []
+
         # Values Initialized by Input
         self.profileDepth = data['ProfileDepth']
         self.CN2 = data['CN2'] # unitless, user-defined curve number (empirical)
@@ -89,7 +143,8 @@ class Soil():
 
         # create soil layers
         for layerName, layerData in data['SoilLayers'].items():
-            self.listOfSoilLayers.append(self.SoilLayer(layerName, layerData))
+            self.listOfSoilLayers.append(self.SoilLayer(layerName, layerData,
+                                                        self))
 
         # sort layers by bottomDepth
         self.listOfSoilLayers.sort(key=lambda x: x.bottomDepth)
@@ -204,15 +259,55 @@ class Soil():
                             self.listOfSoilLayers[x].bulkDensity *
                             self.listOfSoilLayers[x].depth) /100      
 
+        # coefficients of the daily routines that only depend on parameters
+        self.coefficients = self.calculateCoefficients()
+
 
     #---------------------------------------------------------------------------
     # Class: SoilLayer
     # An instance of this class represents a layer in the soil
+    # The attributes are slots, so that the many layers of large simulations
+    # carry no dictionary each. The parameters of the coefficients of the soil
+    # are properties, invalidating them when set (see parameter()).
     #---------------------------------------------------------------------------
     class SoilLayer():
 
-        def __init__(self, layerName, layerData):
-
+        # the attributes, in the order they are set in
+        attributes = ('name', 'bottomDepth', 'wiltingPoint', 'fieldCapacity',
+                     'saturation', 'depth', 'fcWater', 'satWater',
+                     'wiltingWater', 'currentSoilWaterMM', 'bulkDensity',
+                     'topEsoil', 'bottomEsoil', 'layerEsoil', 'temperature',
+                     'ksat', 'TT', 'perc', 'labileP', 'clay', 'orgC',
+                     'activeMineralRate', 'cationExclusionFraction',
+                     'denitrificationRate', 'NH4', 'NO3', 'orgN', 'activeN',
+                     'stableN', 'nMinAct', 'nitrification', 'volatilization',
+                     'denitrification', 'NO3Conc', 'NO3Perc', 'NH4Conc',
+                     'NH4Perc', 'activeNConc', 'activeNPerc', 'nTrans',
+                     'totNitriVolatil', 'fracActiveN', 'volatileExchangeFactor',
+                     'OMpercent', 'soilOC', 'psp', 'activeP', 'stableP',
+                     'orgP')
+
+        # the parameters of the coefficients, and the soil of the layer (a
+        # weak reference, so that the soil and its layers hold no reference
+        # cycle and are freed as soon as the simulation is)
+        parameters = ('bottomDepth', 'fieldCapacity', 'saturation', 'depth',
+                      'fcWater', 'wiltingWater', 'bulkDensity', 'ksat', 'clay')
+        __slots__ = (('soil',) + tuple(map('_'.__add__, parameters)) + tuple(
+                     itertools.filterfalse(parameters.__contains__, attributes)))
+
+        bottomDepth = parameter('bottomDepth', slotted=True)
+        fieldCapacity = parameter('fieldCapacity', slotted=True)
+        saturation = parameter('saturation', slotted=True)
+        depth = parameter('depth', slotted=True)
+        fcWater = parameter('fcWater', slotted=True)
+        wiltingWater = parameter('wiltingWater', slotted=True)
+        bulkDensity = parameter('bulkDensity', slotted=True)
+        ksat = parameter('ksat', slotted=True)
+        clay = parameter('clay', slotted=True)
+
+        def __init__(self, layerName, layerData, soil=None):
+
+            self.soil = None if soil is None else weakref.ref(soil)
             self.name = layerName
 
             self.bottomDepth = layerData['BottomDepth']
@@ -291,6 +386,15 @@ class Soil():
             self.activeP = 0.0
             self.stableP = 0.0
             self.orgP = 0.0
+
+        #-----------------------------------------------------------------------
+        # Function: invalidateCoefficients
+        # Invalidates the coefficients of the soil of the layer, if any
+        #-----------------------------------------------------------------------
+        def invalidateCoefficients(self):
+            soil = None if self.soil is None else self.soil()
+            if soil is not None:
+                soil.invalidateCoefficients()
       
       
     #---------------------------------------------------------------------------
@@ -299,7 +403,10 @@ class Soil():
     # of its application
     #---------------------------------------------------------------------------      
     class Fertilizer():
-        
+
+        __slots__ = ('name', 'appYear', 'appDay', 'fertPMass', 'depth',
+                     'percentOnSurface')
+
         def __init__(self, FertName, FertData):
             self.name = FertName
             self.appYear = FertData['Year']
@@ -314,7 +421,11 @@ class Soil():
     # of its application
     #---------------------------------------------------------------------------      
     class Manure():
-        
+
+        __slots__ = ('name', 'type', 'appYear', 'appDay', 'mass', 'totalP',
+                     'weip', 'weop', 'dryMatter', 'percentCover', 'depth',
+                     'percentOnSurface')
+
         def __init__(self, manureName, manureData):
             self.name = manureName
             self.type = manureData['Type']
@@ -336,7 +447,10 @@ class Soil():
     # of its application
     #---------------------------------------------------------------------------      
     class Tillage():
-        
+
+        __slots__ = ('name', 'appYear', 'appDay', 'percentIncorporate',
+                     'percentMixed', 'depth')
+
         def __init__(self, tillageName, tillageData):
             self.name = tillageName
             self.appYear = tillageData['Year']
@@ -351,7 +465,9 @@ class Soil():
     # of uptake
     #---------------------------------------------------------------------------      
     class CropPUptake():
-        
+
+        __slots__ = ('name', 'uptakeYear', 'pUptake')
+
         def __init__(self, uptakeName, uptakeData):
             self.name = uptakeName
             self.uptakeYear = uptakeData['Year']
@@ -421,41 +537,147 @@ class Soil():
         return totalWiltingWater
 
     #---------------------------------------------------------------------------
-    # Function: dailyInfiltration
-    # Uses curve number approach (equations taken from SWAT 2009 documentation)
+    # Function: getCoefficients
+    # Returns the coefficients of the daily routines that only depend on the
+    # parameters of the soil and of its layers (see calculateCoefficients()),
+    # computing them again if they were invalidated
     #---------------------------------------------------------------------------
-    def dailyInfiltration(self, dailyRainfall):
+    def getCoefficients(self):
+        if self.coefficients is None:
+            self.coefficients = self.calculateCoefficients()
+        return self.coefficients
+
+    #---------------------------------------------------------------------------
+    # Function: invalidateCoefficients
+    # Called when a parameter of the soil or of a layer is set (e.g. CN2,
+    # bulkDensity, ksat, see parameter()), so that the coefficients are
+    # computed again
+    #---------------------------------------------------------------------------
+    def invalidateCoefficients(self):
+        self.coefficients = None
+
+    #---------------------------------------------------------------------------
+    # Function: calculateCoefficients
+    # Calculates the values of the daily routines that only depend on the
+    # parameters (the same equations, evaluated once rather than every day)
+    #---------------------------------------------------------------------------
+    def calculateCoefficients(self):
+        c = SimpleNamespace()
+        layers = self.listOfSoilLayers
 
+    # Infiltration, see dailyInfiltration()
         # curve number 1
-        cn1 = self.CN2 - (20 * (100 - self.CN2)) / (100
+        c.cn1 = self.CN2 - (20 * (100 - self.CN2)) / (100
                                                     - self.CN2 + math.exp(2.533
                                                     - 0.0636 * (100- self.CN2)))
         # curve number 3
-        cn3 = self.CN2 * math.exp(0.00673 * (100 - self.CN2))
+        c.cn3 = self.CN2 * math.exp(0.00673 * (100 - self.CN2))
 
         # maximum value of S on any given day (mm H2O)
-        sMax = 25.4 * ((1000 / cn1) - 10)
+        c.sMax = 25.4 * ((1000 / c.cn1) - 10)
 
-        s3 = 25.4*((1000/cn3) - 10)
+        c.s3 = 25.4*((1000/c.cn3) - 10)
 
         # amount of water in soil profile at field capacity (mm H2O)
-        FC = self.profileDepth * self.listOfSoilLayers[0].fieldCapacity
+        FC = self.profileDepth * layers[0].fieldCapacity
 
         # amount of water in soil profile at saturation (mm H2O)
-        SAT = self.profileDepth * self.listOfSoilLayers[0].saturation
-
-        # soil water content of entire profile, excluding water held at wilting
-        # point (mm H2O)
-        SW = self.getSumSoilWater() - self.getSumWiltingWater()
+        SAT = self.profileDepth * layers[0].saturation
 
         #shape coefficients
-        w2 = (math.log(FC /
-                      (1 -s3 * (1/sMax)) - FC) -math.log(
-                          SAT/(1-2.54*(1/sMax))- SAT
+        c.w2 = (math.log(FC /
+                      (1 -c.s3 * (1/c.sMax)) - FC) -math.log(
+                          SAT/(1-2.54*(1/c.sMax))- SAT
                           )) /(SAT - FC)
-        w1 = math.log((FC /
-                       (1 - (s3) * (1/sMax)))-
-                      FC)+ w2*FC
+        c.w1 = math.log((FC /
+                       (1 - (c.s3) * (1/c.sMax)))-
+                      FC)+ c.w2*FC
+
+        # total wilting water of the layers (mm H2O)
+        c.sumWiltingWater = self.getSumWiltingWater()
+
+    # Percolation, see dailyPercolation()
+        # travel time for percolation (h) of each layer
+        c.TT = [((layer.saturation * layer.depth) - layer.fcWater) /
+                layer.ksat for layer in layers]
+        t = 24 # time step (hours)
+
+        # fraction of the water available that percolates in a time step
+        c.percFraction = [1 - math.exp(-t/TT) for TT in c.TT]
+
+    # Soil erosion, see dailySoilErosion()
+        # time of concentration (h)
+        c.Tconc = ((self.slopeLength**0.6) * (self.manning**0.6)) / (
+            18 * (self.fieldSlope**0.3))
+
+        # gives low factors for soils with high sand contents and high values
+        # for soils with little sand
+        Fcsand = 0.2 + 0.3 * math.exp(-0.256 * self.sand * (1-
+                                                (self.silt/100)))
+
+        # gives low factors for soils with high clay to silt ratios
+        Fclsi = (self.silt / (layers[0].clay + self.silt))**0.3
+
+        # reduces soil erodibility for soils with high organic carbon content
+        Forgc = 1 - ((0.25 * self.orgc) / (self.orgc
+                            + math.exp(3.72 - 2.95 * self.orgc)))
+
+        # reduces soil erodibility for soils with high sand contents
+        Fsand = 1 - (0.7 * (1 - self.sand/100) / ((1 - self.sand/100) +
+                        math.exp(-5.51 + 22.9 * (1 / (self.sand/100)))))
+
+        # USLE soil erodibility factor (Mg MJ**-1 mm**-1)
+        c.K = Fcsand * Fclsi * Forgc * Fsand
+
+        # the exponential term m is calculated as...
+        m = 0.6 * (1 - math.exp(-35.835 * self.fieldSlope))
+
+        # angle of the slope
+        alphahill = math.tan(self.fieldSlope)
+
+        # USLE topographic factor
+        c.LS = ((self.slopeLength / 22.1)**m) * (65.41 * (math.sin(alphahill)**2)
+                    + 4.56 * math.sin(alphahill) + 0.065)
+
+    # Soil temperature, see updateSoilTemperature()
+        bd = layers[0].bulkDensity # soil bulk density (g/cm^3)
+
+        # denominator of the scaling factor for soil water
+        c.scaleDepth = (0.356-0.144*bd) * self.profileDepth
+
+        # maximum damping depth (mm), and log(500/ddmax)
+        c.ddmax = 1000 + (2500 * bd) / (bd + 686 * math.exp(-5.63 * bd))
+        c.ddLog = math.log(500/c.ddmax)
+
+        # depth at the center of each soil layer (mm)
+        c.midpointDepth = [layers[0].bottomDepth/2] + [
+            (layers[x].bottomDepth + layers[x-1].bottomDepth)/2
+            for x in range(1, len(layers))]
+
+    # Nitrogen cycling, see nitrogen_cycling.daily_soil_nitrogen()
+        # volatilization depth factor of each layer
+        c.depthFac = [0.9500] + [
+            1 - (z / (z + math.exp(4.706 - 0.0305 * z)))
+            for z in c.midpointDepth[1:]]
+
+        return c
+
+    #---------------------------------------------------------------------------
+    # Function: dailyInfiltration
+    # Uses curve number approach (equations taken from SWAT 2009 documentation)
+    #---------------------------------------------------------------------------
+    def dailyInfiltration(self, dailyRainfall):
+
+        # curve numbers, maximum value of S and shape coefficients (see
+        # calculateCoefficients())
+        c = self.getCoefficients()
+        sMax = c.sMax
+        w1 = c.w1
+        w2 = c.w2
+
+        # soil water content of entire profile, excluding water held at wilting
+        # point (mm H2O)
+        SW = self.getSumSoilWater() - c.sumWiltingWater
 
         # retention paramenter (mm H2O)
         s = sMax * (1 - (SW/(SW + math.exp(w1 - (w2)*(SW)))))
@@ -484,41 +706,19 @@ class Soil():
     # Step 3: Calculate Sublimation and Soil Evaporation
     # Step 4: Partition Esoil among different soil layers
     #---------------------------------------------------------------------------
-    def dailyEvapotranspiration(self, tMax, tMin, tAvg, biomass, radiation):
-
-    # Step 1: Calculate Potential Evapotranspiration
-        # extraterrestrial radiation (MJ*m^-2*d^-1) --> MAKE INPUT VARIABLE
-        H0 = float(radiation)
-
-        # latent heat of vaporization (MJ*kg^-1)
-        LHV = 2.501 - 2.361*(10**(-3))*float(tAvg)
+    def dailyEvapotranspiration(self, E0, Etrans, maxEsoil, Esoil):
 
+    # Steps 1 to 3 only depend on the weather, see forcing.py
         # potential evapotranspiration (mm*d^-1)
-        self.E0 = max(0.001, 0.0023*H0*(float(tMax)-float(tMin))**0.5*
-                      (float(tAvg) + 17.8)/LHV)
-
-    # Step 2: Calculate Crop Transpiration
-        # Leaf Area Index (calculated in Crop Growth Section)
-        LAI = float(biomass) / 1500
+        self.E0 = E0
 
         # maximum transpiration on a given day (mm H2O)
-        # The actual amount of transpiration may be less than this maximum
-        # amount due to lack of available water in the rooting depth of the
-        # soil profile.
-        if LAI >= 0 and LAI <= 3.0:
-            self.Etrans = (self.E0 * round(LAI,3)) / 3.0
-        else:
-            self.Etrans = self.E0
-
-    # Step 3: Calculate Sublimation and soil evaporation
-        # aboveground biomass and residue (kg*ha^-1)
-
-        # soil cover index
-        soilCov = math.exp(-5.0 * ((10)**(-5)) * float(biomass))
+        self.Etrans = Etrans
 
-        # maximum soil evaporation/sublimation on a given day (mm H2O)
-        Esoil = (round(self.E0,3) - self.Etrans) * (soilCov)
-        self.Esoil = min(Esoil, ((Esoil*self.E0)/(Esoil + self.Etrans)))
+        # soil evaporation/sublimation on a given day (mm H2O), the maximum
+        # soil evaporation/sublimation being partitioned among the layers
+        self.Esoil = Esoil
+        Esoil = maxEsoil
 
         # If snow is present and snow water is greater than Esoil, there is no
         # evaporation from soil. If snow water is less than Esoil, both soil
@@ -567,6 +767,9 @@ class Soil():
     #---------------------------------------------------------------------------
     def dailyPercolation(self):
 
+        # travel times and fractions percolating (see calculateCoefficients())
+        c = self.getCoefficients()
+
         # Calculate value of water available for percolation FOR each layer
         for x in range(0, len(self.listOfSoilLayers)):
             # Volume of water available for percolation (SWperc) in a soil layer
@@ -578,31 +781,26 @@ class Soil():
                           (self.listOfSoilLayers[x].fcWater))
 
             # travel time for percolation (h)
-            self.listOfSoilLayers[x].TT = (((self.listOfSoilLayers[x].saturation
-                    * self.listOfSoilLayers[x].depth)-
-                    self.listOfSoilLayers[x].fcWater)/
-                                               self.listOfSoilLayers[x].ksat)
-            t = 24 # time step (hours)
+            self.listOfSoilLayers[x].TT = c.TT[x]
 
             #amount of water that percolates
-            self.listOfSoilLayers[x].perc = (SWperc *
-                            (1 - math.exp(-t/self.listOfSoilLayers[x].TT)))
+            self.listOfSoilLayers[x].perc = SWperc * c.percFraction[x]
 
     #---------------------------------------------------------------------------
     # Function: dailySoilErosion
     # Use MUSLE approach (equations taken from SWAT 2009 documentation) to
     # determine soil erosion
     #---------------------------------------------------------------------------
-    def dailySoilErosion(self, rainfall, biomass, day):
-
-        # time of concentration (h)
-        Tconc = ((self.slopeLength**0.6) * (self.manning**0.6)) / (
-            18 * (self.fieldSlope**0.3))
+    def dailySoilErosion(self, rainfall, alphaLog, C, day):
 
-        alphaMean = (0.02083 + (1 - math.exp(-125 / (float(rainfall) + 5))))/2
+        # time of concentration (h), USLE soil erodibility factor K and
+        # topographic factor LS (see calculateCoefficients())
+        c = self.getCoefficients()
+        Tconc = c.Tconc
 
-        # fraction of daily rain during time of concentration
-        alpha = 1 - math.exp(2 * Tconc * math.log(1 - alphaMean))
+        # fraction of daily rain during time of concentration, alphaLog being
+        # log(1 - alphaMean) (see forcing.py)
+        alpha = 1 - math.exp(2 * Tconc * alphaLog)
 
         # rain amount during time of concentration (mm)
         Rtc = alpha * float(rainfall)
@@ -616,47 +814,12 @@ class Soil():
             Qpeak = ((self.runoff/float(rainfall)) * I *
                      self.fieldSize) / 3.6
 
-        # gives low factors for soils with high sand contents and high values
-        # for soils with little sand
-        Fcsand = 0.2 + 0.3 * math.exp(-0.256 * self.sand * (1-
-                                                (self.silt/100)))
-
-        # gives low factors for soils with high clay to silt ratios
-        Fclsi = (self.silt / (self.listOfSoilLayers[0].clay + self.silt))**0.3
-
-        # reduces soil erodibility for soils with high organic carbon content
-        Forgc = 1 - ((0.25 * self.orgc) / (self.orgc
-                            + math.exp(3.72 - 2.95 * self.orgc)))
-
-        # reduces soil erodibility for soils with high sand contents
-        Fsand = 1 - (0.7 * (1 - self.sand/100) / ((1 - self.sand/100) +
-                        math.exp(-5.51 + 22.9 * (1 / (self.sand/100)))))
-
-        # USLE soil erodibility factor (Mg MJ**-1 mm**-1)
-        K = Fcsand * Fclsi * Forgc * Fsand
-
-
-        # C is USLE cover and management factor
-        # 0.05 is the minimum value for C. This is an estimate.
-        # 250 (COVER) NEEDS TO BE CHANGED (BIOMASS)
-        C = math.exp((math.log(0.8) - math.log(0.05)) *
-                     math.exp(-0.00115 * float(biomass)) + math.log(0.05))
-
-
-        # the exponential term m is calculated as...
-        m = 0.6 * (1 - math.exp(-35.835 * self.fieldSlope))
-
-        # angle of the slope
-        alphahill = math.tan(self.fieldSlope)
-
-        # USLE topographic factor
-        LS = ((self.slopeLength / 22.1)**m) * (65.41 * (math.sin(alphahill)**2)
-                    + 4.56 * math.sin(alphahill) + 0.065)
+        # C is USLE cover and management factor (see forcing.py)
 
         # sediment yield on a given day (metric tons)
         # Qpeak is peak runoff rate (m3/sec)
         sed = 11.8 * ((self.runoff * Qpeak)**0.56
-                      ) * K * C * self.practiceFactor * LS
+                      ) * c.K * C * self.practiceFactor * c.LS
         self.sedimentYield = sed
 
         snowCorrectedSed = sed
@@ -670,19 +833,19 @@ class Soil():
     # Equations taken from SWAT 2009 documentation to determine temperature of
     # soil
     #---------------------------------------------------------------------------
-    def updateSoilTemperature(self, biomass, radiation, Tavg, TavgAnnual, day):
+    def updateSoilTemperature(self, cover, bcv, radiation, Tavg, TavgAnnual):
 
         albedoSoil = self.soilAlbedo # soil albedo constant
-        bd = self.listOfSoilLayers[0].bulkDensity # soil bulk density (g/cm^3)
-        CV = float(biomass) # above ground biomass and residue (kg/ha)
         Hday = float(radiation) # daily solar radiation (user input, MJ/m2)
         Tav = float(Tavg) # average daily temperature (oC)
         SW = self.getSumSoilWater() # total soil water in the profile (mm)
-        ztot = self.profileDepth # total soil profile depth
         Taair = TavgAnnual # Average annual air temperature (C)
 
-        # soil cover index
-        cover = math.exp(-0.00005 * float(CV))
+        # maximum damping depth and layer depths (see calculateCoefficients())
+        c = self.getCoefficients()
+
+        # The soil cover index and the cover factor (bcv, taking snow cover
+        # into account) only depend on the weather, see forcing.py
 
         # daily albedo
         albedo = 0.23 * (1 - cover) + albedoSoil * cover
@@ -693,45 +856,23 @@ class Soil():
         # Temperature of a bare soil surface (C)
         Tbare = Tav + radiate * Tav
 
-        # weight factor taking snow cover into account
-        coverFactor = (CV / (CV + math.exp(7.563-0.0001297 * (-CV))))
-
-        # snow water content on the current day (mm)
-        SNOW = 0
-        if day > 300 or day < 95:
-            SNOW = 0.8
-        snowFactor = (SNOW*10 / (SNOW*10 + math.exp(6.055-0.3002* SNOW*10)))
-
-        # used cover factor
-        bcv = max(coverFactor, snowFactor)
-
         # Daily soil surface temperature (C)
         self.Tsurf = (bcv * self.Tsurf) + ((1 - bcv) * Tbare)
 
         # scaling factor for soil water
-        scale = SW / ((0.356-0.144*bd) * ztot)
-
-        # maximum damping depth (mm)
-        ddmax = 1000 + (2500 * bd) / (bd + 686 * math.exp(-5.63 * bd))
+        scale = SW / c.scaleDepth
 
         # damping depth (mm)
-        dd = ddmax * math.exp(math.log(500/ddmax) * ((1-scale)/(1+scale))**2)
+        dd = c.ddmax * math.exp(c.ddLog * ((1-scale)/(1+scale))**2)
 
         # lag coefficient
         L = 0.8
 
-        # depth at the center of the soil layer
-        z = 0.0
-
         # Calculate soil temperature for each soil layer
         for x in range(0, len(self.listOfSoilLayers)):
 
-            # calculate depth at the center of the soil layer
-            if x == 0:
-                z = self.listOfSoilLayers[x].bottomDepth/2
-            else:
-                z = (self.listOfSoilLayers[x].bottomDepth +
-                     self.listOfSoilLayers[x-1].bottomDepth)/2
+            # depth at the center of the soil layer
+            z = c.midpointDepth[x]
 
             # soil temperature (C) at depth z (mm) on previous day
             TsoilPrev = self.listOfSoilLayers[x].temperature
@@ -776,5 +917,41 @@ class Soil():
                         -self.listOfSoilLayers[x].perc
                         +self.listOfSoilLayers[x-1].perc))
 
+    #---------------------------------------------------------------------------
+    # Function: snapshot
+    # Returns a copy of all the attributes of the soil and of its layers and
+    # applications, to be restored later by restore()
+    #---------------------------------------------------------------------------
+    def snapshot(self):
+        snapshot = {name: [copy.deepcopy(attributes_of(obj))
+                           for obj in getattr(self, name)]
+                    for name in self.collections}
+        snapshot['soil'] = copy.deepcopy({name: value for name, value
+                                          in vars(self).items()
+                                          if name not in self.collections
+                                          and name not in self.derived})
+        return snapshot
+
+    #---------------------------------------------------------------------------
+    # Function: restore
+    # Sets the soil back to the state in a snapshot taken by snapshot(). The
+    # soil must have the same layers and applications as the snapshotted soil.
+    #---------------------------------------------------------------------------
+    def restore(self, snapshot):
+        for name in self.collections:
+            objs = getattr(self, name)
+            if len(objs) != len(snapshot[name]):
+                raise ValueError("Snapshot has {} {}, soil has {}".format(
+                                 len(snapshot[name]), name, len(objs)))
+            for obj, attributes in zip(objs, snapshot[name]):
+                for attribute, value in copy.deepcopy(attributes).items():
+                    setattr(obj, attribute, value)
+
+        vars(self).update(copy.deepcopy(snapshot['soil']))
+
+        # the parameters may differ from those of the snapshot (set here
+        # without the properties of the soil parameters)
+        self.invalidateCoefficients()
+
     def annual_reset(self):
         pass
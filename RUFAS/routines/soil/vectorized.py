@@ -0,0 +1,593 @@
+################################################################################
+#
+# RUFAS: Ruminant Farm Systems Model
+#
+# vectorized.py - Soil and soil nitrogen routines on arrays of farms
+#
+# The routines of soil.py and nitrogen_cycling.py, for many farms sharing the
+# same weather. The soil state is held in two objects of NumPy arrays named
+# after the attributes of Soil and Soil.SoilLayer:
+#     soil   - soil attributes, arrays of shape (farms,)
+#     layers - soil layer attributes, arrays of shape (farms, layers)
+# A single soil is simulated the same way when held in a SoilProfile (see
+# profile.py), each routine then being a few array operations over its layers.
+# The equations are evaluated in the same order as in the per-farm routines,
+# so every farm gets the same results as when simulated alone (up to the last
+# digits of exp(), log() and powers).
+#
+# The terms that only depend on the parameters of the soils are computed once,
+# by coefficients(), and passed to the daily routines (see
+# Soil.calculateCoefficients()).
+#
+# Authors: Kass Chupongstimun
+#          Jit Patil
+#
+################################################################################
+
+import math
+from types import SimpleNamespace
+
+import numpy as np
+
+#------------------------------------------------------------------------------
+# Function: coefficients
+# Calculates the values of the daily routines that only depend on the
+# parameters, for all the farms (see Soil.calculateCoefficients()). To be
+# calculated again when a parameter changes.
+#------------------------------------------------------------------------------
+def coefficients(soil, layers):
+
+    c = SimpleNamespace()
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+    # Infiltration, see daily_infiltration()
+        CN2 = soil.CN2
+
+        # curve numbers 1 and 3
+        cn1 = CN2 - (20 * (100 - CN2)) / (100 - CN2 + np.exp(2.533
+                                                    - 0.0636 * (100 - CN2)))
+        cn3 = CN2 * np.exp(0.00673 * (100 - CN2))
+
+        # maximum value of S on any given day (mm H2O)
+        c.sMax = 25.4 * ((1000 / cn1) - 10)
+
+        s3 = 25.4*((1000/cn3) - 10)
+
+        # amount of water in soil profile at field capacity and saturation
+        # (mm H2O)
+        FC = soil.profileDepth * layers.fieldCapacity[:, 0]
+        SAT = soil.profileDepth * layers.saturation[:, 0]
+
+        #shape coefficients
+        c.w2 = (np.log(FC / (1 - s3 * (1/c.sMax)) - FC) - np.log(
+                SAT/(1-2.54*(1/c.sMax)) - SAT)) / (SAT - FC)
+        c.w1 = np.log((FC / (1 - (s3) * (1/c.sMax))) - FC) + c.w2*FC
+
+        # total wilting water of the layers (mm H2O)
+        c.sumWiltingWater = layer_sum(layers.wiltingWater)
+
+    # Evapotranspiration, see daily_evapotranspiration()
+        # denominator of the evaporation demand at the bottom of each layer
+        bottomDepth = layers.bottomDepth
+        c.EsoilDepth = bottomDepth + np.exp(2.374 - 0.00713*bottomDepth)
+
+    # Percolation, see daily_percolation()
+        # travel time for percolation (h) of each layer
+        c.TT = (((layers.saturation * layers.depth) - layers.fcWater)
+                / layers.ksat)
+        t = 24 # time step (hours)
+
+        # fraction of the water available that percolates in a time step
+        c.percFraction = 1 - np.exp(-t/c.TT)
+
+    # Soil erosion, see daily_soil_erosion()
+        # time of concentration (h)
+        c.Tconc = ((soil.slopeLength**0.6) * (soil.manning**0.6)) / (
+            18 * (soil.fieldSlope**0.3))
+
+        sand = soil.sand
+        silt = soil.silt
+        orgc = soil.orgc
+
+        # USLE soil erodibility factor (Mg MJ**-1 mm**-1)
+        Fcsand = 0.2 + 0.3 * np.exp(-0.256 * sand * (1- (silt/100)))
+        Fclsi = (silt / (layers.clay[:, 0] + silt))**0.3
+        Forgc = 1 - ((0.25 * orgc) / (orgc + np.exp(3.72 - 2.95 * orgc)))
+        Fsand = 1 - (0.7 * (1 - sand/100) / ((1 - sand/100) +
+                        np.exp(-5.51 + 22.9 * (1 / (sand/100)))))
+        c.K = Fcsand * Fclsi * Forgc * Fsand
+
+        # the exponential term m is calculated as...
+        m = 0.6 * (1 - np.exp(-35.835 * soil.fieldSlope))
+
+        # angle of the slope
+        alphahill = np.tan(soil.fieldSlope)
+
+        # USLE topographic factor
+        c.LS = ((soil.slopeLength / 22.1)**m) * (65.41 *
+                    (np.sin(alphahill)**2) + 4.56 * np.sin(alphahill) + 0.065)
+
+    # Soil temperature, see update_soil_temperature()
+        bd = layers.bulkDensity[:, 0] # soil bulk density (g/cm^3)
+
+        # denominator of the scaling factor for soil water
+        c.scaleDepth = (0.356-0.144*bd) * soil.profileDepth
+
+        # maximum damping depth (mm), and log(500/ddmax)
+        c.ddmax = 1000 + (2500 * bd) / (bd + 686 * np.exp(-5.63 * bd))
+        c.ddLog = np.log(500/c.ddmax)
+
+        # depth at the center of each soil layer (mm)
+        z = (previous_layer(bottomDepth) + bottomDepth) / 2
+        c.midpointDepth = z
+
+    # Nitrogen cycling, see daily_soil_nitrogen()
+        # volatilization depth factor of each layer
+        c.depthFac = 1 - (z / (z + np.exp(4.706 - 0.0305 * z)))
+        c.depthFac[:, 0] = 0.9500
+
+    return c
+
+#------------------------------------------------------------------------------
+# Function: daily_soil_routine
+# Executes all the daily soil routines
+#------------------------------------------------------------------------------
+def daily_soil_routine(soil, layers, c, f, day):
+
+    # c holds the coefficients of the farms (see coefficients()), f the
+    # forcing of the year (see forcing.py), the same for all farms
+    d = day-1
+    rainfall = f.rainfall[d]
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+        # calculate and update the temperature of the soil layers
+        update_soil_temperature(soil, layers, c, f.cover[d], f.bcv[d],
+                                f.radiation[d], f.tAvg[d], 8.41)
+
+        # calculate daily runoff
+        daily_infiltration(soil, layers, c, rainfall)
+
+        # calculate daily transpiration
+        daily_evapotranspiration(soil, layers, c, f.E0[d], f.Etrans[d],
+                                 f.maxEsoil[d], f.Esoil[d])
+
+        # calculate daily percolation
+        daily_percolation(soil, layers, c)
+
+        # calculate daily soil erosion
+        daily_soil_erosion(soil, layers, c, rainfall, f.alphaLog[d], f.C[d],
+                           day)
+
+#------------------------------------------------------------------------------
+# Function: daily_soil_update
+# Update attributes of soil in preparation of following day
+#------------------------------------------------------------------------------
+def daily_soil_update(soil, layers, rainfall):
+
+    # update current soil water
+    update_current_soil_water(soil, layers, rainfall)
+
+#------------------------------------------------------------------------------
+# Function: layer_sum
+# Sums an attribute over the layers, adding the layers in order like
+# Soil.getSumSoilWater() does (np.sum may add them in a different order, a
+# cumulative sum adds them one after the other)
+#------------------------------------------------------------------------------
+def layer_sum(values):
+    if values.shape[1] == 0:
+        return np.zeros(values.shape[0])
+    return np.cumsum(values, axis=1)[:, -1]
+
+#------------------------------------------------------------------------------
+# Function: previous_layer
+# Returns the values of the layer above each layer, with the value given for
+# the top layer
+#------------------------------------------------------------------------------
+def previous_layer(values, top=0.0):
+    previous = np.empty_like(values)
+    previous[:, 0] = top
+    previous[:, 1:] = values[:, :-1]
+    return previous
+
+#------------------------------------------------------------------------------
+# Function: daily_infiltration
+# See Soil.dailyInfiltration()
+#------------------------------------------------------------------------------
+def daily_infiltration(soil, layers, c, dailyRainfall):
+
+    # maximum value of S and shape coefficients (see coefficients())
+    sMax = c.sMax
+    w1 = c.w1
+    w2 = c.w2
+
+    # soil water content of entire profile, excluding water held at wilting
+    # point (mm H2O)
+    SW = layer_sum(layers.currentSoilWaterMM) - c.sumWiltingWater
+
+    # retention paramenter (mm H2O)
+    s = sMax * (1 - (SW/(SW + np.exp(w1 - (w2)*(SW)))))
+
+    # when the top soil is frozen, s is modified
+    s = np.where(layers.temperature[:, 0] <= 2,
+                 sMax * (1-np.exp(-0.000862 * s)), s)
+
+    # daily runoff (mm H2O)
+    Q = np.where(dailyRainfall > 0.2*s,
+                 ((dailyRainfall - 0.2*s)**2) / (dailyRainfall + 0.8*s), 0.0)
+
+    soil.runoff = Q
+
+    # daily infiltration (mm H20)
+    soil.dayInfiltraiton = dailyRainfall - soil.runoff
+
+#------------------------------------------------------------------------------
+# Function: daily_evapotranspiration
+# See Soil.dailyEvapotranspiration(). Steps 1 to 3 only depend on the weather,
+# see forcing.py
+#------------------------------------------------------------------------------
+def daily_evapotranspiration(soil, layers, c, E0, Etrans, maxEsoil, Esoil):
+
+    soil.E0[:] = E0
+    soil.Etrans[:] = Etrans
+    soil.Esoil[:] = Esoil
+    Esoil = maxEsoil
+
+    # Step 4: Partition Esoil among different soil layers
+    layers.bottomEsoil = Esoil * layers.bottomDepth / c.EsoilDepth
+    layers.topEsoil = previous_layer(layers.bottomEsoil)
+
+    SW = layers.currentSoilWaterMM
+    FC = layers.fcWater
+    demand = layers.bottomEsoil - layers.topEsoil
+    layers.layerEsoil = np.where(SW > FC, demand,
+                demand * np.exp(2.5*(SW - FC) / (FC - layers.wiltingWater)))
+
+#------------------------------------------------------------------------------
+# Function: daily_percolation
+# See Soil.dailyPercolation()
+#------------------------------------------------------------------------------
+def daily_percolation(soil, layers, c):
+
+    SW = layers.currentSoilWaterMM
+    FC = layers.fcWater
+
+    # Volume of water available for percolation in a soil layer
+    SWperc = np.where(SW >= FC, SW - FC, 0.0)
+
+    # travel time for percolation (h), see coefficients()
+    layers.TT = c.TT
+
+    #amount of water that percolates
+    layers.perc = SWperc * c.percFraction
+
+#------------------------------------------------------------------------------
+# Function: daily_soil_erosion
+# See Soil.dailySoilErosion()
+#------------------------------------------------------------------------------
+def daily_soil_erosion(soil, layers, c, rainfall, alphaLog, C, day):
+
+    # time of concentration (h), USLE soil erodibility factor K and
+    # topographic factor LS (see coefficients())
+    Tconc = c.Tconc
+
+    # fraction of daily rain during time of concentration, alphaLog being
+    # log(1 - alphaMean) (see forcing.py)
+    alpha = 1 - np.exp(2 * Tconc * alphaLog)
+
+    # rain amount during time of concentration (mm)
+    Rtc = alpha * rainfall
+
+    # rainfall intensity (mm/hr)
+    I = Rtc / Tconc
+
+    # peak runoff rate (m**3/sec)
+    Qpeak = np.zeros(len(Tconc))
+    if rainfall != 0:
+        Qpeak = ((soil.runoff/rainfall) * I * soil.fieldSize) / 3.6
+
+    # USLE cover and management factor C: see forcing.py
+
+    # sediment yield on a given day (metric tons)
+    sed = (11.8 * ((soil.runoff * Qpeak)**0.56) * c.K * C * soil.practiceFactor
+           * c.LS)
+    soil.sedimentYield = sed
+
+    soil.snowCorrectedSed = sed
+    if day < 95 or day > 300:
+        soil.snowCorrectedSed = sed/(math.exp(3*20/25.4))
+
+#------------------------------------------------------------------------------
+# Function: update_soil_temperature
+# See Soil.updateSoilTemperature()
+#------------------------------------------------------------------------------
+def update_soil_temperature(soil, layers, c, cover, bcv, radiation, Tavg,
+                            TavgAnnual):
+
+    SW = layer_sum(layers.currentSoilWaterMM) # total soil water (mm)
+
+    # daily albedo, from the soil cover index (see forcing.py)
+    albedo = 0.23 * (1 - cover) + soil.soilAlbedo * cover
+
+    # radiation term
+    radiate = (radiation * (1 - albedo) - 14) / 20
+
+    # Temperature of a bare soil surface (C)
+    Tbare = Tavg + radiate * Tavg
+
+    # used cover factor bcv, taking snow cover into account: see forcing.py
+
+    # Daily soil surface temperature (C)
+    soil.Tsurf = (bcv * soil.Tsurf) + ((1 - bcv) * Tbare)
+
+    # scaling factor for soil water
+    scale = SW / c.scaleDepth
+
+    # damping depth (mm), from the maximum damping depth (see coefficients())
+    dd = c.ddmax * np.exp(c.ddLog * ((1-scale)/(1+scale))**2)
+
+    # lag coefficient
+    L = 0.8
+
+    # ratio of depth at the center of soil layer to damping depth
+    zd = c.midpointDepth / dd[:, None]
+
+    # depth factor (changing with the damping depth, every day)
+    df = zd / (zd + np.exp(-0.867 - 2.078 * zd))
+
+    # soil temperature (C) at depth z (mm)
+    Tsurf = soil.Tsurf[:, None]
+    layers.temperature = (L * layers.temperature) + (1-L) * (
+        df * (TavgAnnual-Tsurf) + Tsurf)
+
+#------------------------------------------------------------------------------
+# Function: update_current_soil_water
+# See Soil.updateCurrentSoilWater()
+#------------------------------------------------------------------------------
+def update_current_soil_water(soil, layers, rainfall):
+
+    SW = layers.currentSoilWaterMM
+    perc = layers.perc
+
+    new_SW = np.empty_like(SW)
+    new_SW[:, 0] = (SW[:, 0] + rainfall - soil.runoff
+                    - layers.layerEsoil[:, 0] - perc[:, 0])
+    new_SW[:, 1:] = (SW[:, 1:] - layers.layerEsoil[:, 1:] - perc[:, 1:]
+                     + perc[:, :-1])
+
+    layers.currentSoilWaterMM = np.maximum(layers.wiltingWater, new_SW)
+
+#------------------------------------------------------------------------------
+# Function: daily_nitrogen_cycling_routine
+# See nitrogen_cycling.daily_soil_nitrogen(). The top layer (column 0) also
+# updates the nitrogen values of the soil, which the deeper layers then use.
+#------------------------------------------------------------------------------
+def daily_nitrogen_cycling_routine(soil, layers, c, rainfall):
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        daily_soil_nitrogen(soil, layers, c, rainfall)
+
+def daily_soil_nitrogen(soil, layers, c, rainfall):
+
+    # 1) ----------------Current soil N Pools-----------------------------------
+    BD = layers.bulkDensity
+    OrgC = layers.orgC
+    NO3 = layers.NO3
+    FracN = layers.fracActiveN
+    activeN = layers.activeN
+    stableN = layers.stableN
+    NH4 = layers.NH4
+
+    # 2) ----------------Mineralization and Decomposition-----------------------
+    soilTemp = layers.temperature
+    SW = layers.currentSoilWaterMM
+    FC = layers.fcWater
+    minRate = layers.activeMineralRate
+
+    # the soil temperature factor; has to be >= 0.1
+    tempFac = np.maximum(0.1, 0.1 + 0.9 * soilTemp / (soilTemp + np.exp(9.93 -
+                                                     0.312 * soilTemp)))
+
+    # the soil water factor
+    waterFac = np.minimum(1, np.maximum(0.05, SW / FC))
+
+    resComp = soil.freshNMineralRate  # fresh N mineral rate
+
+    # Decomposition and mineralization of Fresh N, in the first layer only
+    freshOrganicP = soil.residue * 0.0003
+    freshOrganicP = freshOrganicP * BD[:, 0] * layers.bottomDepth[:, 0] / 100
+    labileP = layers.labileP[:, 0]
+
+    carbonToNitrogen = (0.58 * soil.residue) / (soil.topLayerFreshN + NO3[:, 0])
+    soil.CToN = carbonToNitrogen
+
+    carbonToPhosphorus = (0.58 * soil.residue) / (freshOrganicP + labileP)
+    soil.CToP = carbonToPhosphorus
+
+    residueFactor = np.minimum(np.exp(-0.693 * (carbonToNitrogen - 25) / 25),
+                               1)
+    decay = residueFactor * resComp * ((tempFac[:, 0] * waterFac[:, 0]) ** 0.5)
+    soil.decayRate = decay
+
+    soil.freshMin = 0.8 * decay * soil.topLayerFreshN
+    soil.freshDecomp = 0.2 * decay * soil.topLayerFreshN
+
+    # 3) ----------------Nitrification and Volatilization-----------------------
+    # calculate temperature factor
+    nitrTFac = np.where(soilTemp > 5.0, 0.41 * (soilTemp - 5) / 10, 0.0)
+    nitrTFac = np.minimum(1.0, nitrTFac)
+
+    # volatilization depth factor (see coefficients())
+    depthFac = c.depthFac
+
+    # volatilization cation exchange factor
+    CECFac = layers.volatileExchangeFactor
+
+    nitrReg = tempFac * waterFac * 0.1 # nitrification regulator
+
+    volatilReg = nitrTFac * depthFac * CECFac  # volatilization regulator
+
+    # Total combined nitrification and volatilization (kg/ha)
+    totNitriVolatil = NH4 * (1 - np.exp(-nitrReg - volatilReg))
+    layers.totNitriVolatil = totNitriVolatil
+
+    # Mass of volatilization and nitrification (kg/ha)
+    volatilization = NH4 * volatilReg
+    layers.volatilization = volatilization
+    layers.nitrification = (NH4 - volatilization) * nitrReg
+
+    # 4) ----------------N loss in leaching, runoff, and erosion----------------
+    runoff = soil.runoff
+    perc = layers.perc
+    satWater = layers.satWater
+    Sed = soil.snowCorrectedSed
+    SWtop = SW[:, 0]
+    hasWater = SW != 0
+    hasWaterTop = SWtop != 0
+
+    # calculate Denitrification in soil layer
+    denitrification = np.where(SW > satWater * 0.6,
+        NO3 * (1 - np.exp(-layers.denitrificationRate * tempFac * OrgC)), 0.0)
+    layers.denitrification = denitrification
+
+    # Update NO3
+    NO3 = np.maximum(0, NO3 - denitrification)
+
+    soil.runoffNO3Conc = np.where(hasWaterTop,
+        (1 - np.exp((-SWtop-rainfall) / (satWater[:, 0] + rainfall))
+         ) * NO3[:, 0] / (SWtop+rainfall)/25, soil.runoffNO3Conc)
+
+    NO3[:, 0] = np.maximum(0, NO3[:, 0] - soil.NO3Runoff)
+
+    # Concentration (kg N/mm H20) of NO3 in a soil layer
+    NO3Conc = np.where(hasWater, (1 - np.exp(-SW/satWater))/SW*NO3/5, 0.0)
+    layers.NO3Conc = NO3Conc
+
+    # Mass (kg/ha) of NO3 loss in runoff (mm) from soil layer 1 only
+    soil.NO3Runoff = soil.runoffNO3Conc * runoff
+
+    # Mass (kg/ha) of NO3 loss in percolation water (mm) from all soil layers
+    layers.NO3Perc = NO3Conc * perc
+
+    # NH4 UPDATE
+    NH4 = np.maximum(0, NH4 - totNitriVolatil)
+
+    soil.runoffNH4Conc = np.where(hasWaterTop,
+        (1 - np.exp((-SWtop-rainfall) / (satWater[:, 0]+rainfall))
+         ) * NH4[:, 0]/(SWtop+rainfall)/5, soil.runoffNH4Conc)
+
+    # Mass (kg/ha) of NH4 loss in runoff (mm) from soil layer 1 only
+    soil.NH4Runoff = soil.runoffNH4Conc * runoff
+
+    NH4[:, 0] = np.maximum(0, NH4[:, 0] - soil.NH4Runoff)
+
+    # Soil N concentrations (mg/kg) for N loss in erosion
+    BDtop = BD[:, 0]
+    bottomDepthTop = layers.bottomDepth[:, 0]
+    soil.freshNConc = (100 * soil.topLayerFreshN) / (BDtop / bottomDepthTop)
+    soil.stableNConc = (100 * stableN[:, 0]) / BDtop / bottomDepthTop
+    soil.NH4Conc = (100 * NH4[:, 0]) / BDtop / bottomDepthTop
+    soil.activeNConc = (100 * activeN[:, 0]) / BDtop / bottomDepthTop
+
+    # Update Active N
+    activeN = activeN.copy()
+    activeN[:, 0] = np.maximum(0, activeN[:, 0] - soil.activeNLoss)
+
+    # Concentration (kg N/mm H20) of active N in a soil layer
+    activeNConc = np.where(hasWater,
+                    (1 - np.exp(-SW / satWater)) * activeN/SW/15, 0.0)
+    layers.activeNConc = activeNConc
+
+    # Mass (kg/ha) of active N loss in percolation water (mm)
+    activeNPerc = activeNConc * perc
+    layers.activeNPerc = activeNPerc
+
+    # Enrichment ratio
+    ER = np.where(Sed != 0.0,
+                  np.maximum(1, np.exp(1.21 - 0.16 * np.log(Sed * 1000))), 0.0)
+    soil.enrichmentRatio = ER
+
+    # N mass loss in erosion (kg/ha)
+    eroded = Sed > 0
+    soil.freshNLoss = np.where(eroded, 0.001 * soil.freshNConc * Sed * ER, 0.0)
+    soil.activeNLoss = np.where(eroded, 0.001 * soil.activeNConc * Sed * ER,
+                                0.0)
+    soil.stableNLoss = np.where(eroded, 0.001 * soil.stableNConc * Sed * ER,
+                                0.0)
+    soil.NH4Loss = np.where(eroded, 0.001 * soil.NH4Conc * Sed * ER, 0.0)
+
+    # Mineralization from Active N pool
+    Nminact = minRate * (tempFac * waterFac) ** 0.5 * activeN
+    layers.nMinAct = Nminact
+
+    # Update Stable N
+    stableN = np.maximum(0, stableN - soil.stableNLoss[:, None])
+
+    # Update Active N
+    activeN = activeN - activeNPerc
+    activeN[:, 1:] += activeNPerc[:, :-1]
+
+    activeN = np.maximum(0, activeN - Nminact)
+
+    # N moves between the Active and Stable pools to maintain an equilibrium
+    layers.nTrans = 0.00001 * (activeN * (1 / FracN - 1) - stableN)
+
+    # Update NH4
+    NH4[:, 0] = np.maximum(0, NH4[:, 0] - soil.NH4Loss)
+
+    # Concentration (kg N/mm H20) of NH4 in a soil layer
+    NH4Conc = np.where(hasWater, (1 - np.exp(-SW / satWater)) * NH4/SW, 0.0)
+    layers.NH4Conc = NH4Conc
+
+    layers.NH4Perc = NH4Conc * perc
+
+#------------------------------------------------------------------------------
+# Function: daily_nitrogen_update
+# See nitrogen_cycling.daily_soil_nitrogen_update()
+#------------------------------------------------------------------------------
+def daily_nitrogen_update(soil, layers, addedN):
+
+    # UPDATE NO3 POOL
+    NO3 = layers.NO3 - layers.denitrification
+    NO3[:, 0] -= soil.NO3Runoff
+    NO3 -= layers.NO3Perc
+    NO3[:, 1:] += layers.NO3Perc[:, :-1]
+    NO3 += layers.nitrification
+    layers.NO3 = NO3
+
+    # UPDATE NH4 POOL
+    NH4 = np.maximum(0, layers.NH4 - layers.totNitriVolatil)
+    NH4[:, 0] -= soil.NH4Runoff
+    NH4[:, 0] -= soil.NH4Loss
+    NH4 -= layers.NH4Perc
+    NH4[:, 1:] += layers.NH4Perc[:, :-1]
+    NH4 = NH4 + layers.nMinAct
+    NH4[:, 0] = NH4[:, 0] + soil.freshMin * 0.8 + (addedN*0.1)
+    layers.NH4 = np.maximum(0, NH4)
+
+    # UPDATE ACTIVE N POOL
+    activeN = layers.activeN.copy()
+    activeN[:, 0] = np.maximum(0, activeN[:, 0] - soil.activeNLoss)
+    activeN -= layers.activeNPerc
+    activeN[:, 1:] += layers.activeNPerc[:, :-1]
+    activeN = np.maximum(0, activeN - layers.nMinAct)
+    activeN -= layers.nTrans
+    activeN[:, 0] = activeN[:, 0] + soil.freshMin*0.2 + addedN*0.9
+    layers.activeN = activeN
+
+    # UPDATE STABLE N POOL
+    stableN = layers.stableN.copy()
+    stableN[:, 0] = np.maximum(0, stableN[:, 0] - soil.stableNLoss)
+    layers.stableN = np.maximum(0, stableN + layers.nTrans)
+
+    # UPDATE FRESH N POOL
+    # (updated once per layer, as in daily_soil_nitrogen_update(), until it
+    # no longer changes: the following updates would give the same values)
+    for _ in range(layers.NO3.shape[1]):
+        freshN = np.maximum(0, soil.topLayerFreshN - soil.freshMin
+                            - soil.freshDecomp - soil.freshNLoss)
+        unchanged = np.array_equal(freshN, soil.topLayerFreshN)
+        soil.topLayerFreshN = freshN
+        if unchanged:
+            break
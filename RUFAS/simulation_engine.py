@@ -9,17 +9,22 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 ################################################################################
 
 import json
+import contextlib
 import time as timer
 from pathlib import Path
 
-from RUFAS import routines, errors
+from RUFAS import errors, checkpoint, spinup
+from RUFAS.routines import registry, Forcing
+from RUFAS.routines.soil.profile import SoilProfile
+from RUFAS.profiler import Profiler
 from RUFAS.classes import Config, State, Weather, Time
+from RUFAS.weather_stations import WeatherStations
 from RUFAS.output import OutputHandler
 
 #-------------------------------------------------------------------------------
 # Function: simulate
 #-------------------------------------------------------------------------------
-def simulate(input_fPath:Path):
+def simulate(input_fPath:Path, resume=False, profile=False):
     '''Executes the simulation with the json file specified.
 
     Executes the similation with the json file at the path specified. Skips over
@@ -30,134 +35,558 @@ def simulate(input_fPath:Path):
     Args:
         input_fPath (Path): Path to the json file that contains all the input
             parameters to the simulation. Passed to read_json_file().
+        resume (bool, optional): Resume from the latest checkpoint, if the
+            input file enables checkpoints and one exists.
+        profile (bool, optional): Print the time spent in each routine.
     '''
 
     #
     # Reads the json input file and uses the information to instantiate the
-    # simulation global variables
+    # simulation objects
     #
     try:
-        read_json_file(input_fPath)
+        simulation = Simulation(input_fPath, profile=profile)
     except errors.InvalidJSONfile as e:
         print(e.msg)
         return
 
-    #
-    # Creates a new directory for the output files (if doesn't already exist)
-    # Deletes existing output files of the same name from previous simulation
-    # Transfer needed (initial) data from state to report handlers
-    #
-    output.initialize_output_dir(config.output_dir)
-    output.initialize_reports(state)
+    try:
+        simulation.run(resume)
+    except errors.Checkpoint as e:
+        print(e.msg)
 
-    print("\nSimulating: {}".format(input_fPath.name))
+#-------------------------------------------------------------------------------
+# Function: simulate_iter
+#-------------------------------------------------------------------------------
+def simulate_iter(input_fPath:Path, fields=(), write_reports=False):
+    '''Executes the simulation with the json file specified, day by day.
 
-    t_start_sim = timer.time()
+    Generator yielding a record after every simulated day, for consumers of
+    the simulation as a stream. See Simulation.iterate() for the records and
+    fields.
 
-    #
-    # MAIN Simulation Loop
-    #
-    while not time.end_simulation():
-        annual_simulation()
+    Args:
+        input_fPath (Path): Path to the json file that contains all the input
+            parameters to the simulation.
+        fields (list[str], optional): The fields to put in the records.
+        write_reports (bool, optional): Also write the report files.
 
-    t_end_sim = timer.time()
+    Yields:
+        dict: {'year': year, 'day': julian day, <field>: value, ...}
 
-    print("Simulation Successful: {}".format(input_fPath.name))
-    print("Total Run Time: {} seconds\n".format(str(t_end_sim - t_start_sim)))
+    Raises:
+        InvalidJSONfile: If the json file has problems
+        ValueError: If a field does not exist
+    '''
+
+    yield from Simulation(input_fPath).iterate(fields, write_reports)
 
 #-------------------------------------------------------------------------------
-# Function: daily_simulation
+# Class: Simulation
 #-------------------------------------------------------------------------------
-def daily_simulation():
-    '''Executes the daily simulation routines.'''
+class Simulation():
+    '''A single, self-contained run of RUFAS.
 
-    #
-    # Daily Routines
-    # Pass only information needed
-    #
-    routines.daily_soil_routine(state.soil, weather, time)
-    routines.daily_nitrogen_cycling_routine(state.soil, time, weather)
-    # routines.daily_phosphorus_cycling_routine(state.soil, time, weather, config)
+    Owns the config, state, output, weather and time objects of one simulation.
+    Nothing is shared between Simulation objects, so any number of them can
+    exist (and run) in the same process.
+    '''
 
-    #
-    # Daily Output Updates
-    #
-    output.daily_update(state, weather, time)
+    def __init__(self, input_fPath:Path, output_dir=None, overrides=None,
+                 profile=False):
+        '''Instantiates the simulation objects from the json file.
 
-    #
-    # Daily Attribute Updates
-    # Update attributes in preparation of following day
-    #
-    routines.daily_soil_update(state.soil, weather, time)
-    routines.daily_nitrogen_update(state.soil, time, weather)
-    # routines.daily_phosphorus_update(state.soil, time, weather)
+        Args:
+            input_fPath (Path): Path to the json file that contains all the
+                input parameters to the simulation.
+            output_dir (str, optional): Replaces the output directory given
+                in the json file.
+            overrides (dict, optional): Replaces parameters of the json file.
+                See apply_overrides().
+            profile (bool, optional): Time the routines of the simulation,
+                see Profiler. Also enabled by "profile" in the config section
+                of the json file.
 
-    #print("simulating: " + time.to_str())
-    time.advance()
+        Raises:
+            InvalidJSONfile: If the json file at the given path does not
+                conform with the format required
+        '''
 
-#-------------------------------------------------------------------------------
-# Function: annual_simulation
-#-------------------------------------------------------------------------------
-def annual_simulation():
-    '''Executes the annual simulation routines.
+        self.input_fPath = input_fPath
 
-    Writes the annual report to the output files
-    Flushes the data in the output object
-    Resets the state for the following year
-    '''
+        (self.config, self.state, self.output,
+         self.weather, self.time) = read_json_file(input_fPath, overrides)
 
-    #
-    # Pre-annual Routines
-    #
-    #routines.annual_crop_routine(state.crop, weather, time)
+        if output_dir is not None:
+            self.config.output_dir = output_dir
 
-    while not time.end_year():
-        daily_simulation()
+        self.checkpoint_fPath = None
+        if self.config.checkpoint_dir is not None:
+            self.checkpoint_fPath = checkpoint.get_fPath(
+                                        self.config.checkpoint_dir)
 
-    #
-    # Post-Annual Routines
-    #
-    output.annual_update(state, weather, time)
-    output.write_annual_reports(time.year)
-    output.annual_flush()
-    #state.annual_reset()
-    time.advance()
+        # Whether the spun-up soil came from the cache, None if no spin-up
+        self.spinup_cached = None
+
+        # Days simulated by run(), those before the checkpoint resumed from
+        # left out
+        self.days_simulated = 0
+
+        # Daily values of the soil routines that only depend on the weather,
+        # computed a year at a time as the simulation reaches it
+        self.forcing = Forcing(self.weather)
+
+        # The soil routines run on the soil profile of deep soils unless the
+        # json file chooses, see registry.default_profile()
+        if self.config.soil_profile is None:
+            self.config.soil_profile = registry.default_profile(
+                self.config.routines, len(self.state.soil.listOfSoilLayers))
+
+        # Soil state in arrays when the soil routines run on them, None
+        # otherwise. The Soil object is only updated from it for the reports
+        # and at the end of every year (for the annual reports, checkpoints
+        # and snapshots), see routines/soil/profile.py.
+        self.profile = None
+        if self.config.soil_profile:
+            self.profile = SoilProfile([self.state.soil])
+        self.state.profile = self.profile
+
+        #
+        # Daily routines chosen by the json file, bound to the simulation
+        # objects once. Wrapped to be timed when profiling.
+        #
+        self.daily_routines, self.daily_updates = registry.build(
+            self.config.routines,
+            {'soil': self.state.soil, 'animal': self.state.animal,
+             'feed': self.state.feed, 'weather': self.weather,
+             'forcing': self.forcing, 'time': self.time,
+             'config': self.config, 'profile': self.profile},
+            self.config.soil_profile)
+
+        self.profiler = None
+        if profile or self.config.profile:
+            self.profiler = Profiler()
+            self.daily_routines = [(name, self.profiler.wrap(name, routine))
+                                   for name, routine in self.daily_routines]
+            self.daily_updates = [(name, self.profiler.wrap(name, update))
+                                  for name, update in self.daily_updates]
+            self.output.profile(self.profiler)
+
+    #---------------------------------------------------------------------------
+    # Method: start
+    #---------------------------------------------------------------------------
+    def start(self, resume=False):
+        '''Prepares the simulation to run, before the first simulated day.
+
+        When spin-up is enabled (spinup_years in the config section of the
+        input file), the soil is spun up, unless resuming.
+
+        Args:
+            resume (bool, optional): Resume from the latest checkpoint instead
+                of starting from the beginning. Starts from the beginning if
+                there is no checkpoint.
+
+        Returns:
+            bool: True if resumed from a checkpoint
+
+        Raises:
+            Checkpoint: If the checkpoint cannot be resumed from
+        '''
+
+        resume = (resume and self.checkpoint_fPath is not None and
+                  self.checkpoint_fPath.exists())
+
+        if self.config.spinup_years > 0 and not resume:
+            self.spinup_cached = spinup.spin_up(self.state.soil, self.weather,
+                                                self.config.spinup_years,
+                                                self.config.spinup_dir)
+
+        #
+        # Creates a new directory for the output files (if doesn't already exist)
+        # Deletes existing output files of the same name from previous simulation
+        # (unless resuming, then the output files are kept)
+        # Transfer needed (initial) data from state to report handlers
+        #
+        if self.output.active():
+            self.output.initialize_output_dir(self.config.output_dir,
+                                              clear = not resume)
+            self.output.initialize_reports(self.state)
+
+        if resume:
+            checkpoint.load(self.checkpoint_fPath, self.state, self.time,
+                            self.output)
+
+        if self.profile is not None:
+            self.profile.read([self.state.soil])
+
+        return resume
+
+    #---------------------------------------------------------------------------
+    # Method: run
+    #---------------------------------------------------------------------------
+    def run(self, resume=False):
+        '''Runs the simulation from the current time to the end.
+
+        When checkpoints are enabled (checkpoint_dir in the config section of
+        the input file), a checkpoint is saved at the end of every year.
+
+        Args:
+            resume (bool, optional): Resume from the latest checkpoint, see
+                start()
+
+        Raises:
+            Checkpoint: If the checkpoint cannot be resumed from
+        '''
+
+        resumed = self.start(resume)
+
+        if self.spinup_cached is not None:
+            print("\nSoil spin-up: {} years{}".format(
+                  self.config.spinup_years,
+                  " (cached)" if self.spinup_cached else ""))
+
+        if resumed:
+            print("\nResuming: {} from {}".format(self.input_fPath.name,
+                                                  self.time.to_str()))
+        else:
+            print("\nSimulating: {}".format(self.input_fPath.name))
+
+        t_start_sim = timer.time()
+        start_day = self.time.elapsed()
+
+        #
+        # MAIN Simulation Loop
+        #
+        with self.profiling():
+            while not self.time.end_simulation():
+                self.annual_simulation()
+
+        t_end_sim = timer.time()
+        self.days_simulated = self.time.elapsed() - start_day
+
+        print("Simulation Successful: {}".format(self.input_fPath.name))
+        print("Total Run Time: {} seconds\n".format(str(t_end_sim - t_start_sim)))
+
+        if self.profiler is not None:
+            print(self.profiler.to_str())
+
+    #---------------------------------------------------------------------------
+    # Method: profiling
+    #---------------------------------------------------------------------------
+    def profiling(self):
+        '''Context in which the simulation is timed, if profiling.'''
+
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.activate()
+
+    #---------------------------------------------------------------------------
+    # Method: iterate
+    #---------------------------------------------------------------------------
+    def iterate(self, fields=(), write_reports=False, resume=False):
+        '''Runs the simulation, yielding a record after every simulated day.
+
+        Each record is a dictionary with the year and day that was simulated
+        and the value (after the day's updates) of each of the fields asked
+        for. Only the fields asked for are copied. A field is one of:
+            "soil.<attribute>": attribute of the soil, e.g. "soil.runoff"
+            "layers.<attribute>": list of the attribute of every soil layer,
+                e.g. "layers.NO3"
+            "weather.<attribute>": weather of the day, e.g. "weather.rainfall"
+
+        Args:
+            fields (list[str], optional): The fields to put in the records.
+            write_reports (bool, optional): Also write the report files.
+                Defaults to False, the records being the only output.
+            resume (bool, optional): Resume from the latest checkpoint, see
+                start()
+
+        Yields:
+            dict: {'year': year, 'day': julian day, <field>: value, ...}
+
+        Raises:
+            ValueError: If a field does not exist
+        '''
+
+        getters = [(field, self.field_getter(field)) for field in fields]
+
+        if not write_reports:
+            for report in self.output.reports:
+                report.active = False
+
+        self.start(resume)
+
+        time = self.time
+        while not time.end_simulation():
+            while not time.end_year():
+                record = {'year': time.year, 'day': time.day}
+                with self.profiling():
+                    self.daily_simulation()
+                for field, get in getters:
+                    record[field] = get(record['year'], record['day'])
+                yield record
+
+            with self.profiling():
+                self.post_annual_simulation()
+
+    #---------------------------------------------------------------------------
+    # Method: field_getter
+    #---------------------------------------------------------------------------
+    def field_getter(self, field):
+        '''Gets a function returning the value of a field, see iterate().
+
+        Args:
+            field (str): The field
+
+        Returns:
+            function: get(year, day), returns the value of the field
+
+        Raises:
+            ValueError: If the field does not exist
+        '''
+
+        source, _, attribute = field.partition('.')
+        soil = self.state.soil
+
+        # With the soil profile, the soil values are read from its arrays
+        profile = self.profile
+        if (profile is not None and source in ('soil', 'layers') and
+            hasattr(getattr(profile, source), attribute)):
+            if source == 'soil':
+                return lambda year, day: float(getattr(profile.soil,
+                                                       attribute)[0])
+            return lambda year, day: getattr(profile.layers,
+                                             attribute)[0].tolist()
+
+        if source == 'soil' and hasattr(soil, attribute):
+            return lambda year, day: getattr(soil, attribute)
+
+        elif (source == 'layers' and soil.listOfSoilLayers and
+              hasattr(soil.listOfSoilLayers[0], attribute)):
+            return lambda year, day: [getattr(layer, attribute)
+                                      for layer in soil.listOfSoilLayers]
+
+        elif source == 'weather' and hasattr(self.weather, attribute):
+            data = getattr(self.weather, attribute)
+            return lambda year, day: float(data[year-1, day-1])
+
+        elif source == 'weather' and attribute in dict(Weather.COLUMNS):
+            raise ValueError("Weather field not loaded, no active routine or "
+                             "report reads it: {}".format(field))
+
+        raise ValueError("Unknown field: {}".format(field))
+
+    #---------------------------------------------------------------------------
+    # Method: daily_simulation
+    #---------------------------------------------------------------------------
+    def daily_simulation(self):
+        '''Executes the daily simulation routines.'''
+
+        state, weather, time = self.state, self.weather, self.time
+
+        #
+        # Daily Routines
+        # Active routines only, see Config.routines
+        #
+        for _, routine in self.daily_routines:
+            routine()
+
+        #
+        # Daily Output Updates
+        # The reports read the soil layers from the soil profile (see
+        # BaseReportHandler.layer_values()), only the soil is written back
+        #
+        if self.profile is not None and self.output.active():
+            self.profile.write(self.profile.soil_names)
+        self.output.daily_update(state, weather, time)
+
+        #
+        # Daily Attribute Updates
+        # Update attributes in preparation of following day
+        #
+        for _, update in self.daily_updates:
+            update()
+
+        #print("simulating: " + time.to_str())
+        time.advance()
+
+    #---------------------------------------------------------------------------
+    # Method: annual_simulation
+    #---------------------------------------------------------------------------
+    def annual_simulation(self):
+        '''Executes the annual simulation routines.
+
+        Simulates every day of the year, then the post-annual routines.
+        '''
+
+        #
+        # Pre-annual Routines
+        #
+        #routines.annual_crop_routine(self.state.crop, self.weather, self.time)
+
+        while not self.time.end_year():
+            self.daily_simulation()
+
+        self.post_annual_simulation()
+
+    #---------------------------------------------------------------------------
+    # Method: post_annual_simulation
+    #---------------------------------------------------------------------------
+    def post_annual_simulation(self):
+        '''Executes the post-annual routines.
+
+        Writes the annual report to the output files
+        Flushes the data in the output object
+        Resets the state for the following year
+        Saves a checkpoint, if enabled
+        '''
+
+        if self.profile is not None:
+            self.profile.write()
+
+        self.output.annual_update(self.state, self.weather, self.time)
+        self.output.write_annual_reports(self.time.year)
+        self.output.annual_flush()
+        #self.state.annual_reset()
+        self.time.advance()
+
+        if self.checkpoint_fPath is not None:
+            checkpoint.save(self.checkpoint_fPath, self.state, self.time,
+                            self.output)
 
 #-------------------------------------------------------------------------------
 # Function: read_json_file
 #-------------------------------------------------------------------------------
-def read_json_file(fPath:Path):
-    '''Reads the json file, writes information to the simulation variables.
+def read_json_file(fPath:Path, overrides=None):
+    '''Reads the json file, instantiates the simulation objects from it.
 
     Reads and inteprets the (json) file at the given path. Compiles the
     information into dictionaries and instantiates the simulation objects with
-    them. Assigns the objects to the global simulation variables.
+    them.
 
     Args:
         fpath (Path): Path to the input json file
+        overrides (dict, optional): Parameters replacing the ones in the json
+            file, passed to apply_overrides()
+
+    Returns:
+        tuple: (config, state, output, weather, time) objects of the simulation
 
     Raises:
         InvalidJSONfileError: If the json file at the given path does not
             conform with the format required
     '''
 
-    #
-    # Designate as module-global variables
-    #
-    global config, state, output, weather, time
-
     with fPath.open('r') as f:
         data = json.load(f)
 
         # Instantiate objects using dictionary data from .json file
         try:
+            if overrides:
+                apply_overrides(data, overrides)
+
             config = Config(data['config'])
             state = State(data['farm'], config)
             output = OutputHandler(data['output'])
-            weather = Weather(data['weather'], config.duration)
+            weather = read_weather(data['weather'], config,
+                                   weather_used(config, output))
             time = Time(config.duration)
 
         except errors.JSONfileData as e:
             print("JSON FILE ERROR: " +
                   "{} \n\t{} Section\n{}\n".format(fPath.name, e.section, e.msg))
             raise errors.InvalidJSONfile(fPath.name)
+
+    return config, state, output, weather, time
+
+#-------------------------------------------------------------------------------
+# Function: read_weather
+#-------------------------------------------------------------------------------
+def read_weather(data, config, attributes=None):
+    '''Instantiates the weather of a simulation from the json file.
+
+    The weather section is the path of the weather file, the weather generator
+    (see Weather), or the weather of a field of a farm with many stations:
+        {"stations": {name: station, ...}, "fields": [field, ...],
+         "field": number of the field simulated (starting at 0)}
+    see WeatherStations.
+
+    Args:
+        data (str or dict): The weather section of the json file
+        config (Config): Config of the simulation
+        attributes (set[str], optional): Weather attributes to load, see
+            weather_used()
+
+    Returns:
+        Weather: The weather of the simulation
+
+    Raises:
+        JSONfileData: If the weather cannot be read
+    '''
+
+    start = config.startYear - config.weather_start_year
+
+    if isinstance(data, dict) and 'stations' in data:
+        stations = WeatherStations(data['stations'], data.get('fields'),
+                                   config.duration, config.weather_cache,
+                                   start, attributes)
+        return stations.weather(data.get('field', 0), config.weather_overlays)
+
+    return Weather(data, config.duration, config.weather_cache,
+                   config.weather_window, start, config.weather_overlays,
+                   attributes)
+
+#-------------------------------------------------------------------------------
+# Function: weather_used
+#-------------------------------------------------------------------------------
+def weather_used(config, output):
+    '''Returns the weather attributes read by a simulation.
+
+    Those read by the active routines and reports, and by the spin-up when
+    the soil is spun up. Only these are loaded, see Weather.
+
+    Args:
+        config (Config): Config of the simulation
+        output (OutputHandler): Reports of the simulation
+
+    Returns:
+        set[str]: The weather attributes
+    '''
+
+    attributes = registry.weather_used(config.routines) | output.weather_used()
+    if config.spinup_years:
+        attributes |= registry.weather_used(spinup.ROUTINES)
+
+    return attributes
+
+#-------------------------------------------------------------------------------
+# Function: apply_overrides
+#-------------------------------------------------------------------------------
+def apply_overrides(data, overrides):
+    '''Replaces parameters of the json data with the values given.
+
+    Parameters are addressed by the dot-separated path of keys leading to them
+    in the json file, e.g. "config.EndYear" or "farm.soil.CN2". The section a
+    parameter belongs to must exist in the json file.
+
+    Args:
+        data (dict): Data read from the json input file, modified in place
+        overrides (dict): {parameter path: new value}
+
+    Raises:
+        JSONfileData: If a parameter path does not lead to a section of the
+            json file
+    '''
+
+    for path, value in overrides.items():
+        *sections, parameter = path.split('.')
+
+        section = data
+        for key in sections:
+            section = section.get(key) if isinstance(section, dict) else None
+
+        if not isinstance(section, dict):
+            raise errors.JSONfileData("OVERRIDES",
+                                      "\tNo section for parameter " + path)
+
+        section[parameter] = value
@@ -0,0 +1,87 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: spinup.py
+Description: Spins up the soil to equilibrium, caching the spun-up soil states
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import os
+import gzip
+import pickle
+import hashlib
+
+from RUFAS import util
+from RUFAS import routines
+from RUFAS.routines import registry
+from RUFAS.classes import Time
+
+# Version of the spin-up, change when the soil routines change so that soil
+# states spun up by older routines are not reused
+VERSION = 2
+
+# Routines run by the spin-up, see routines/registry.py
+ROUTINES = ('soil', 'nitrogen')
+
+#-------------------------------------------------------------------------------
+# Function: spin_up
+#-------------------------------------------------------------------------------
+def spin_up(soil, weather, years, cache_dir):
+    '''Brings the soil pools to equilibrium before the simulation starts.
+
+    Runs the daily soil and nitrogen routines (without any output) for the
+    number of years given, cycling through the years of the weather. The
+    spun-up soil state is cached in the cache directory, keyed by a hash of the
+    initial soil (i.e. the soil parameters), the weather and the number of
+    years, and reused by any later simulation with the same key.
+
+    Args:
+        soil (Soil): Soil to spin up, in its initial state. Modified in place.
+        weather (Weather): Weather of the simulation
+        years (int): Number of years to spin up for
+        cache_dir (str): Directory of the cached soil states
+
+    Returns:
+        bool: True if the spun-up soil was taken from the cache
+    '''
+
+    key = hashlib.sha256()
+    key.update(str(VERSION).encode())
+    key.update(str(years).encode())
+    key.update(pickle.dumps(soil.snapshot(), protocol=pickle.HIGHEST_PROTOCOL))
+    key.update(weather.fingerprint(registry.weather_used(ROUTINES)).encode())
+
+    cache_fPath = (util.get_base_dir() / cache_dir /
+                   "{}.pkl.gz".format(key.hexdigest()))
+
+    if cache_fPath.exists():
+        with gzip.open(cache_fPath, 'rb') as f:
+            soil.restore(pickle.load(f))
+        return True
+
+    time = Time(weather.duration)
+    forcing = routines.Forcing(weather)
+
+    for _ in range(years * 365):
+        routines.daily_soil_routine(soil, forcing, time)
+        routines.daily_nitrogen_cycling_routine(soil, time, weather)
+        routines.daily_soil_update(soil, weather, time)
+        routines.daily_nitrogen_update(soil, time, weather)
+
+        time.advance()
+        if time.end_year():
+            time.advance()
+        if time.end_simulation():
+            time.year = 1
+
+    cache_fPath.parent.mkdir(exist_ok = True, parents = True)
+    tmp_fPath = cache_fPath.with_name(
+                    "{}.{}.tmp".format(cache_fPath.name, os.getpid()))
+
+    with gzip.open(tmp_fPath, 'wb') as f:
+        pickle.dump(soil.snapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_fPath.replace(cache_fPath)
+
+    return False
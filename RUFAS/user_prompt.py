@@ -82,7 +82,7 @@ def input_prompt():
             #
             elif input_path.is_dir():
                 # Grab all json files in dir
-                path_list = list(input_path.glob('*.json'))
+                path_list = sorted(input_path.glob('*.json'))
                 # Handle no json files in dir
                 if len(path_list) < 1:
                     raise errors.UserInput("Directory contains no json files")
@@ -10,9 +10,10 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 
 import sys
 import pulp
-import time as timer
 from pathlib import Path
 
+from RUFAS import profiler
+
 #-------------------------------------------------------------------------------
 # Function: get_base_dir
 #-------------------------------------------------------------------------------
@@ -86,8 +87,6 @@ def LP_solve(LHS, RHS, objective, variables, operators,
             }
     '''
 
-    start = timer.time()
-
     if mode.lower().startswith("min"):
         LP = pulp.LpProblem(name, pulp.LpMinimize)
     elif mode.lower().startswith("max"):
@@ -137,7 +136,8 @@ def LP_solve(LHS, RHS, objective, variables, operators,
         else:
             LP += pulp.lpSum([ LHS[c][v] * LP_vars[v] for v in range(num_variables) ]) == RHS[c]
 
-    LP.solve(pulp.solvers.GLPK(msg=0))
+    with profiler.section("LP_solve"):
+        LP.solve(pulp.solvers.GLPK(msg=0))
 
     results = { }
     for v in LP.variables():
@@ -146,9 +146,6 @@ def LP_solve(LHS, RHS, objective, variables, operators,
     results['status'] = pulp.LpStatus[LP.status]
     results['objective'] = pulp.value(LP.objective)
 
-    end = timer.time()
-
-    #print("LP elapsed time: " + str(end-start))
     return results
 
 #-------------------------------------------------------------------------------
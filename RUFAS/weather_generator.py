@@ -0,0 +1,220 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: weather_generator.py
+Description: Stochastic weather generator fitted to a weather file
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import numpy as np
+
+from RUFAS import errors
+from RUFAS.weather_overlay import DAYS_IN_MONTHS
+
+# Month (starting at 0) of each julian day
+MONTHS = np.repeat(np.arange(12), DAYS_IN_MONTHS)
+
+# Weather attributes generated from the fitted statistics, conditioned on the
+# day being wet or dry. tAvg is the mean of tMax and tMin.
+CONDITIONED = ('tMax', 'tMin', 'radiation')
+
+# Attributes that are not weather (crop and management data), generated as
+# their mean of each julian day in the weather file
+CLIMATOLOGY = ('biomass', 'addedN')
+
+#-------------------------------------------------------------------------------
+# Function: fit
+#-------------------------------------------------------------------------------
+def fit(data):
+    '''Fits the parameters of the weather generator to observed weather.
+
+    Rainfall is a first order Markov chain of wet and dry days, with the
+    probability of a wet day depending on the month and on the previous day
+    being wet, and gamma distributed amounts on wet days for each month.
+    Maximum and minimum temperatures and radiation are normally distributed
+    around their mean of each month for wet and for dry days, with residuals
+    correlated with each other and from one day to the next (as in the WGEN
+    model).
+
+    Args:
+        data (dict): {attribute: array of shape (years, 365)} of the observed
+            weather, for all attributes of Weather.COLUMNS
+
+    Returns:
+        dict: The fitted parameters, see generate()
+
+    Raises:
+        JSONfileData: If the weather has no wet day
+    '''
+
+    rainfall = np.asarray(data['rainfall'], dtype=float).reshape(-1)
+    wet = rainfall > 0
+    months = np.tile(MONTHS, len(rainfall) // 365)
+
+    if not wet.any():
+        raise errors.JSONfileData("WEATHER",
+                        "\tWeather generator needs a weather file with rain")
+
+    #
+    # Rainfall occurrence: P(wet | previous day dry), P(wet | previous day wet)
+    #
+    p_wet = np.zeros((12, 2))
+    for previous in (0, 1):
+        days = np.flatnonzero(wet[:-1] == previous) + 1
+        p_wet[:, previous] = [ratio(wet[days][months[days] == m])
+                              for m in range(12)]
+
+    #
+    # Rainfall amounts: gamma distribution fitted by moments
+    #
+    shape = np.ones(12)
+    scale = np.full(12, rainfall[wet].mean())
+    for m in range(12):
+        amounts = rainfall[wet & (months == m)]
+        if len(amounts) == 0:
+            continue
+        mean, var = amounts.mean(), amounts.var()
+        if var > 0:
+            shape[m], scale[m] = mean**2 / var, var / mean
+        else:
+            scale[m] = mean
+
+    #
+    # Conditioned attributes: mean and standard deviation of each month for
+    # dry (0) and wet (1) days, correlations of the residuals
+    #
+    mean = np.zeros((len(CONDITIONED), 12, 2))
+    std = np.zeros((len(CONDITIONED), 12, 2))
+    correlation = np.zeros(len(CONDITIONED))
+    residuals = np.zeros((len(CONDITIONED), len(rainfall)))
+
+    for i, attribute in enumerate(CONDITIONED):
+        values = np.asarray(data[attribute], dtype=float).reshape(-1)
+
+        for m in range(12):
+            for state in (0, 1):
+                days = (months == m) & (wet == state)
+                if days.sum() < 2:
+                    days = months == m
+                mean[i, m, state] = values[days].mean()
+                std[i, m, state] = values[days].std()
+
+                days = (months == m) & (wet == state)
+                if std[i, m, state] > 0:
+                    residuals[i, days] = ((values[days] - mean[i, m, state])
+                                          / std[i, m, state])
+
+        if residuals[i, :-1].std() > 0 and residuals[i, 1:].std() > 0:
+            correlation[i] = np.corrcoef(residuals[i, :-1],
+                                         residuals[i, 1:])[0, 1]
+
+    correlation = np.clip(correlation, -0.99, 0.99)
+
+    # Correlations between the residuals of the same day
+    cross = np.eye(len(CONDITIONED))
+    varying = residuals.std(axis=1) > 0
+    if varying.sum() > 1:
+        cross[np.ix_(varying, varying)] = np.corrcoef(residuals[varying])
+
+    return {
+        'p_wet': p_wet,
+        'p_wet_start': wet.mean(),
+        'shape': shape,
+        'scale': scale,
+        'mean': mean,
+        'std': std,
+        'correlation': correlation,
+        'cross': cross,
+        'climatology': {attribute: np.asarray(data[attribute], dtype=float)
+                                     .reshape(-1, 365).mean(axis=0)
+                        for attribute in CLIMATOLOGY},
+    }
+
+#-------------------------------------------------------------------------------
+# Function: ratio
+#-------------------------------------------------------------------------------
+def ratio(flags):
+    '''Returns the fraction of the flags that are set, 0 if there are none.'''
+
+    return flags.mean() if len(flags) else 0.0
+
+#-------------------------------------------------------------------------------
+# Function: generate
+#-------------------------------------------------------------------------------
+def generate(parameters, years, seed=None):
+    '''Generates synthetic years of weather.
+
+    The years are independent and generated together, each step of the
+    Markov chain and of the residuals being one array operation over all the
+    years, so thousands of years are generated at once.
+
+    Args:
+        parameters (dict): Parameters of the generator, see fit()
+        years (int): Number of years to generate
+        seed (int, optional): Seed of the random numbers, the same seed and
+            parameters always give the same weather.
+
+    Returns:
+        dict: {attribute: array of shape (years, 365)} for all attributes of
+            Weather.COLUMNS
+    '''
+
+    rng = np.random.default_rng(seed)
+
+    #
+    # Wet and dry days
+    #
+    p_wet = parameters['p_wet']
+    wet = np.zeros((years, 365), dtype=bool)
+    previous = rng.random(years) < parameters['p_wet_start']
+    for day in range(365):
+        p = p_wet[MONTHS[day], previous.astype(int)]
+        wet[:, day] = previous = rng.random(years) < p
+
+    rainfall = np.where(wet, rng.gamma(parameters['shape'][MONTHS],
+                                       parameters['scale'][MONTHS],
+                                       size=(years, 365)), 0.0)
+
+    #
+    # Residuals with the correlations of the same day and of the previous day,
+    # the random terms having the covariance that keeps those correlations
+    #
+    correlation = parameters['correlation']
+    cross = parameters['cross']
+    start = matrix_root(cross)
+    step = matrix_root(cross * (1 - np.outer(correlation, correlation)))
+
+    noise = rng.standard_normal((len(CONDITIONED), years, 365))
+    residuals = np.empty_like(noise)
+    residuals[:, :, 0] = start @ noise[:, :, 0]
+    for day in range(1, 365):
+        residuals[:, :, day] = (correlation[:, None] * residuals[:, :, day-1] +
+                                step @ noise[:, :, day])
+
+    state = wet.astype(int)
+    weather = {'rainfall': rainfall}
+    for i, attribute in enumerate(CONDITIONED):
+        weather[attribute] = (parameters['mean'][i, MONTHS, state] +
+                              parameters['std'][i, MONTHS, state] *
+                              residuals[i])
+
+    weather['tMax'], weather['tMin'] = (
+        np.maximum(weather['tMax'], weather['tMin']),
+        np.minimum(weather['tMax'], weather['tMin']))
+    weather['tAvg'] = (weather['tMax'] + weather['tMin']) / 2
+    weather['radiation'] = np.maximum(weather['radiation'], 0.0)
+
+    for attribute, values in parameters['climatology'].items():
+        weather[attribute] = np.tile(values, (years, 1))
+
+    return weather
+
+#-------------------------------------------------------------------------------
+# Function: matrix_root
+#-------------------------------------------------------------------------------
+def matrix_root(covariance):
+    '''Returns L with L @ L.T the covariance, clipping negative eigenvalues.'''
+
+    values, vectors = np.linalg.eigh(covariance)
+    return vectors * np.sqrt(np.clip(values, 0, None))
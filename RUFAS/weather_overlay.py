@@ -0,0 +1,124 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: weather_overlay.py
+Description: Climate scenario adjustments applied over the weather data as it
+             is read
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import numpy as np
+
+from RUFAS import errors
+
+# Days of each month, for monthly adjustments
+DAYS_IN_MONTHS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+#-------------------------------------------------------------------------------
+# Function: read_overlays
+#-------------------------------------------------------------------------------
+def read_overlays(overlays, attributes):
+    '''Combines the overlays of the input file into a scale and a shift per day.
+
+    An overlay adjusts one or more weather columns:
+        {
+         "columns": a weather attribute (e.g. "rainfall") or a list of them,
+         "scale": factor the values are multiplied by (optional),
+         "add": value added to the values (optional)
+        }
+    The scale and add of an overlay are each a number, a list of 12 monthly
+    values or a list of 365 daily values, e.g.
+        {"columns": ["tMax", "tMin", "tAvg"], "add": 2}
+        {"columns": "rainfall", "scale": [1.1]*6 + [0.9]*6}
+    Overlays apply in order, the scale of an overlay before its add.
+
+    Args:
+        overlays (list[dict]): The overlays
+        attributes (list[str]): The weather attributes that can be adjusted
+
+    Returns:
+        dict: {attribute: (scale, add)} for each adjusted attribute, scale and
+            add being arrays of 365 daily values
+
+    Raises:
+        JSONfileData: If an overlay is not valid
+    '''
+
+    adjustments = {}
+
+    for n, overlay in enumerate(overlays, 1):
+        if not isinstance(overlay, dict) or 'columns' not in overlay:
+            raise errors.JSONfileData("WEATHER",
+                            "\tWeather overlay {} has no columns".format(n))
+
+        columns = overlay['columns']
+        if isinstance(columns, str):
+            columns = [columns]
+
+        for attribute in columns:
+            if attribute not in attributes:
+                raise errors.JSONfileData("WEATHER",
+                            "\tWeather overlay {}: unknown column {}"
+                            "\n\tColumns are: {}".format(
+                            n, attribute, ", ".join(attributes)))
+
+        scale = daily_values(overlay.get('scale', 1.0), n)
+        add = daily_values(overlay.get('add', 0.0), n)
+
+        for attribute in columns:
+            old_scale, old_add = adjustments.get(attribute,
+                                                 (np.ones(365), np.zeros(365)))
+            adjustments[attribute] = (old_scale * scale, old_add * scale + add)
+
+    return adjustments
+
+#-------------------------------------------------------------------------------
+# Function: daily_values
+#-------------------------------------------------------------------------------
+def daily_values(value, n):
+    '''Returns the 365 daily values of a number, 12 monthly or 365 daily values.
+
+    Raises:
+        JSONfileData: If the value is none of those
+    '''
+
+    try:
+        values = np.array(value, dtype=float).reshape(-1)
+    except (TypeError, ValueError):
+        values = None
+
+    if values is None or len(values) not in (1, 12, 365):
+        raise errors.JSONfileData("WEATHER",
+                        "\tWeather overlay {}: scale and add must be a number,"
+                        " 12 monthly or 365 daily values".format(n))
+
+    if len(values) == 12:
+        return np.repeat(values, DAYS_IN_MONTHS)
+    return np.broadcast_to(values, (365,)).copy()
+
+#-------------------------------------------------------------------------------
+# Class: OverlaidColumn
+#-------------------------------------------------------------------------------
+class OverlaidColumn():
+    '''A weather column seen through the overlays, indexed like the column.
+
+    The values are adjusted as they are read, the data of the column itself is
+    never copied nor changed, so any number of scenarios can share it.
+    '''
+
+    def __init__(self, base, scale, add):
+
+        self.base = base
+        self.scale = scale
+        self.add = add
+        self.shape = base.shape
+
+    def __getitem__(self, key):
+
+        day = key[1] if isinstance(key, tuple) else slice(None)
+        return self.base[key] * self.scale[day] + self.add[day]
+
+    def __len__(self):
+
+        return len(self.base)
@@ -0,0 +1,151 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: weather_registry.py
+Description: Loads each weather file once per process, shares it between the
+             worker processes of a batch
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from RUFAS import errors
+
+#
+# The weather data loaded in this process, read-only arrays of shape
+# (columns, days), see Weather:
+#     {(weather file path, part): (file stamp, data)}
+# The part is the (first year, number of years, attributes) of the file read,
+# None for the whole file.
+# A file stamp is the size and modification time of the file when it was read,
+# the data of a file that changed since is read again.
+#
+_sources = {}
+
+# Shared memory blocks attached by this process, kept open while their data is
+# in use
+_blocks = []
+
+#-------------------------------------------------------------------------------
+# Function: load
+#-------------------------------------------------------------------------------
+def load(weather_full_path, read, part=None):
+    '''Returns the data of a weather file, reading it only once per process.
+
+    Every simulation of the process using the same weather file gets the same
+    read-only array.
+
+    Args:
+        weather_full_path (Path): Path of the weather file
+        read (function): read(weather_full_path), reads the weather file if it
+            is not loaded yet, returns its data
+        part (tuple, optional): (first year, number of years, attributes)
+            of the file read by read(), None for the whole file
+
+    Returns:
+        ndarray: The weather data, read-only
+
+    Raises:
+        JSONfileData: If read() cannot read the weather file
+    '''
+
+    key = (str(weather_full_path.resolve()), part)
+    stamp = file_stamp(weather_full_path)
+
+    source = _sources.get(key)
+    if source is not None and source[0] == stamp:
+        return source[1]
+
+    data = read(weather_full_path)
+    data.flags.writeable = False
+    _sources[key] = (stamp, data)
+
+    return data
+
+#-------------------------------------------------------------------------------
+# Function: file_stamp
+#-------------------------------------------------------------------------------
+def file_stamp(fPath):
+    '''Returns (size, modification time) of a file.'''
+
+    stat = fPath.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+#-------------------------------------------------------------------------------
+# Function: share
+#-------------------------------------------------------------------------------
+def share(sources):
+    '''Copies the data of weather files into shared memory.
+
+    To be called by the parent process of a batch, passing the returned
+    descriptions to attach() in each worker process (e.g. as the initializer
+    of the pool) so that the workers use the shared data instead of each
+    holding its own copy. The blocks must be released with release() once the
+    workers are done. Weather files that cannot be read are not shared, the
+    simulations using them report the error.
+
+    Args:
+        sources (dict): {(weather file path (Path), part): read function},
+            see load()
+
+    Returns:
+        tuple: (descriptions, blocks)
+            descriptions (dict): {(weather file path, part): (file stamp,
+                block name, shape)}, to pass to attach()
+            blocks (list[SharedMemory]): The shared memory blocks, to pass to
+                release()
+    '''
+
+    descriptions = {}
+    blocks = []
+
+    for (weather_full_path, part), read in sources.items():
+        try:
+            data = load(weather_full_path, read, part)
+        except (errors.JSONfileData, OSError):
+            continue
+        key = (str(weather_full_path.resolve()), part)
+
+        block = shared_memory.SharedMemory(create=True,
+                                           size=max(data.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(data.shape, dtype=float, buffer=block.buf)[...] = data
+
+        descriptions[key] = (_sources[key][0], block.name, data.shape)
+
+    return descriptions, blocks
+
+#-------------------------------------------------------------------------------
+# Function: attach
+#-------------------------------------------------------------------------------
+def attach(descriptions):
+    '''Loads the weather data shared by the parent process, see share().'''
+
+    for key, (stamp, name, shape) in descriptions.items():
+        block = shared_memory.SharedMemory(name=name)
+        _blocks.append(block)
+
+        data = np.ndarray(shape, dtype=float, buffer=block.buf)
+        data.flags.writeable = False
+        _sources[key] = (stamp, data)
+
+#-------------------------------------------------------------------------------
+# Function: release
+#-------------------------------------------------------------------------------
+def release(blocks):
+    '''Frees the shared memory blocks created by share().'''
+
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+#-------------------------------------------------------------------------------
+# Function: clear
+#-------------------------------------------------------------------------------
+def clear():
+    '''Forgets the weather data loaded in this process.'''
+
+    _sources.clear()
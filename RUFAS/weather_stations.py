@@ -0,0 +1,233 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: weather_stations.py
+Description: Weather of the fields of a farm, blended from that of many
+             stations
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import numpy as np
+
+from RUFAS import errors
+from RUFAS.classes import Weather
+
+#-------------------------------------------------------------------------------
+# Class: WeatherStations
+#-------------------------------------------------------------------------------
+class WeatherStations():
+    '''The weather of the fields of a farm, from the records of many stations.
+
+    The weather files of all the stations are read once, when loading, into
+    one array:
+        data[station, attribute, year, julian_day]
+    (all starting at 0, attributes in the order of Weather.COLUMNS), and the
+    weight of each station in the weather of each field is computed once into
+    a matrix:
+        weights[field, station]
+    The weather of a field is either the weather of one station, a view of
+    the array, or the inverse-distance weighted mean of the weather of
+    stations around the field, blended from the array in one operation the
+    first time the field is asked for. Any day of the weather of a field is
+    then a single array lookup.
+    '''
+
+    def __init__(self, stations, fields, duration, cache=True, start=0,
+                 attributes=None):
+        '''Reads the weather of the stations, weighs them for each field.
+
+        Stations are {name: {"file": path of the weather file,
+                             "location": [x, y] (optional)}}
+        Fields are a list of, for each field, either
+            {"station": name}: the weather of the station, or
+            {"location": [x, y], "stations": [names] (optional),
+             "power": p (optional, 2 by default)}: the weather of the
+                stations (all those with a location by default) weighted by
+                1 / distance**power.
+        Locations are coordinates on a plane, in the same unit for all the
+        stations and fields (e.g. km on a projected grid).
+
+        Args:
+            stations (dict): The stations
+            fields (list[dict]): The fields
+            duration (int): Number of years simulated
+            cache (bool, optional): Use (and write) the binary cache of the
+                weather files, see Weather.
+            start (int, optional): Year of the weather files (starting at 0)
+                the simulation starts at.
+            attributes (set[str], optional): Weather attributes to load, see
+                Weather.COLUMNS. Defaults to all of them.
+
+        Raises:
+            JSONfileData: If there are no stations or fields, a station has
+                no weather file, a weather file cannot be read or a field is
+                not valid
+        '''
+
+        if not isinstance(stations, dict) or not stations:
+            raise errors.JSONfileData("WEATHER",
+                                      "\tWeather needs at least 1 station")
+        if not isinstance(fields, list) or not fields:
+            raise errors.JSONfileData("WEATHER",
+                                      "\tWeather needs at least 1 field")
+
+        for name, station in stations.items():
+            if not isinstance(station, dict) or 'file' not in station:
+                raise errors.JSONfileData("WEATHER",
+                            "\tStation {} has no weather file".format(name))
+
+        self.fields = fields
+        self.duration = duration
+        self.attributes = Weather.select(attributes)
+        self.names = list(stations)
+
+        self.locations = {name: station['location']
+                          for name, station in stations.items()
+                          if 'location' in station}
+
+        # weights[field, station], each row summing to 1
+        self.weights = np.array([self.field_weights(field, n)
+                                 for n, field in enumerate(fields)])
+
+        # data[station, attribute, year, julian_day], each weather file being
+        # read once per process (see weather_registry)
+        self.data = np.stack([
+            np.stack([getattr(weather, attribute)
+                      for attribute in self.attributes])
+            for weather in (Weather(station['file'], duration, cache, 0, start,
+                                    (), self.attributes)
+                            for station in stations.values())])
+        self.data.flags.writeable = False
+
+        # Blended weather of the fields of many stations, by field
+        self.blends = {}
+
+    #---------------------------------------------------------------------------
+    # Method: field_weights
+    #---------------------------------------------------------------------------
+    def field_weights(self, field, n):
+        '''Returns the weight of each station in the weather of a field.
+
+        Args:
+            field (dict): The field, see __init__()
+            n (int): Number of the field (starting at 0), for errors
+
+        Returns:
+            ndarray: Weights of the stations, summing to 1
+
+        Raises:
+            JSONfileData: If the field is not valid
+        '''
+
+        weights = np.zeros(len(self.names))
+
+        if not isinstance(field, dict):
+            raise errors.JSONfileData("WEATHER",
+                            "\tField {} is not a station nor a location"
+                            .format(n))
+
+        if 'station' in field:
+            if field['station'] not in self.names:
+                raise errors.JSONfileData("WEATHER",
+                            "\tField {}: unknown station {}".format(
+                            n, field['station']))
+            weights[self.names.index(field['station'])] = 1.0
+            return weights
+
+        if 'location' not in field:
+            raise errors.JSONfileData("WEATHER",
+                            "\tField {} has no station nor location".format(n))
+
+        names = field.get('stations', list(self.locations))
+        for name in names:
+            if name not in self.locations:
+                raise errors.JSONfileData("WEATHER",
+                            "\tField {}: station {} has no location".format(
+                            n, name))
+        if not names:
+            raise errors.JSONfileData("WEATHER",
+                            "\tField {}: no station has a location".format(n))
+
+        try:
+            location = np.array(field['location'], dtype=float).reshape(2)
+            distances = np.array([np.hypot(*(np.array(self.locations[name],
+                                                      dtype=float).reshape(2)
+                                             - location))
+                                  for name in names])
+            power = float(field.get('power', 2))
+        except (TypeError, ValueError):
+            raise errors.JSONfileData("WEATHER",
+                            "\tField {}: locations must be [x, y]".format(n))
+
+        # A field at a station gets the weather of the station
+        if (distances == 0).any():
+            nearest = names[int(np.argmin(distances))]
+            weights[self.names.index(nearest)] = 1.0
+            return weights
+
+        inverse = distances ** -power
+        for name, weight in zip(names, inverse / inverse.sum()):
+            weights[self.names.index(name)] += weight
+
+        return weights
+
+    #---------------------------------------------------------------------------
+    # Method: field_data
+    #---------------------------------------------------------------------------
+    def field_data(self, field):
+        '''Returns the weather of a field, data[attribute, year, julian_day].
+
+        For a field of one station, a view of the data of the station. For a
+        field of many stations, their data blended with the weights of the
+        field, computed the first time only.
+
+        Args:
+            field (int): Number of the field (starting at 0)
+
+        Raises:
+            JSONfileData: If the field does not exist
+        '''
+
+        if not (isinstance(field, int) and 0 <= field < len(self.fields)):
+            raise errors.JSONfileData("WEATHER",
+                            "\tNo field {}, there are {} fields".format(
+                            field, len(self.fields)))
+
+        used = np.flatnonzero(self.weights[field])
+        if len(used) == 1:
+            return self.data[used[0]]
+
+        if field not in self.blends:
+            blend = np.tensordot(self.weights[field, used], self.data[used],
+                                 axes=1)
+            blend.flags.writeable = False
+            self.blends[field] = blend
+
+        return self.blends[field]
+
+    #---------------------------------------------------------------------------
+    # Method: weather
+    #---------------------------------------------------------------------------
+    def weather(self, field, overlays=()):
+        '''Returns the weather of a field, to simulate the field with.
+
+        Args:
+            field (int): Number of the field (starting at 0)
+            overlays (list[dict], optional): Adjustments of the weather, see
+                weather_overlay.read_overlays().
+
+        Returns:
+            Weather: The weather of the field, its data being views of
+                field_data()
+
+        Raises:
+            JSONfileData: If the field does not exist or an overlay is not
+                valid
+        '''
+
+        data = self.field_data(field)
+
+        return Weather.from_arrays({attribute: data[i] for i, attribute
+                                    in enumerate(self.attributes)},
+                                   self.duration, overlays)
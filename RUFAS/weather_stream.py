@@ -0,0 +1,259 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: weather_stream.py
+Description: Reads years of weather files from their byte offsets, streams
+             them as the simulation reaches them
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import os
+import json
+import itertools
+
+import numpy as np
+
+from RUFAS import errors
+from RUFAS import weather_registry
+
+#-------------------------------------------------------------------------------
+# Class: WeatherStream
+#-------------------------------------------------------------------------------
+class WeatherStream():
+    '''A weather file read a window of years at a time.
+
+    Only the years of the window are held in memory. When a year outside of
+    the window is needed, the window moves to start at that year and the
+    following years are read ahead, so a simulation advancing year by year
+    reads the file once, a window at a time, whatever its length.
+    '''
+
+    def __init__(self, weather_full_path, columns, window, start=0,
+                 cache_dir=None):
+        '''Indexes the years of the weather file, without reading their data.
+
+        Args:
+            weather_full_path (Path): Path of the weather file
+            columns (list[int]): Columns of the file to read
+            window (int): Number of years held in memory
+            start (int, optional): Year of the file (starting at 0) that is
+                year 0 of the stream.
+            cache_dir (str, optional): Keep the index of the years of the
+                file in this directory next to it, see year_index().
+
+        Raises:
+            JSONfileData: If the window is not at least 1 year
+        '''
+
+        if window < 1:
+            raise errors.JSONfileData("CONFIG",
+                                "\tWeather window must be at least 1 year")
+
+        self.fPath = weather_full_path
+        self.columns = list(columns)
+        self.window = window
+
+        # Byte offset of the first row of each (complete) year streamed
+        self.offsets = year_index(weather_full_path, cache_dir)[start:]
+
+        # The years held: data[year - first, column, julian_day]
+        self.first = 0
+        self.data = np.empty((0, len(self.columns), 365))
+
+    #---------------------------------------------------------------------------
+    # Method: years
+    #---------------------------------------------------------------------------
+    def years(self):
+        '''Returns the number of complete years in the weather file.'''
+
+        return len(self.offsets)
+
+    #---------------------------------------------------------------------------
+    # Method: year
+    #---------------------------------------------------------------------------
+    def year(self, year):
+        '''Returns the data of a year (starting at 0), reading it if needed.
+
+        Returns:
+            ndarray: Floats of shape (columns, 365)
+
+        Raises:
+            IndexError: If the year is not in the file
+            JSONfileData: If the data of the year cannot be read
+        '''
+
+        if not self.first <= year < self.first + len(self.data):
+            self.read(year)
+
+        return self.data[year - self.first]
+
+    #---------------------------------------------------------------------------
+    # Method: read
+    #---------------------------------------------------------------------------
+    def read(self, year):
+        '''Moves the window to start at the year given and reads its years.'''
+
+        if not 0 <= year < len(self.offsets):
+            raise IndexError("Year {} not in weather file".format(year))
+
+        n = min(self.window, len(self.offsets) - year)
+
+        # Drop the current window before reading the next
+        self.data = np.empty((0, len(self.columns), 365))
+
+        data = read_rows(self.fPath, self.columns, self.offsets[year], n*365)
+
+        self.data = np.ascontiguousarray(
+                        data.reshape(n, 365, len(self.columns))
+                            .transpose(0, 2, 1))
+        self.first = year
+
+#-------------------------------------------------------------------------------
+# Class: StreamedColumn
+#-------------------------------------------------------------------------------
+class StreamedColumn():
+    '''A column of a WeatherStream, indexed like the arrays of Weather.
+
+    column[year, julian_day] (both starting at 0) is the value of a day,
+    column[year] the values of a whole year.
+    '''
+
+    def __init__(self, stream, index, duration):
+
+        self.stream = stream
+        self.index = index
+        self.shape = (duration, 365)
+
+    def __getitem__(self, key):
+
+        if isinstance(key, tuple):
+            year, day = key
+        else:
+            year, day = key, slice(None)
+
+        if not 0 <= year < self.shape[0]:
+            raise IndexError("Year {} not simulated".format(year))
+
+        return self.stream.year(year)[self.index, day]
+
+    def __len__(self):
+
+        return self.shape[0]
+
+#-------------------------------------------------------------------------------
+# Function: year_offsets
+#-------------------------------------------------------------------------------
+def year_offsets(fPath):
+    '''Returns the byte offsets of the first row of each year of a weather file.
+
+    The first line of the file is the header. Rows of an incomplete last year
+    are left out.
+    '''
+
+    offsets = []
+
+    with fPath.open('rb') as f:
+        f.readline()
+
+        offset = f.tell()
+        rows = 0
+        for line in iter(f.readline, b''):
+            if line.strip():
+                if rows % 365 == 0:
+                    offsets.append(offset)
+                rows += 1
+            offset += len(line)
+
+    if rows % 365:
+        offsets.pop()
+
+    return offsets
+
+#-------------------------------------------------------------------------------
+# Function: year_index
+#-------------------------------------------------------------------------------
+def year_index(fPath, cache_dir=None):
+    '''Returns the byte offsets of the years of a weather file, see
+    year_offsets().
+
+    With a cache directory, the offsets are kept in a json file in that
+    directory next to the weather file, and only found again when the weather
+    file changes (in size or modification time). If the index cannot be
+    written (e.g. read-only directory), the offsets are found on every call.
+
+    Args:
+        fPath (Path): Path of the weather file
+        cache_dir (str, optional): Directory of the index, next to the file
+
+    Returns:
+        list[int]: Byte offset of the first row of each year of the file
+    '''
+
+    if cache_dir is None:
+        return year_offsets(fPath)
+
+    stamp = list(weather_registry.file_stamp(fPath))
+    index_fPath = fPath.parent / cache_dir / (fPath.name + ".index.json")
+
+    try:
+        with index_fPath.open('r') as f:
+            index = json.load(f)
+        if index['stamp'] == stamp:
+            return index['offsets']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    offsets = year_offsets(fPath)
+
+    tmp_fPath = index_fPath.with_name(
+                    "{}.{}.tmp".format(index_fPath.name, os.getpid()))
+    try:
+        index_fPath.parent.mkdir(exist_ok = True, parents = True)
+        with tmp_fPath.open('w') as f:
+            json.dump({'stamp': stamp, 'offsets': offsets}, f)
+        tmp_fPath.replace(index_fPath)
+    except OSError:
+        tmp_fPath.unlink(missing_ok = True)
+
+    return offsets
+
+#-------------------------------------------------------------------------------
+# Function: read_rows
+#-------------------------------------------------------------------------------
+def read_rows(fPath, columns, offset=None, rows=None):
+    '''Parses rows of a weather file.
+
+    Args:
+        fPath (Path): Path of the weather file
+        columns (list[int]): Columns to read
+        offset (int, optional): Byte offset of the first row to read.
+            Defaults to the row after the header.
+        rows (int, optional): Number of rows to read. Defaults to all the rows
+            to the end of the file.
+
+    Returns:
+        ndarray: Floats of shape (rows, columns)
+
+    Raises:
+        JSONfileData: If the rows cannot be read
+    '''
+
+    try:
+        if offset is None and rows is None:
+            return np.loadtxt(fPath, delimiter=',', skiprows=1,
+                              usecols=columns, dtype=float, ndmin=2)
+
+        with fPath.open('rb') as f:
+            if offset is None:
+                f.readline()
+            else:
+                f.seek(offset)
+            lines = (line.decode() for line in itertools.islice(f, rows))
+            return np.loadtxt(lines, delimiter=',', usecols=columns,
+                              dtype=float, ndmin=2)
+
+    except ValueError as e:
+        raise errors.JSONfileData("WEATHER",
+                                  "\tWeather file could not be read: " +
+                                  str(e))
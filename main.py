@@ -9,7 +9,14 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 
 #!/usr/bin/env python3
 
+import sys
+import argparse
+import multiprocessing
+import time as timer
+from pathlib import Path
+
 import RUFAS
+from RUFAS import errors
 
 def main():
     '''
@@ -18,10 +25,54 @@ def main():
     Prompts the user to enter an input path to a json file or a directory of
     json files. The path(s) are returned in a list, which the program loops
     through and executes the simulation for each of the files in the list.
+
+    With -w/--workers N (N > 1), a directory of json files is simulated by N
+    worker processes in parallel. Each simulation then writes its reports to a
+    sub-directory (named after the input file) of its output directory, and a
+    summary of all simulations is printed at the end.
+
+    With -m/--manifest, runs the simulations listed in a json/csv manifest
+    file without prompting (see RUFAS.read_manifest()), on all CPUs unless
+    -w/--workers is given, and writes a json summary of the batch
+    (-s/--summary, defaults to <manifest name>_summary.json next to the
+    manifest).
+
+    With -r/--resume, simulations with checkpoints enabled resume from their
+    latest checkpoint.
+
+    With -p/--profile, the time spent in each routine is printed after each
+    simulation (or recorded in the batch summary).
     '''
 
+    parser = argparse.ArgumentParser(description="Ruminant Farm Systems Model")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes for batch simulations")
+    parser.add_argument('-m', '--manifest', type=Path, default=None,
+                        help="json or csv file listing the simulations to run")
+    parser.add_argument('-s', '--summary', type=Path, default=None,
+                        help="json file to write the batch summary to")
+    parser.add_argument('-r', '--resume', action='store_true',
+                        help="resume simulations from their latest checkpoint")
+    parser.add_argument('-p', '--profile', action='store_true',
+                        help="time the routines of the simulations")
+    args = parser.parse_args()
+
     print("\nRUFAS: Ruminant Farm Systems Model 2018")
 
+    #
+    # Headless batch simulation from a manifest
+    #
+    if args.manifest is not None:
+        try:
+            runs = RUFAS.read_manifest(args.manifest)
+        except errors.UserInput as e:
+            print(e.msg)
+            sys.exit(1)
+
+        run_batch(runs, args.workers, args.resume, args.profile, args.summary or
+                  args.manifest.with_name(args.manifest.stem + "_summary.json"))
+        return
+
     #
     # Prompt user for an input
     # Input could either be a json file when doing only 1 simulation
@@ -29,16 +80,38 @@ def main():
     #
     input_file_list = RUFAS.input_prompt()
 
+    #
+    # Parallel batch simulation
+    #
+    if (args.workers or 1) > 1 and len(input_file_list) > 1:
+        run_batch(input_file_list, args.workers, args.resume, args.profile,
+                  args.summary)
+        return
+
     #
     # Begin the simulation
     # Runs the simulation for each input file in input_file_path
     # Runs only 1 simulation in the case of a single input file
     #
     for input_file_path in input_file_list:
-        RUFAS.simulate(input_file_path)
+        RUFAS.simulate(input_file_path, args.resume, args.profile)
+
+def run_batch(runs, workers, resume, profile, summary_fPath):
+    '''Runs a batch of simulations, prints and (optionally) writes a summary.'''
+
+    t_start = timer.time()
+    results, workers = RUFAS.run_batch(runs, workers, resume, profile)
+    wall_time = timer.time() - t_start
+
+    RUFAS.print_summary(results)
+
+    if summary_fPath is not None:
+        RUFAS.write_summary(results, summary_fPath, workers, wall_time)
+        print("Batch summary written to {}\n".format(summary_fPath))
 
 #-------------------------------------------------------------------------------
 # PROGRAM ENTRY POINT
 #-------------------------------------------------------------------------------
-if __name__ == '__main__': main()
-
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    main()
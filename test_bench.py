@@ -10,10 +10,15 @@ Author(s): Kass Chupongstimun, kass_c@hotmail.com
 
 #!/usr/bin/env python3
 
+import argparse
+import traceback
+
 from tests import *
 
 def test():
 
+	failures = []
+
     #
     # TEST LP ROUTINE
     #
@@ -22,11 +27,98 @@ def test():
     #
     # TEST RATION FORMULATION ROUTINE
     #
-	test_ration()
+	run_test(test_ration, failures)
+
+    #
+    # TEST ENSEMBLE ENGINE AGAINST FARMS SIMULATED ALONE
+    #
+	run_test(test_ensemble, failures)
+
+    #
+    # TEST SOIL PROFILE REPORTS AGAINST THE SOIL OBJECTS
+    #
+	run_test(test_soil_profile, failures)
+
+    #
+    # TEST THE SOIL COEFFICIENTS AFTER CHANGES OF THE SOIL PARAMETERS
+    #
+	run_test(test_soil_coefficients, failures)
+
+    #
+    # TEST SIMULATIONS RESUMED FROM A CHECKPOINT
+    #
+	run_test(test_checkpoint, failures)
+
+    #
+    # TEST THE SPIN-UP CACHE
+    #
+	run_test(test_spinup, failures)
+
+    #
+    # TEST THE RECORDS OF SIMULATIONS ITERATED OVER
+    #
+	run_test(test_iterate, failures)
+
+    #
+    # TEST THE WEATHER LOADED AGAINST THE WEATHER FILE
+    #
+	run_test(test_weather_start, failures)
+	run_test(test_weather_cache, failures)
+	run_test(test_weather_overlays, failures)
+	run_test(test_weather_generator, failures)
+	run_test(test_weather_stations, failures)
+
+    #
+    # TEST REPEATED RUNS IN ONE PROCESS (AS BY THE WORKERS OF A BATCH)
+    #
+	run_test(test_repeated_runs, failures)
+
+	if failures:
+		raise AssertionError("Tests failed: " + ", ".join(failures))
+
+def run_test(test, failures):
+    '''Runs a test, printing its error instead of stopping the test bench.
+
+    Args:
+        test (function): The test
+        failures (list[str]): Names of the failed tests, the test is added to it
+            if it fails
+    '''
+
+    try:
+        test()
+    except Exception:
+        print("\n{} FAILED".format(test.__name__))
+        traceback.print_exc()
+        failures.append(test.__name__)
+
+def benchmark(save_baseline=False):
+
+    #
+    # SCALING BENCHMARK OF THE SIMULATION ENGINE
+    # Compares with tests/b_scaling_baseline.json
+    #
+    benchmark_scaling(save_baseline=save_baseline)
+
+    #
+    # MEMORY OF THE SOIL LAYER AND APPLICATION RECORDS
+    #
+    benchmark_memory()
 
 #-------------------------------------------------------------------------------
 # PROGRAM ENTRY POINT
 #------------------------------------------------------------------------------- 
-if __name__ == '__main__': test()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="RUFAS test bench")
+    parser.add_argument('-b', '--benchmark', action='store_true',
+                        help="run the scaling benchmark instead of the tests")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store the benchmark results as the new baseline")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.save_baseline)
+    else:
+        test()
         
     
\ No newline at end of file
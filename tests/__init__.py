@@ -1,2 +1,12 @@
 from .t_LP import *
-from .t_ration import *
\ No newline at end of file
+from .t_ration import *
+from .t_ensemble import *
+from .t_soil_profile import *
+from .t_soil_coefficients import *
+from .t_checkpoint import *
+from .t_spinup import *
+from .t_iterate import *
+from .t_weather import *
+from .t_repeated_runs import *
+from .b_scaling import *
+from .b_memory import *
\ No newline at end of file
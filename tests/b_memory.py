@@ -0,0 +1,121 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: b_memory.py
+Description: Memory benchmark of the soil layer and application records
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import json
+import timeit
+import tracemalloc
+
+from RUFAS import util
+from RUFAS.routines import Soil
+from RUFAS.routines.soil.soil import attributes_of
+
+# Records of the benchmark: (class, name of its section in the soil data)
+RECORDS = ((Soil.SoilLayer, 'SoilLayers'), (Soil.Fertilizer, 'Fertilizers'),
+           (Soil.Manure, 'ManureApplication'),
+           (Soil.Tillage, 'TillageOperations'),
+           (Soil.CropPUptake, 'CropPUptake'))
+
+#-------------------------------------------------------------------------------
+# Class: DictRecord
+#-------------------------------------------------------------------------------
+class DictRecord():
+    '''A record holding its attributes in a __dict__, for comparison.'''
+
+#-------------------------------------------------------------------------------
+# Function: benchmark_memory
+#-------------------------------------------------------------------------------
+def benchmark_memory(farms=1000, layers=30):
+    '''Compares the memory of the slot records with records with a __dict__.
+
+    Makes the soil layers and applications of many farms (those of
+    Inputs/Sample.json, with the number of layers given) as the slot classes
+    of Soil, and as objects with the same attributes in a __dict__, as they
+    were before. Prints the memory of each and the time to read an attribute
+    of every layer.
+
+    Args:
+        farms (int, optional): Number of farms
+        layers (int, optional): Number of soil layers of each farm
+
+    Returns:
+        dict: {record class name: {'slots_mb': float, 'dict_mb': float}}
+    '''
+
+    with (util.get_base_dir() / "Inputs/Sample.json").open('r') as f:
+        soil_data = json.load(f)['farm']['soil']
+
+    results = {}
+    text = "{:<12}  {:>8}  {:>14}  {:>14}  {:>8}\n".format(
+           "Record", "Count", "Slots (MB)", "Dict (MB)", "Saving")
+
+    for record, section in RECORDS:
+        items = list(soil_data[section].items())
+        if not items:
+            continue
+        if record is Soil.SoilLayer:
+            items = [items[i % len(items)] for i in range(layers)]
+        items = items * farms
+
+        slots = traced_memory(lambda: [record(name, data)
+                                       for name, data in items])
+        dicts = traced_memory(lambda: [as_dict_record(record(name, data))
+                                       for name, data in items])
+
+        results[record.__name__] = {'slots_mb': slots / 2**20,
+                                    'dict_mb': dicts / 2**20}
+        text += "{:<12}  {:>8}  {:>14.2f}  {:>14.2f}  {:>8.0%}\n".format(
+                record.__name__, len(items), slots / 2**20, dicts / 2**20,
+                1 - slots / dicts)
+
+    # Reading an attribute of every layer, as the soil routines do
+    layer_name, layer_data = next(iter(soil_data['SoilLayers'].items()))
+    slot_layers = [Soil.SoilLayer(layer_name, layer_data)
+                   for _ in range(farms * layers)]
+    dict_layers = [as_dict_record(layer) for layer in slot_layers]
+
+    text += "\nReading NO3 of {} layers: slots {:.2f} ms, dict {:.2f} ms\n".format(
+            farms * layers, read_time(slot_layers), read_time(dict_layers))
+
+    print(text)
+    return results
+
+#-------------------------------------------------------------------------------
+# Function: traced_memory
+#-------------------------------------------------------------------------------
+def traced_memory(make):
+    '''Returns the bytes allocated by make() and still held by its result.'''
+
+    tracemalloc.start()
+    try:
+        result = make()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return size
+
+#-------------------------------------------------------------------------------
+# Function: as_dict_record
+#-------------------------------------------------------------------------------
+def as_dict_record(record):
+    '''Returns a DictRecord with the attributes of a slot record.'''
+
+    copy = DictRecord()
+    vars(copy).update(attributes_of(record))
+    return copy
+
+#-------------------------------------------------------------------------------
+# Function: read_time
+#-------------------------------------------------------------------------------
+def read_time(records):
+    '''Returns the time (ms) to sum an attribute of all the records.'''
+
+    return min(timeit.repeat(lambda: sum(record.NO3 for record in records),
+                             number=1, repeat=5)) * 1000
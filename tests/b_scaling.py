@@ -0,0 +1,282 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: b_scaling.py
+Description: Scaling benchmark of the simulation engine on synthetic inputs
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import json
+import math
+import tempfile
+import contextlib
+import time as timer
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:     # Not available on Windows
+    resource = None
+
+from RUFAS.batch import run_one, run_batch
+from tests.helpers import write_input
+
+# Points of the benchmark
+YEARS = (1, 10, 50, 100, 500)       # years simulated, with 3 soil layers
+LAYERS = (3, 10, 30, 100)           # soil layers, for 2 simulated years, on
+                                    # the default config, the Soil objects
+                                    # and the soil profile (see
+                                    # Config.soil_profile)
+BATCH_SIZES = (1, 10, 100, 1000)    # 1 year simulations per batch
+
+# Layer points: (name prefix, soil_profile of the config, None for its
+# default, description)
+LAYER_POINTS = (("layers", None, "Default config"),
+                ("objects_layers", False, "Soil objects"),
+                ("profile_layers", True, "Soil profile"))
+
+# Runs of each layer point, the fastest is kept: the time per day of a single
+# run varies with the load of the machine
+LAYER_REPEATS = 5
+
+BASELINE_FILE = Path(__file__).parent / "b_scaling_baseline.json"
+
+# Relative change from the baseline reported as a regression
+TOLERANCE = 0.20
+
+# Largest exponent k of time per day ~ layers**k on the default config: the
+# time per day must grow less than half as much as the number of layers (for
+# 3 to 100 layers, 33**0.8 = 16). The reports write every layer, so their
+# part of the time grows linearly.
+MAX_LAYER_GROWTH = 0.8
+
+#-------------------------------------------------------------------------------
+# Function: benchmark_scaling
+#-------------------------------------------------------------------------------
+def benchmark_scaling(years=YEARS, layers=LAYERS, batch_sizes=BATCH_SIZES,
+                      workers=None, save_baseline=False):
+    '''Runs the engine at increasing scale and compares with the baseline.
+
+    Every point is simulated in a fresh process, on synthetic weather and soil
+    inputs written to a temporary directory. Prints simulated days per second
+    and peak memory (peak resident set size, where the OS reports it) of each
+    point, with the change from the baseline, and how the time per simulated
+    day grows with the number of soil layers. That growth must stay below
+    MAX_LAYER_GROWTH on the default config.
+
+    Args:
+        years (list[int], optional): Numbers of years to simulate.
+        layers (list[int], optional): Numbers of soil layers to simulate.
+        batch_sizes (list[int], optional): Numbers of simulations per batch.
+        workers (int, optional): Worker processes of the batches.
+            Defaults to the number of CPUs on the machine.
+        save_baseline (bool, optional): Store the results as the new baseline.
+
+    Returns:
+        dict: {point name: {'days_per_second': float,
+                            'peak_memory_mb': float or None}}
+    '''
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+
+        for n in years:
+            fPath = write_input(tmp_dir, "years_{}".format(n), n, 3)
+            results["years={}".format(n)] = measure(measure_run, fPath)
+
+        layer_points = {"{}={}".format(prefix, n): write_input(
+                            tmp_dir, "{}_{}".format(prefix, n), 2, n,
+                            soil_profile=soil_profile)
+                        for prefix, soil_profile, _ in LAYER_POINTS
+                        for n in layers}
+
+        # The points take turns, so that a slow spell of the machine slows
+        # one run of each point rather than all the runs of one point
+        for _ in range(LAYER_REPEATS):
+            for point, fPath in layer_points.items():
+                result = measure(measure_run, fPath)
+                if (point not in results or result['days_per_second'] >
+                        results[point]['days_per_second']):
+                    results[point] = result
+
+        for n in batch_sizes:
+            fPaths = [write_input(tmp_dir / "batch_{}".format(n),
+                                  "run_{}".format(i), 1, 3, seed=i)
+                      for i in range(n)]
+            results["batch={}".format(n)] = measure(measure_batch, fPaths,
+                                                    workers)
+
+    baseline = {}
+    if BASELINE_FILE.is_file():
+        with BASELINE_FILE.open('r') as f:
+            baseline = json.load(f)
+
+    print(compare(results, baseline))
+    if len(layers) > 1:
+        print(layer_growth(results, layers))
+
+        slowdown, exponent = growth(results, "layers", layers)
+        assert exponent < MAX_LAYER_GROWTH, (
+            "Time per day ~ layers**{:.2f} on the default config, {:.1f}x "
+            "for {}x the layers".format(exponent, slowdown,
+                                        max(layers) // min(layers)))
+
+    if save_baseline:
+        with BASELINE_FILE.open('w') as f:
+            json.dump(results, f, indent=4)
+        print("Baseline written to {}\n".format(BASELINE_FILE))
+
+    return results
+
+#-------------------------------------------------------------------------------
+# Function: compare
+#-------------------------------------------------------------------------------
+def compare(results, baseline):
+    '''Returns a table of the results and their change from the baseline.
+
+    Points slower or using more memory than the baseline by more than
+    TOLERANCE are marked as regressions.
+    '''
+
+    text = "{:<18}  {:>12}  {:>8}  {:>14}  {:>8}\n".format(
+           "Point", "Days/s", "Change", "Peak Mem (MB)", "Change")
+
+    for point, result in results.items():
+        base = baseline.get(point, {})
+        speed = change(result['days_per_second'], base.get('days_per_second'))
+        memory = change(result['peak_memory_mb'], base.get('peak_memory_mb'))
+
+        regression = ((speed is not None and speed < -TOLERANCE) or
+                      (memory is not None and memory > TOLERANCE))
+
+        text += "{:<18}  {:>12.1f}  {:>8}  {:>14}  {:>8}{}\n".format(
+                point, result['days_per_second'], percent(speed),
+                "-" if result['peak_memory_mb'] is None
+                else "{:.1f}".format(result['peak_memory_mb']),
+                percent(memory), "  REGRESSION" if regression else "")
+
+    return text
+
+#-------------------------------------------------------------------------------
+# Function: layer_growth
+#-------------------------------------------------------------------------------
+def layer_growth(results, layers):
+    '''Returns how the time per simulated day grows with the soil layers.
+
+    The growth is the exponent k of time per day ~ layers**k between the
+    fewest and the most layers: below 1, the time grows sublinearly (the
+    per-layer work is small next to the work done once per day).
+    '''
+
+    text = ""
+
+    for prefix, _, name in LAYER_POINTS:
+        slowdown, exponent = growth(results, prefix, layers)
+        text += ("{}: {}x the layers, {:.1f}x the time per day, time ~ "
+                 "layers**{:.2f}\n".format(name, max(layers) // min(layers),
+                                           slowdown, exponent))
+
+    return text
+
+#-------------------------------------------------------------------------------
+# Function: growth
+#-------------------------------------------------------------------------------
+def growth(results, prefix, layers):
+    '''Returns how the time per day of the layer points of a prefix grows.
+
+    Returns:
+        tuple: (slowdown, exponent)
+            slowdown (float): Time per day with the most layers over the time
+                per day with the fewest
+            exponent (float): The exponent k of time per day ~ layers**k
+    '''
+
+    fewest, most = min(layers), max(layers)
+    slowdown = (results["{}={}".format(prefix, fewest)]['days_per_second'] /
+                results["{}={}".format(prefix, most)]['days_per_second'])
+
+    return slowdown, math.log(slowdown) / math.log(most / fewest)
+
+#-------------------------------------------------------------------------------
+# Function: change
+#-------------------------------------------------------------------------------
+def change(value, base):
+    '''Returns the relative change from base to value, None if unknown.'''
+
+    if value is None or not base:
+        return None
+    return (value - base) / base
+
+#-------------------------------------------------------------------------------
+# Function: percent
+#-------------------------------------------------------------------------------
+def percent(fraction):
+    '''Formats a relative change as a percentage.'''
+
+    return "-" if fraction is None else "{:+.1%}".format(fraction)
+
+#-------------------------------------------------------------------------------
+# Function: measure
+#-------------------------------------------------------------------------------
+def measure(function, *args):
+    '''Calls function(*args) in a fresh process and returns its result.
+
+    A fresh process keeps the peak memory of every point separate.
+    '''
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(function, *args).result()
+
+#-------------------------------------------------------------------------------
+# Function: measure_run
+#-------------------------------------------------------------------------------
+def measure_run(input_fPath:Path):
+    '''Simulates a single input file, see benchmark_scaling().'''
+
+    result = run_one(input_fPath)
+    if result['status'] != "Success":
+        raise RuntimeError("{}: {}".format(input_fPath, result['error']))
+
+    return {'days_per_second': result['days_per_second'],
+            'peak_memory_mb': peak_memory_mb(resource.RUSAGE_SELF)
+                              if resource else None}
+
+#-------------------------------------------------------------------------------
+# Function: measure_batch
+#-------------------------------------------------------------------------------
+def measure_batch(input_fPaths, workers=None):
+    '''Simulates a batch of input files, see benchmark_scaling().
+
+    The peak memory is that of the largest worker process.
+    '''
+
+    t_start = timer.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, _ = run_batch(input_fPaths, workers)
+    wall_time = timer.time() - t_start
+
+    failed = [r for r in results if r['status'] != "Success"]
+    if failed:
+        raise RuntimeError("{}: {}".format(failed[0]['input'],
+                                           failed[0]['error']))
+
+    return {'days_per_second': sum(r['days'] for r in results) / wall_time,
+            'peak_memory_mb': peak_memory_mb(resource.RUSAGE_CHILDREN)
+                              if resource else None}
+
+#-------------------------------------------------------------------------------
+# Function: peak_memory_mb
+#-------------------------------------------------------------------------------
+def peak_memory_mb(who):
+    '''Returns the peak resident set size of the process(es) in MB.'''
+
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    maxrss = resource.getrusage(who).ru_maxrss
+    if maxrss > 2**32:
+        return maxrss / 2**20
+    return maxrss / 2**10
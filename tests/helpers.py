@@ -0,0 +1,140 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: helpers.py
+Description: Synthetic inputs and report comparisons shared by the tests and
+             benchmarks
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import copy
+import json
+import math
+import random
+import contextlib
+from pathlib import Path
+
+from RUFAS import util
+from RUFAS.simulation_engine import Simulation
+
+# First year of the synthetic inputs
+START_YEAR = 2008
+
+#-------------------------------------------------------------------------------
+# Function: write_input
+#-------------------------------------------------------------------------------
+def write_input(tmp_dir:Path, name, years, layers, seed=0, reports=None,
+                soil_profile=None):
+    '''Writes a synthetic json input file and its weather file.
+
+    The input file is Inputs/Sample.json with the years, weather, soil layers
+    and output directory replaced.
+
+    Args:
+        tmp_dir (Path): Directory to write the files to
+        name (str): Name of the simulation, used for the file names
+        years (int): Number of years to simulate
+        layers (int): Number of soil layers, of equal depth
+        seed (int, optional): Seed of the synthetic weather
+        reports (list[str], optional): Reports to keep active.
+            Defaults to those of Inputs/Sample.json.
+        soil_profile (bool, optional): Run the soil routines on the soil
+            profile, see Config.soil_profile. Defaults to the choice of the
+            simulation, by number of layers.
+
+    Returns:
+        Path: path of the json input file
+    '''
+
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    with (util.get_base_dir() / "Inputs/Sample.json").open('r') as f:
+        data = json.load(f)
+
+    weather_fPath = tmp_dir / (name + "_weather.csv")
+    write_weather(weather_fPath, years, seed)
+
+    data['config']['StartYear'] = START_YEAR
+    data['config']['EndYear'] = START_YEAR + years - 1
+    data['config']['output_dir'] = str(tmp_dir / (name + "_outputs"))
+    if soil_profile is not None:
+        data['config']['soil_profile'] = soil_profile
+    data['weather'] = str(weather_fPath)
+
+    if reports is not None:
+        for report, report_data in data['output'].items():
+            report_data['active'] = report in reports
+
+    soil = data['farm']['soil']
+    template = soil['SoilLayers']['Layer1']
+    soil['SoilLayers'] = {}
+    for i in range(layers):
+        layer = copy.deepcopy(template)
+        layer['BottomDepth'] = soil['ProfileDepth'] * (i+1) / layers
+        layer['InitialTemperature'] = 12 - 4 * i / layers
+        soil['SoilLayers']["Layer{}".format(i+1)] = layer
+
+    fPath = tmp_dir / (name + ".json")
+    with fPath.open('w') as f:
+        json.dump(data, f, indent=4)
+
+    return fPath
+
+#-------------------------------------------------------------------------------
+# Function: write_weather
+#-------------------------------------------------------------------------------
+def write_weather(fPath:Path, years, seed=0):
+    '''Writes a synthetic weather file of the number of years given.
+
+    Seasonal temperatures and radiation, rain on about one day in four.
+    '''
+
+    rng = random.Random(seed)
+
+    with fPath.open('w') as f:
+        f.write("Julian Day,Rainfall,Tmax,Tmin,Tavg,Biomass,Radiation,AddedN\n")
+        for _ in range(years):
+            for day in range(1, 366):
+                season = -math.cos(2 * math.pi * (day - 15) / 365)
+                tAvg = 8 + 15 * season + rng.gauss(0, 3)
+                spread = 5 + 2 * rng.random()
+                rainfall = rng.expovariate(1/8) if rng.random() < 0.25 else 0
+                radiation = 15 + 10 * season + rng.gauss(0, 2)
+                f.write("{},{:.3f},{:.3f},{:.3f},{:.3f},{},{:.3f},{}\n".format(
+                        day, rainfall, tAvg + spread, tAvg - spread, tAvg,
+                        250, max(radiation, 0), 0))
+
+#-------------------------------------------------------------------------------
+# Function: run_reports
+#-------------------------------------------------------------------------------
+def run_reports(input_fPath, output_dir, soil_profile):
+    '''Runs a simulation, returns {report file name: its content}.'''
+
+    simulation = Simulation(input_fPath, output_dir=output_dir,
+                            overrides={"config.soil_profile": soil_profile})
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulation.run()
+
+    return {fPath.name: fPath.read_text()
+            for fPath in sorted(Path(output_dir).glob("*.csv"))}
+
+#-------------------------------------------------------------------------------
+# Function: first_difference
+#-------------------------------------------------------------------------------
+def first_difference(expected, actual):
+    '''Describes the first cell where two csv texts differ.'''
+
+    lines = zip(expected.splitlines(), actual.splitlines())
+    for row, (expected_line, actual_line) in enumerate(lines):
+        if expected_line != actual_line:
+            header = expected.splitlines()[0].split(',')
+            cells = zip(header, expected_line.split(','),
+                        actual_line.split(','))
+            for column, expected_cell, actual_cell in cells:
+                if expected_cell != actual_cell:
+                    return "row {}, {}: {} != {}".format(
+                           row, column, expected_cell, actual_cell)
+
+    return "different number of rows"
@@ -0,0 +1,86 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_checkpoint.py
+Description: Checks that a simulation stopped partway and resumed from its
+             checkpoint writes the same reports as an uninterrupted one
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import tempfile
+import contextlib
+from pathlib import Path
+
+from RUFAS.simulation_engine import Simulation
+from tests.helpers import write_input, run_reports, first_difference
+
+# Years simulated, and years simulated before the simulation is stopped
+CHECKPOINT_YEARS = 3
+CHECKPOINT_STOP = 1
+
+# Days of the following year simulated (and written to the reports, as by a
+# simulation killed while writing) before the simulation is stopped
+CHECKPOINT_STOP_DAYS = 100
+
+#-------------------------------------------------------------------------------
+# Function: test_checkpoint
+#-------------------------------------------------------------------------------
+def test_checkpoint():
+    '''Stops a simulation partway, resumes it from its checkpoint.
+
+    The simulation is stopped in the middle of a year, after the rows of the
+    days simulated since the last checkpoint were written to the reports. The
+    reports of the resumed simulation must be byte-identical to those of the
+    same simulation run without interruption, on the Soil objects and on the
+    soil profile, and only the days after the checkpoint must be counted as
+    simulated.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        fPath = write_input(tmp_dir, "checkpoint", CHECKPOINT_YEARS, 3)
+
+        for soil_profile in (False, True):
+            name = "profile" if soil_profile else "objects"
+
+            expected = run_reports(fPath, tmp_dir / (name + "_expected"),
+                                   soil_profile)
+
+            output_dir = tmp_dir / (name + "_resumed")
+            overrides = {"config.soil_profile": soil_profile,
+                         "config.checkpoint_dir": str(tmp_dir / (name +
+                                                                 "_checkpoint"))}
+
+            stopped = Simulation(fPath, output_dir=output_dir,
+                                 overrides=overrides)
+            assert not stopped.start(resume=True)
+            for _ in range(CHECKPOINT_STOP):
+                stopped.annual_simulation()
+            for _ in range(CHECKPOINT_STOP_DAYS):
+                stopped.daily_simulation()
+            stopped.output.write_annual_reports(stopped.time.year)
+
+            resumed = Simulation(fPath, output_dir=output_dir,
+                                 overrides=overrides)
+            printed = io.StringIO()
+            with contextlib.redirect_stdout(printed):
+                resumed.run(resume=True)
+            assert "Resuming" in printed.getvalue(), "Not resumed"
+            assert resumed.days_simulated == (
+                   (CHECKPOINT_YEARS - CHECKPOINT_STOP) * 365), (
+                   "{} days simulated when resumed".format(
+                   resumed.days_simulated))
+
+            actual = {report.name: report.read_text()
+                      for report in sorted(output_dir.glob("*.csv"))}
+
+            assert expected, "No report written"
+            assert expected.keys() == actual.keys()
+            for report, text in expected.items():
+                assert text == actual[report], "{}, {}: {}".format(
+                       name, report, first_difference(text, actual[report]))
+
+    print("Simulations resumed from a checkpoint after year {} write the same "
+          "reports as uninterrupted ones".format(CHECKPOINT_STOP))
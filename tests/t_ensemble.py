@@ -0,0 +1,72 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_ensemble.py
+Description: Checks the ensemble engine against farms simulated one by one
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+from pathlib import Path
+
+import numpy as np
+
+from RUFAS import util
+from RUFAS.ensemble import Ensemble
+from RUFAS.simulation_engine import Simulation
+
+ENSEMBLE_INPUT = Path("Inputs/Sample.json")
+
+ENSEMBLE_FARMS = [
+    {},
+    {"farm.soil.CN2": 75},
+    {"farm.soil.Sand": 40, "farm.soil.SoilLayers.Layer1.Ksat": 10},
+    {"farm.soil.Residue": 500, "farm.soil.FieldSlope": 0.08,
+     "farm.soil.SoilLayers.Layer2.NH4": 5},
+]
+
+ENSEMBLE_FIELDS = ["soil.runoff", "soil.Tsurf", "soil.snowCorrectedSed",
+                   "soil.topLayerFreshN", "layers.temperature",
+                   "layers.currentSoilWaterMM", "layers.perc", "layers.NO3",
+                   "layers.NH4", "layers.activeN", "layers.stableN"]
+
+#-------------------------------------------------------------------------------
+# Function: test_ensemble
+#-------------------------------------------------------------------------------
+def test_ensemble():
+
+    input_fPath = util.get_base_dir() / ENSEMBLE_INPUT
+
+    ensemble = Ensemble(input_fPath, ENSEMBLE_FARMS)
+    records = list(ensemble.iterate(ENSEMBLE_FIELDS))
+
+    farms = [simulate_farm(input_fPath, overrides)
+             for overrides in ENSEMBLE_FARMS]
+
+    worst = 0.0
+    for i, farm in enumerate(farms):
+        assert len(farm) == len(records)
+        for record, expected in zip(records, farm):
+            for field in ENSEMBLE_FIELDS:
+                assert np.allclose(record[field][i], expected[field],
+                                   rtol=1e-9, atol=1e-12), (
+                    "Farm {} {} on year {} day {}: {} != {}".format(
+                    i, field, record['year'], record['day'],
+                    record[field][i], expected[field]))
+
+                error = np.max(np.abs(record[field][i] -
+                                      np.array(expected[field], dtype=float)))
+                worst = max(worst, error)
+
+    print("Ensemble of {} farms matches the farms simulated alone over {} "
+          "days (largest difference: {:.3g})".format(len(farms), len(records),
+                                                     worst))
+
+#-------------------------------------------------------------------------------
+# Function: simulate_farm
+#-------------------------------------------------------------------------------
+def simulate_farm(input_fPath, overrides):
+    '''Simulates 1 farm of the ensemble alone, returns its daily records.'''
+
+    simulation = Simulation(input_fPath, overrides=overrides)
+    return list(simulation.iterate(ENSEMBLE_FIELDS))
@@ -0,0 +1,109 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_iterate.py
+Description: Checks the records yielded by Simulation.iterate() and
+             simulate_iter()
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import csv
+import tempfile
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+from RUFAS.simulation_engine import Simulation, simulate_iter
+from tests.helpers import write_input
+
+# Years simulated and soil layers
+ITERATE_YEARS = 2
+ITERATE_LAYERS = 3
+
+# Fields put in the records
+ITERATE_FIELDS = ("soil.runoff", "layers.NO3", "weather.rainfall")
+
+#-------------------------------------------------------------------------------
+# Function: test_iterate
+#-------------------------------------------------------------------------------
+def test_iterate():
+    '''Iterates over simulations, checks the records and the report files.
+
+    There must be one record per simulated day, in order, with the fields asked
+    for. The records must be the same with and without the reports, on the Soil
+    objects and (to rounding) on the soil profile, and the last one must hold
+    the final state of the simulation. Unknown fields must raise a ValueError,
+    and no report file must be written unless asked for.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        fPath = write_input(tmp_dir, "iterate", ITERATE_YEARS, ITERATE_LAYERS)
+
+        #
+        # Records of simulate_iter(), no report files
+        #
+        output_dir = tmp_dir / "iterate_outputs"
+        records = list(simulate_iter(fPath, ITERATE_FIELDS))
+
+        assert not list(output_dir.glob("*.csv")), "Report files written"
+        assert [(record['year'], record['day']) for record in records] == [
+               (year, day) for year in range(1, ITERATE_YEARS + 1)
+                           for day in range(1, 366)], "Records out of order"
+
+        for record in records:
+            assert set(record) == {'year', 'day', *ITERATE_FIELDS}
+            assert len(record["layers.NO3"]) == ITERATE_LAYERS
+
+        with (tmp_dir / "iterate_weather.csv").open('r') as f:
+            rainfall = [float(row['Rainfall']) for row in csv.DictReader(f)]
+        assert [record["weather.rainfall"] for record in records] == rainfall
+
+        #
+        # Records of Simulation.iterate(), with the reports and on the profile
+        #
+        for soil_profile in (False, True):
+            output_dir = tmp_dir / "iterate_reports_{}".format(soil_profile)
+            simulation = Simulation(fPath, output_dir=output_dir, overrides={
+                                    "config.soil_profile": soil_profile})
+            with contextlib.redirect_stdout(io.StringIO()):
+                iterated = list(simulation.iterate(ITERATE_FIELDS,
+                                                   write_reports=True))
+            assert list(output_dir.glob("*.csv")), "No report file written"
+
+            # The soil profile computes in other orders, to the last bits
+            assert len(iterated) == len(records)
+            for record, expected in zip(iterated, records):
+                for field, value in expected.items():
+                    assert (value == record[field] if not soil_profile else
+                            np.allclose(record[field], value, rtol=1e-9,
+                                        atol=1e-12)), (
+                        "{} on year {} day {}: {} != {}".format(
+                        field, record['year'], record['day'], record[field],
+                        value))
+
+        simulation = Simulation(fPath, output_dir=tmp_dir / "iterate_state")
+        for record in simulation.iterate(ITERATE_FIELDS):
+            pass
+        soil = simulation.state.soil
+        assert record["soil.runoff"] == soil.runoff
+        assert record["layers.NO3"] == [layer.NO3
+                                        for layer in soil.listOfSoilLayers]
+
+        #
+        # Unknown fields
+        #
+        for field in ("soil.unknown", "layers.unknown", "weather.unknown",
+                      "unknown.runoff", "runoff"):
+            try:
+                next(simulate_iter(fPath, [field]))
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("No ValueError for field " + field)
+
+    print("Simulations iterated over, {} records of {}".format(
+          len(records), ", ".join(ITERATE_FIELDS)))
@@ -0,0 +1,112 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_repeated_runs.py
+Description: Checks that simulations run one after the other in a process
+             (as by the workers of a batch) do not slow down nor grow memory
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import gc
+import json
+import tempfile
+import contextlib
+import time as timer
+from pathlib import Path
+
+from RUFAS.batch import run_one
+from tests.helpers import write_input
+
+# Largest ratio of the median time of the last runs to that of the first runs,
+# each run time relative to the time of the reference work done just before
+# it (see reference_time()): the machine has slow spells, of many runs in a
+# row, which change the median time of 100 runs by up to 30% from the first
+# runs of a batch to the last, and the reference work by as much
+TIME_RATIO = 1.1
+
+# Iterations of the reference work, a few milliseconds
+REFERENCE_LOOP = 100000
+
+# Largest growth per run of the number of objects alive, from the first runs
+# to the last
+OBJECTS_PER_RUN = 1
+
+#-------------------------------------------------------------------------------
+# Function: test_repeated_runs
+#-------------------------------------------------------------------------------
+def test_repeated_runs(runs=1000, sample=250):
+    '''Runs a batch of input files one after the other in this process.
+
+    Compares the run time (see TIME_RATIO) and the memory held (the number of
+    objects alive) after the first and the last runs of the batch: each run
+    must leave nothing behind (e.g. soil layers piling up from one run to the
+    next).
+
+    Args:
+        runs (int, optional): Number of input files of the batch
+        sample (int, optional): Number of first and last runs compared
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+
+        # 1 year, 3 layers, all the runs sharing the same weather file
+        template = write_input(tmp_dir, "template", 1, 3, reports=())
+        with template.open('r') as f:
+            data = json.load(f)
+
+        fPaths = []
+        for i in range(runs):
+            data['config']['output_dir'] = str(tmp_dir / "run_{}".format(i))
+            fPath = tmp_dir / "run_{}.json".format(i)
+            with fPath.open('w') as f:
+                json.dump(data, f)
+            fPaths.append(fPath)
+
+        times = []
+        objects = []
+        for fPath in fPaths:
+            reference = reference_time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run_one(fPath)
+            assert result['status'] == "Success", result['error']
+
+            gc.collect()
+            times.append(result['run_time'] / reference)
+            objects.append(len(gc.get_objects()))
+
+    first = median(times[:sample])
+    last = median(times[-sample:])
+    growth = ((sum(objects[-sample:]) - sum(objects[:sample])) / sample /
+              (runs - sample))
+
+    assert last / first < TIME_RATIO, (
+        "Runs slow down: {:.2f}x the reference time per run for the first {} "
+        "runs, {:.2f}x for the last".format(first, sample, last))
+    assert growth < OBJECTS_PER_RUN, (
+        "Each run leaves {:.1f} objects behind".format(growth))
+
+    print("{} runs in one process: {:.2f}x the reference time per run for the "
+          "first {}, {:.2f}x for the last, {:.2f} objects left behind per "
+          "run".format(runs, first, sample, last, growth))
+
+#-------------------------------------------------------------------------------
+# Function: reference_time
+#-------------------------------------------------------------------------------
+def reference_time():
+    '''Returns the time of a fixed amount of work, slowed as much as a run by
+    a slow spell of the machine.'''
+
+    t_start = timer.perf_counter()
+    sum(i * i for i in range(REFERENCE_LOOP))
+    return timer.perf_counter() - t_start
+
+#-------------------------------------------------------------------------------
+# Function: median
+#-------------------------------------------------------------------------------
+def median(values):
+    '''Returns the median of the values.'''
+
+    return sorted(values)[len(values) // 2]
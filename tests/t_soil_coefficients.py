@@ -0,0 +1,73 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_soil_coefficients.py
+Description: Checks that the soil coefficients follow the soil parameters
+             changed during a simulation
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import tempfile
+from pathlib import Path
+
+from RUFAS.simulation_engine import Simulation
+from tests.helpers import write_input
+
+# Years simulated and soil layers
+COEFFICIENTS_YEARS = 1
+COEFFICIENTS_LAYERS = 3
+
+# Parameters changed during the simulation, in turn: (layer, or None for the
+# soil, parameter, factor applied to its value)
+CHANGES = ((None, 'CN2', 0.9),
+           (None, 'fieldSlope', 2.0),
+           (0, 'bulkDensity', 1.1),
+           (1, 'ksat', 0.5),
+           (1, 'depth', 0.8),
+           (2, 'bottomDepth', 1.2))
+
+# Days simulated between the changes
+DAYS_BETWEEN = 30
+
+#-------------------------------------------------------------------------------
+# Function: test_soil_coefficients
+#-------------------------------------------------------------------------------
+def test_soil_coefficients():
+    '''Changes soil parameters during a simulation on the Soil objects.
+
+    After each change, the coefficients of the day simulated next must be the
+    ones calculated from the new parameters, not the ones cached before.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        fPath = write_input(tmp_dir, "coefficients", COEFFICIENTS_YEARS,
+                            COEFFICIENTS_LAYERS)
+
+        simulation = Simulation(fPath, overrides={
+                                "config.soil_profile": False})
+        soil = simulation.state.soil
+        days = simulation.iterate()
+
+        for layer, name, factor in CHANGES:
+            for _ in range(DAYS_BETWEEN):
+                next(days)
+
+            cached = vars(soil.getCoefficients()).copy()
+            obj = soil if layer is None else soil.listOfSoilLayers[layer]
+            setattr(obj, name, getattr(obj, name) * factor)
+            next(days)
+
+            expected = vars(soil.calculateCoefficients())
+            assert vars(soil.getCoefficients()) == expected, (
+                "Coefficients not calculated again after {} changed".format(
+                name))
+            assert cached != expected, "{} changed no coefficient".format(name)
+
+            # The day simulated used them
+            assert [soil_layer.TT for soil_layer in soil.listOfSoilLayers
+                    ] == expected['TT'], "Travel times of the old coefficients"
+
+    print("Soil coefficients follow {} parameters changed during a "
+          "simulation".format(len(CHANGES)))
@@ -0,0 +1,53 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_soil_profile.py
+Description: Checks that the soil profile writes the same reports as the Soil
+             objects
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import tempfile
+from pathlib import Path
+
+from tests.helpers import write_input, run_reports, first_difference
+
+# Numbers of soil layers simulated
+PROFILE_LAYERS = (1, 3, 30)
+
+# Years simulated
+PROFILE_YEARS = 3
+
+#-------------------------------------------------------------------------------
+# Function: test_soil_profile
+#-------------------------------------------------------------------------------
+def test_soil_profile(layers=PROFILE_LAYERS):
+    '''Simulates the same inputs on the Soil objects and on the soil profile.
+
+    The report files of both must be byte-identical.
+
+    Args:
+        layers (list[int], optional): Numbers of soil layers simulated
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+
+        for n in layers:
+            fPath = write_input(tmp_dir, "layers_{}".format(n), PROFILE_YEARS,
+                                n)
+            objects = run_reports(fPath, tmp_dir / "objects_{}".format(n),
+                                  False)
+            profile = run_reports(fPath, tmp_dir / "profile_{}".format(n),
+                                  True)
+
+            assert objects, "No report written"
+            assert objects.keys() == profile.keys()
+            for name, text in objects.items():
+                assert text == profile[name], (
+                    "{} layers, {}: {}".format(n, name,
+                    first_difference(text, profile[name])))
+
+    print("Soil profile writes the same reports as the Soil objects with {} "
+          "layers".format(", ".join(str(n) for n in layers)))
@@ -0,0 +1,88 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_spinup.py
+Description: Checks that the spun-up soil states are cached and reused only by
+             simulations with the same soil, weather, years and spin-up version
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import tempfile
+from pathlib import Path
+
+from RUFAS import spinup
+from RUFAS.simulation_engine import Simulation
+from tests.helpers import write_input
+
+# Years of weather, and years of spin-up
+SPINUP_WEATHER_YEARS = 2
+SPINUP_YEARS = 1
+
+#-------------------------------------------------------------------------------
+# Function: test_spinup
+#-------------------------------------------------------------------------------
+def test_spinup():
+    '''Spins up the same soil twice, then with each part of the key changed.
+
+    The second spin-up must be taken from the cache and give the same soil
+    state as the first (cold) one. Changing the soil, the weather, the number
+    of years or the spin-up version must each miss the cache.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        cache_dir = tmp_dir / "cache"
+        fPath = write_input(tmp_dir, "spinup", SPINUP_WEATHER_YEARS, 1)
+        other_weather_fPath = write_input(tmp_dir, "spinup_weather",
+                                          SPINUP_WEATHER_YEARS, 1, seed=1)
+
+        initial = Simulation(fPath).state.soil.snapshot()
+
+        cold, cached = spin_up(fPath, cache_dir), spin_up(fPath, cache_dir)
+        assert not cold.spinup_cached, "Cold spin-up taken from the cache"
+        assert cached.spinup_cached, "Second spin-up not taken from the cache"
+        assert cold.state.soil.snapshot() != initial, "Soil not spun up"
+        assert cached.state.soil.snapshot() == cold.state.soil.snapshot(), (
+               "Cached soil state differs from the cold one")
+
+        misses = {
+            "soil": spin_up(fPath, cache_dir, {"farm.soil.CN2": 70}),
+            "weather": spin_up(other_weather_fPath, cache_dir),
+            "years": spin_up(fPath, cache_dir,
+                             {"config.spinup_years": SPINUP_YEARS + 1}),
+        }
+
+        version = spinup.VERSION
+        spinup.VERSION = version + 1
+        try:
+            misses["version"] = spin_up(fPath, cache_dir)
+        finally:
+            spinup.VERSION = version
+
+        for change, simulation in misses.items():
+            assert not simulation.spinup_cached, (
+                   "Spin-up with a different {} taken from the cache".format(
+                   change))
+
+        cached_states = len(list(cache_dir.glob("*.pkl.gz")))
+        assert cached_states == 1 + len(misses), (
+               "{} cached soil states".format(cached_states))
+
+    print("Spin-up cache hit on the second run, missed after changing the "
+          "{}".format(", ".join(misses)))
+
+#-------------------------------------------------------------------------------
+# Function: spin_up
+#-------------------------------------------------------------------------------
+def spin_up(input_fPath, cache_dir, overrides=None):
+    '''Starts a simulation with spin-up, returns the Simulation.'''
+
+    overrides = {"config.spinup_years": SPINUP_YEARS,
+                 "config.spinup_dir": str(cache_dir),
+                 **(overrides or {})}
+
+    simulation = Simulation(input_fPath, overrides=overrides)
+    simulation.start()
+
+    return simulation
@@ -0,0 +1,444 @@
+################################################################################
+'''
+RUFAS: Ruminant Farm Systems Model
+File name: t_weather.py
+Description: Checks every way of loading the weather against the weather file
+             parsed plainly
+Author(s): Kass Chupongstimun, kass_c@hotmail.com
+'''
+################################################################################
+
+import io
+import os
+import json
+import tempfile
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+from RUFAS import errors, weather_registry
+from RUFAS.classes import Weather
+from RUFAS.simulation_engine import Simulation
+from RUFAS.weather_stations import WeatherStations
+from tests.helpers import write_input, write_weather, START_YEAR
+
+# Years of the weather file, and years simulated
+WEATHER_FILE_YEARS = 6
+WEATHER_YEARS = 3
+
+# Overlays of a climate scenario: warmer, drier summers, a daily radiation
+# change on top of a scale
+WEATHER_OVERLAYS = [
+    {"columns": ["tMax", "tMin", "tAvg"], "add": 2},
+    {"columns": "rainfall", "scale": [1.1]*4 + [0.7]*4 + [1.1]*4},
+    {"columns": ["tMax"], "scale": 1.05, "add": [0.5]*12},
+    {"columns": "radiation", "scale": 0.9,
+     "add": list(np.sin(np.arange(365) * 2 * np.pi / 365))},
+]
+
+# Years generated by the weather generator, and seeds of the generator
+WEATHER_GENERATED_YEARS = 200
+WEATHER_SEEDS = (7, 8, 9)
+
+#-------------------------------------------------------------------------------
+# Function: test_weather_start
+#-------------------------------------------------------------------------------
+def test_weather_start():
+    '''Loads the years simulated from every year of the weather file.
+
+    The weather loaded with and without the binary cache and streamed must be
+    the years of the weather file from the start year, as parsed plainly.
+    Without the binary cache and streamed, the rows must be found from the
+    index of the years kept next to the weather file. Starting before the
+    weather file or too late for it to hold the years simulated must raise an
+    error, from Weather and from the weather_start_year of the input file.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        fPath = write_input(tmp_dir, "weather", WEATHER_FILE_YEARS, 1)
+        weather_fPath = tmp_dir / "weather_weather.csv"
+        observed = plain(weather_fPath)
+
+        starts = range(WEATHER_FILE_YEARS - WEATHER_YEARS + 1)
+        for start in starts:
+            expected = {attribute: values[start:start + WEATHER_YEARS]
+                        for attribute, values in observed.items()}
+            for name, weather in loads(weather_fPath, WEATHER_YEARS, start):
+                check(weather, expected, "{}, start {}".format(name, start))
+
+        #
+        # Index of the years of the weather file, used by every way of
+        # loading that does not slice the binary cache
+        #
+        index_fPath = (weather_fPath.parent / Weather.CACHE_DIR /
+                       (weather_fPath.name + ".index.json"))
+        for name, load in loaders(weather_fPath, WEATHER_YEARS):
+            if name.startswith("cache"):
+                continue
+
+            index_fPath.unlink(missing_ok=True)
+            weather_registry.clear()
+            load()
+            assert index_fPath.is_file(), "{}: no index".format(name)
+
+            # Offsets of the index shifted by a year, read from the index
+            # instead of found again from the weather file
+            with index_fPath.open('r') as f:
+                index = json.load(f)
+            with index_fPath.open('w') as f:
+                json.dump({**index, 'offsets': index['offsets'][1:]}, f)
+            weather_registry.clear()
+            check(load(), {attribute: values[1:1 + WEATHER_YEARS]
+                           for attribute, values in observed.items()},
+                  "{}, index".format(name))
+            index_fPath.unlink()
+
+        for start in (-1, WEATHER_FILE_YEARS - WEATHER_YEARS + 1,
+                      WEATHER_FILE_YEARS + 1):
+            for name, load in loaders(weather_fPath, WEATHER_YEARS, start):
+                try:
+                    load()
+                except errors.JSONfileData:
+                    pass
+                else:
+                    raise AssertionError("{}, start {}: no error".format(
+                                         name, start))
+
+        #
+        # Start year of the weather file in the input file
+        #
+        simulation = Simulation(fPath, overrides={
+                                "config.EndYear": START_YEAR + WEATHER_YEARS - 1,
+                                "config.weather_start_year": START_YEAR - 2})
+        check(simulation.weather, {attribute: values[2:2 + WEATHER_YEARS]
+                                   for attribute, values in observed.items()
+                                   if hasattr(simulation.weather, attribute)},
+              "weather_start_year")
+
+        for weather_start_year in (START_YEAR + 1, START_YEAR - 4):
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    Simulation(fPath, overrides={
+                               "config.weather_start_year": weather_start_year})
+            except errors.InvalidJSONfile:
+                pass
+            else:
+                raise AssertionError("weather_start_year {}: no error".format(
+                                     weather_start_year))
+
+    print("Weather loaded from years {} to {} of the weather file matches the "
+          "weather file".format(starts[0], starts[-1]))
+
+#-------------------------------------------------------------------------------
+# Function: test_weather_cache
+#-------------------------------------------------------------------------------
+def test_weather_cache():
+    '''Loads a weather file through its binary cache as the file changes.
+
+    The key of the cache must be kept while the file is unchanged, not found
+    again by hashing the file. A file touched without changing its content
+    must find its cache again, and a file whose content changed must be
+    parsed again.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        write_input(tmp_dir, "cache", WEATHER_FILE_YEARS, 1)
+        weather_fPath = tmp_dir / "cache_weather.csv"
+        cache_dir = weather_fPath.parent / Weather.CACHE_DIR
+        key_fPath = cache_dir / (weather_fPath.name + ".key.json")
+
+        def cached():
+            weather_registry.clear()
+            check(Weather(str(weather_fPath), WEATHER_YEARS),
+                  {attribute: values[:WEATHER_YEARS] for attribute, values
+                   in plain(weather_fPath).items()}, "cache")
+            return sorted(fPath.name for fPath in cache_dir.glob("*.npy"))
+
+        caches = cached()
+        assert len(caches) == 1, "{} caches".format(len(caches))
+
+        # Unchanged file: the key kept is used, even if it is not the hash
+        with key_fPath.open('r') as f:
+            saved = json.load(f)
+        with key_fPath.open('w') as f:
+            json.dump({**saved, 'key': "kept"}, f)
+        assert cached() == sorted(caches + ["kept.npy"]), "Key found again"
+        (cache_dir / "kept.npy").unlink()
+        with key_fPath.open('w') as f:
+            json.dump(saved, f)
+
+        # Touched file: same content, same cache
+        os.utime(weather_fPath, ns=(0, 0))
+        assert cached() == caches, "Cache of a touched file not reused"
+
+        # Changed file: parsed again to a new cache
+        lines = weather_fPath.read_text().splitlines(keepends=True)
+        lines[1] = lines[1].replace(",", ",1", 1)
+        weather_fPath.write_text("".join(lines))
+        assert len(cached()) == 2, "Changed file not parsed again"
+
+    print("Weather cache reused while the weather file is unchanged, parsed "
+          "again when its content changes")
+
+#-------------------------------------------------------------------------------
+# Function: test_weather_overlays
+#-------------------------------------------------------------------------------
+def test_weather_overlays():
+    '''Loads the weather with overlays, each way it can be loaded.
+
+    The weather must be the weather file adjusted by the overlays in order,
+    with and without the binary cache and streamed, from a start year past
+    the first year of the file. The data of the weather file loaded must not
+    be copied (when loaded whole) nor changed by the overlays.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        write_input(tmp_dir, "overlays", WEATHER_FILE_YEARS, 1)
+        weather_fPath = tmp_dir / "overlays_weather.csv"
+        observed = plain(weather_fPath)
+
+        start = 1
+        expected = {attribute: values[start:start + WEATHER_YEARS].copy()
+                    for attribute, values in observed.items()}
+        for overlay in WEATHER_OVERLAYS:
+            columns = overlay['columns']
+            for attribute in [columns] if isinstance(columns, str) else columns:
+                expected[attribute] = (
+                    expected[attribute] * days(overlay.get('scale', 1.0)) +
+                    days(overlay.get('add', 0.0)))
+
+        for name, weather in loads(weather_fPath, WEATHER_YEARS, start,
+                                   WEATHER_OVERLAYS):
+            check(weather, expected, "{}, overlaid".format(name), exact=False)
+
+            if not name.startswith("stream"):
+                bases = [Weather(str(weather_fPath), WEATHER_YEARS, cache,
+                                 start=start).tMax for cache in (True, False)]
+                assert any(np.shares_memory(weather.tMax.base, base)
+                           for base in bases), (
+                       "{}: weather file data copied".format(name))
+
+        for name, weather in loads(weather_fPath, WEATHER_YEARS, start):
+            check(weather, {attribute: values[start:start + WEATHER_YEARS]
+                            for attribute, values in observed.items()},
+                  "{}, after overlays".format(name))
+
+    print("Weather overlays adjust the weather file loaded each way, without "
+          "copying it")
+
+#-------------------------------------------------------------------------------
+# Function: test_weather_generator
+#-------------------------------------------------------------------------------
+def test_weather_generator():
+    '''Generates synthetic weather fitted to a weather file.
+
+    The same seed must always give the same weather, whether the weather file
+    is fitted to from its binary cache or parsed, and the window and start
+    year must not change it. Other seeds must give other weather, and the
+    weather generated must keep the relations between its columns and about
+    the frequency of wet days of the weather file.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        write_input(tmp_dir, "generator", WEATHER_FILE_YEARS, 1)
+        weather_fPath = tmp_dir / "generator_weather.csv"
+        observed = plain(weather_fPath)
+
+        def generate(seed, cache=True, window=0, start=0):
+            weather_registry.clear()
+            return Weather({"fit": str(weather_fPath), "seed": seed},
+                           WEATHER_GENERATED_YEARS, cache, window, start)
+
+        generated = generate(WEATHER_SEEDS[0])
+        expected = {attribute: np.array(getattr(generated, attribute))
+                    for attribute, _ in Weather.COLUMNS}
+
+        for cache, window, start in ((True, 0, 0), (False, 0, 0),
+                                     (True, 2, 0), (True, 0, 1)):
+            check(generate(WEATHER_SEEDS[0], cache, window, start), expected,
+                  "seed {}, cache {}, window {}, start {}".format(
+                  WEATHER_SEEDS[0], cache, window, start))
+
+        for seed in WEATHER_SEEDS[1:]:
+            other = generate(seed)
+            assert not np.array_equal(other.rainfall, generated.rainfall), (
+                   "Seeds {} and {} give the same rainfall".format(
+                   WEATHER_SEEDS[0], seed))
+
+        assert np.all(generated.tMax >= generated.tMin)
+        assert np.allclose(generated.tAvg, (generated.tMax + generated.tMin)/2)
+        assert np.all(generated.radiation >= 0)
+        assert np.allclose(generated.biomass[0], observed['biomass'].mean(0))
+
+        wet, observed_wet = ((generated.rainfall > 0).mean(),
+                             (observed['rainfall'] > 0).mean())
+        assert abs(wet - observed_wet) < 0.05, (
+               "Wet days: {:.3f} generated, {:.3f} observed".format(
+               wet, observed_wet))
+
+    print("Weather generator gives the same {} years for the same seed, other "
+          "years for other seeds".format(WEATHER_GENERATED_YEARS))
+
+#-------------------------------------------------------------------------------
+# Function: test_weather_stations
+#-------------------------------------------------------------------------------
+def test_weather_stations():
+    '''Loads the weather of the fields of a farm from many stations.
+
+    The weather of a field of one station must be a view of the data of the
+    station, that of a field of many stations their inverse-distance weighted
+    mean, blended once. Unknown fields and fields that are not valid must
+    raise an error, and a simulation must get the weather of the field named
+    in its input file.
+    '''
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        fPath = write_input(tmp_dir, "stations", WEATHER_YEARS, 1)
+
+        stations, observed = {}, {}
+        for seed, (name, location) in enumerate((("A", [0, 0]),
+                                                 ("B", [10, 0]),
+                                                 ("C", None))):
+            weather_fPath = tmp_dir / "station_{}.csv".format(name)
+            write_weather(weather_fPath, WEATHER_FILE_YEARS, seed)
+            stations[name] = {"file": str(weather_fPath)}
+            if location is not None:
+                stations[name]["location"] = location
+            observed[name] = {attribute: values[:WEATHER_YEARS]
+                              for attribute, values
+                              in plain(weather_fPath).items()}
+
+        fields = [{"station": "C"},
+                  {"location": [0, 0]},
+                  {"location": [5, 0], "stations": ["A", "B"]},
+                  {"location": [2, 0], "power": 1}]
+        weights = [{"C": 1}, {"A": 1}, {"A": 0.5, "B": 0.5},
+                   {"A": 8/10, "B": 2/10}]
+
+        farm = WeatherStations(stations, fields, WEATHER_YEARS)
+        for n, field_weights in enumerate(weights):
+            expected = {attribute: sum(weight * observed[name][attribute]
+                                       for name, weight
+                                       in field_weights.items())
+                        for attribute in observed["A"]}
+            check(farm.weather(n), expected, "field {}".format(n),
+                  exact=len(field_weights) == 1)
+
+            data = farm.field_data(n)
+            if len(field_weights) == 1:
+                assert np.shares_memory(data, farm.data), (
+                       "Field {} of one station copied".format(n))
+            else:
+                assert farm.field_data(n) is data, (
+                       "Field {} blended again".format(n))
+
+        for field in (len(fields), -1, "0"):
+            try:
+                farm.weather(field)
+            except errors.JSONfileData:
+                pass
+            else:
+                raise AssertionError("Field {}: no error".format(field))
+
+        for field in ({"station": "D"}, {"location": [1, 1], "stations": ["C"]},
+                      {}, "A"):
+            try:
+                WeatherStations(stations, [field], WEATHER_YEARS)
+            except errors.JSONfileData:
+                pass
+            else:
+                raise AssertionError("Field {}: no error".format(field))
+
+        simulation = Simulation(fPath, overrides={
+                                "weather": {"stations": stations,
+                                            "fields": fields, "field": 2}})
+        check(simulation.weather, {attribute: (observed["A"][attribute] +
+                                               observed["B"][attribute]) / 2
+                                   for attribute in observed["A"]
+                                   if hasattr(simulation.weather, attribute)},
+              "simulation of field 2", exact=False)
+
+    print("Weather of {} fields from {} stations matches the weather files "
+          "of the stations".format(len(fields), len(stations)))
+
+#-------------------------------------------------------------------------------
+# Function: days
+#-------------------------------------------------------------------------------
+def days(value):
+    '''Returns the 365 daily values of a number or 12 monthly values.'''
+
+    values = np.array(value, dtype=float).reshape(-1)
+    if len(values) == 12:
+        return np.repeat(values, (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30,
+                                  31))
+    return np.full(365, values[0]) if len(values) == 1 else values
+
+#-------------------------------------------------------------------------------
+# Function: plain
+#-------------------------------------------------------------------------------
+def plain(weather_fPath):
+    '''Parses a weather file plainly, returns {attribute: (years, 365) array}.'''
+
+    data = np.loadtxt(weather_fPath, delimiter=',', skiprows=1, ndmin=2)
+    years = len(data) // 365
+
+    return {attribute: data[:years*365, column].reshape(years, 365)
+            for attribute, column in Weather.COLUMNS}
+
+#-------------------------------------------------------------------------------
+# Function: loaders
+#-------------------------------------------------------------------------------
+def loaders(weather_fPath, duration, start=0, overlays=()):
+    '''Returns (name, load()) for each way Weather loads a weather file.'''
+
+    def load(cache, window, clear=False):
+        def load():
+            if clear:
+                weather_registry.clear()
+            return Weather(str(weather_fPath), duration, cache, window, start,
+                           overlays)
+        return load
+
+    return [("cache", load(True, 0)),
+            ("cache, cold", load(True, 0, clear=True)),
+            ("no cache", load(False, 0)),
+            ("stream", load(True, 1)),
+            ("stream, window 2", load(True, 2)),
+            ("stream, no cache", load(False, 2))]
+
+#-------------------------------------------------------------------------------
+# Function: loads
+#-------------------------------------------------------------------------------
+def loads(weather_fPath, duration, start=0, overlays=()):
+    '''Yields (name, weather) loaded each way, see loaders().'''
+
+    for name, load in loaders(weather_fPath, duration, start, overlays):
+        yield name, load()
+
+#-------------------------------------------------------------------------------
+# Function: check
+#-------------------------------------------------------------------------------
+def check(weather, expected, name, exact=True):
+    '''Checks that a weather holds the data expected, year by year.
+
+    Args:
+        weather (Weather): The weather
+        expected (dict): {attribute: (years, 365) array} expected
+        name (str): Name of the weather, for the errors
+        exact (bool, optional): The data must be equal, not only to rounding
+    '''
+
+    for attribute, values in expected.items():
+        column = getattr(weather, attribute)
+        assert column.shape == values.shape, "{}, {}: shape {}".format(
+               name, attribute, column.shape)
+        for year in range(len(values)):
+            equal = np.array_equal if exact else np.allclose
+            assert equal(column[year], values[year]), (
+                   "{}, {} of year {} differs".format(name, attribute, year))